@@ -0,0 +1,211 @@
+import io
+import os
+import sys
+import json
+import time
+import inspect
+import tempfile
+import warnings
+import contextlib
+import pandas as pd
+from gurobipy import *
+
+import data_process as dp
+import instance_generator as ig
+from model_ir import ModelIR
+from room_assignment_contact_opt import RoomAssignmentContactyOpt
+from room_assignment_mode_preferences_contact_opt import RoomAssignmentModePreferencesContactOpt
+from room_assignment_mode_preferences_residential_enforced import RoomAssignmentModePreferencesResidentialEnforced
+from room_assignment_stability_mode_preferences_contact_opt import RoomAssignmentStabilityModePreferencesContactOpt
+from room_assignment_stability_mode_preferences_contact_opt_nondominated import RoomAssignmentStabilityModePreferencesContactOptNondominated
+from room_assignment_stability_mode_preferences_contact_opt_nondominated_preference_enforced import RoomAssignmentStabilityModePreferencesContactOptNondominatedPreferenceEnforced
+from room_assignment_stability_mode_preferences_contact_opt_nondominated_residential_preference import RoomAssignmentStabilityModePreferencesContactOptNondominatedResidentialPreference
+from room_assignment_stability_opt_preference_enforced_resdential_preference_enforced import RoomAssignmentStabilityOptPreferenceEnforcedResdentialPreferenceEnforced
+
+
+model_registry = {opt_class.__name__: opt_class for opt_class in [
+    RoomAssignmentContactyOpt,
+    RoomAssignmentModePreferencesContactOpt,
+    RoomAssignmentModePreferencesResidentialEnforced,
+    RoomAssignmentStabilityModePreferencesContactOpt,
+    RoomAssignmentStabilityModePreferencesContactOptNondominated,
+    RoomAssignmentStabilityModePreferencesContactOptNondominatedPreferenceEnforced,
+    RoomAssignmentStabilityModePreferencesContactOptNondominatedResidentialPreference,
+    RoomAssignmentStabilityOptPreferenceEnforcedResdentialPreferenceEnforced,
+]}
+
+# values of the constructor arguments of the registered models. Each model takes the ones its constructor names
+default_model_params = {
+    "minimum_section_contact_days": 3,
+    "weeks_in_semester": 15,
+    "preference_objective_tollerance": 0.01,
+    "contact_hours_objective_tollerance": 0.1,
+    "residential_spread_preference_bound": 1,
+    "total_pererence_bound": 3,
+    "preference_objective_weight": 60,
+    "contact_hours_objective_weight": 1,
+    "plan_stability_objective_weight": 0.001,
+    "preference_min_bound": 5,
+    "contact_hours_min_bound": 0,
+    "same_room_min_count": 2,
+    "distance_max_bound": sys.maxsize,
+    "residential_preference_tollerance": 0.01,
+}
+
+example_directory = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "examples")
+
+phase_list = ["sets", "vars", "constraints", "objective", "optimize", "output"]
+
+
+def get_instance_filepaths(instance, instance_directory):
+    """
+    Input:
+        instance - str or int: "examples" for the files in the examples directory, or a number of sections to generate an instance of
+        instance_directory - str: directory to write generated instances to
+    Output:
+        course_data_filepath, room_data_filepath, building_location_filepath - str: input files of the instance
+    """
+    if instance == "examples":
+        return (os.path.join(example_directory, "example_course_sections.csv"),
+                os.path.join(example_directory, "example_classrooms.csv"),
+                os.path.join(example_directory, "example_coordinates.csv"))
+    return ig.write_instance(*ig.generate_instance(int(instance)), instance_directory, str(instance))
+
+def get_opt(opt_class, course_data, room_data, building_location_data, params):
+    """
+    Input:
+        opt_class - type: one of the classes of model_registry
+        course_data, room_data, building_location_data - pd.DataFrame: cleaned input data
+        params - dict{str: any}: constructor arguments, and class attributes such as conflict_constraint_strategy.
+                 Entries that opt_class does not use are ignored
+    Output:
+        opt - RoomAssignmentOpt: the model object
+    """
+    input_data_dict = {"course_data": course_data, "room_data": room_data, "building_location_data": building_location_data}
+    constructor_params = inspect.signature(opt_class.__init__).parameters
+    opt = opt_class(**{name: input_data_dict[name] if name in input_data_dict else params[name]
+                       for name in constructor_params if name != "self"})
+    for name, value in params.items():
+        if name not in constructor_params and hasattr(opt_class, name):
+            setattr(opt, name, value)
+    return opt
+
+def run_model(opt, course_data, room_data, build_only=False, solver_params=None):
+    """
+    Input:
+        opt - RoomAssignmentOpt: model object, whose sets and parameters are not computed yet
+        course_data, room_data - pd.DataFrame: cleaned input data, as passed to output_result
+        build_only - bool: if True, the model is built as a ModelIR, which needs no solver license, and is not solved
+        solver_params - dict{str: any}: gurobi parameters, e.g. {"TimeLimit": 60}
+    Output:
+        result - dict{str: any}: seconds of each phase of phase_list that was run, model size, solver statistics,
+                 and whether the room assignment written by output_result is optimal
+    """
+    result = dict()
+
+    def run_phase(phase, function, *args):
+        start_time = time.perf_counter()
+        output = function(*args)
+        result["seconds_" + phase] = time.perf_counter() - start_time
+        return output
+
+    run_phase("sets", opt.prepare_sets_params)
+    if build_only:
+        model_ir = ModelIR()
+        model_ir_vars = run_phase("vars", opt.set_model_ir_vars, model_ir)
+        run_phase("constraints", opt.set_model_ir_constrs, model_ir, model_ir_vars)
+        run_phase("objective", opt.set_model_ir_objective, model_ir, model_ir_vars)
+        result["num_vars"] = model_ir.num_vars
+        result["num_constrs"] = model_ir.num_constrs
+        result["num_nonzeros"] = len(model_ir.get_constrs()[1])
+        result["num_objectives"] = len(model_ir.objective_list)
+        return result
+
+    model = Model("")
+    model.Params.OutputFlag = 0
+    for param_name, param_value in (solver_params or {}).items():
+        model.setParam(param_name, param_value)
+    model_vars = run_phase("vars", opt.set_model_vars, model)
+    run_phase("constraints", opt.set_model_constrs, model, model_vars)
+    # gurobi adds the pending variables and constraints on update, which is timed with the objective
+    run_phase("objective", lambda: (opt.set_objective(model, model_vars), model.update()))
+    result["num_vars"] = model.NumVars
+    result["num_constrs"] = model.NumConstrs
+    result["num_nonzeros"] = model.NumNZs
+    result["num_objectives"] = model.NumObj
+
+    run_phase("optimize", model.optimize)
+    result["status"] = model.Status
+    result["solver_runtime"] = model.Runtime
+    result["sol_count"] = model.SolCount
+    result["node_count"] = model.NodeCount
+    if model.SolCount > 0:
+        # the gap is not defined for models set up with setObjectiveN, even with a single objective
+        if not model.IsMultiObj:
+            result["mip_gap"] = model.MIPGap
+        objective_values = list()
+        for objective_index in range(model.NumObj):
+            model.setParam("ObjNumber", objective_index)
+            objective_values.append(model.ObjNVal)
+        result["objective_values"] = json.dumps(objective_values)
+        with tempfile.TemporaryDirectory() as output_directory:
+            run_phase("output", opt.output_result, course_data, room_data, model, os.path.join(output_directory, "output.csv"))
+        # False if rooms were aggregated into classes that cannot hold the sections the model assigned to them
+        result["plan_optimal"] = opt.plan_optimal
+    return result
+
+def run_benchmark_matrix(instance_list, param_list=None, model_name_list=None, build_only=False, solver_params=None):
+    """
+    Input:
+        instance_list - list[str or int]: instances, see get_instance_filepaths
+        param_list - list[dict{str: any}]: parameter settings, each updating default_model_params. Defaults to the default parameters only
+        model_name_list - list[str]: names of the models of model_registry to run. Defaults to all of them
+        build_only - bool: if True, models are built but not solved, so no solver license is needed
+        solver_params - dict{str: any}: gurobi parameters of every solve
+    Output:
+        results - pd.DataFrame: one row per instance, parameter setting and model.
+                  A model that fails, e.g. because of a size limited license, gets its error message in the error column
+    """
+    param_list = [dict()] if param_list is None else param_list
+    model_name_list = list(model_registry) if model_name_list is None else model_name_list
+    row_list = list()
+    with tempfile.TemporaryDirectory() as instance_directory:
+        for instance in instance_list:
+            course_data_filepath, room_data_filepath, building_location_filepath = get_instance_filepaths(instance, instance_directory)
+            with contextlib.redirect_stdout(io.StringIO()), warnings.catch_warnings():
+                warnings.simplefilter("ignore")
+                course_data = dp.clean_course_data(course_data_filepath)
+                room_data = dp.clean_room_data(room_data_filepath)
+                building_location_data = dp.clean_building_location_data(building_location_filepath, course_data)
+
+            for param_id, param_update in enumerate(param_list):
+                params = dict(default_model_params, **param_update)
+                for model_name in model_name_list:
+                    row = {"instance": str(instance), "param_id": param_id, "params": json.dumps(param_update, sort_keys=True),
+                           "model": model_name, "build_only": build_only, "error": None}
+                    try:
+                        with contextlib.redirect_stdout(io.StringIO()), warnings.catch_warnings():
+                            warnings.simplefilter("ignore")
+                            opt = get_opt(model_registry[model_name], course_data, room_data, building_location_data, params)
+                            row.update(run_model(opt, course_data, room_data, build_only=build_only, solver_params=solver_params))
+                    except Exception as error:
+                        row["error"] = type(error).__name__ + ": " + str(error)
+                    print(model_name + " on " + str(instance) + " with parameters " + str(param_id) + ": " +
+                          (row["error"] if row["error"] is not None else
+                           ", ".join("%s %.3fs" % (phase, row["seconds_" + phase]) for phase in phase_list if "seconds_" + phase in row)))
+                    row_list.append(row)
+
+    columns = (["instance", "param_id", "params", "model", "build_only"] + ["seconds_" + phase for phase in phase_list] +
+               ["num_vars", "num_constrs", "num_nonzeros", "num_objectives", "status", "solver_runtime", "sol_count", "node_count",
+                "mip_gap", "objective_values", "plan_optimal", "error"])
+    return pd.DataFrame(row_list, columns=columns)
+
+
+if __name__ == "__main__":
+
+    build_only = "--build-only" in sys.argv
+    arguement_list = [arguement for arguement in sys.argv[1:] if arguement != "--build-only"]
+    if len(arguement_list) < 1:
+        raise Exception("benchmark_models requires the following commandline arguments: results_filepath, [--build-only], [instance ...]")
+    results = run_benchmark_matrix(arguement_list[1:] if len(arguement_list) > 1 else ["examples"], build_only=build_only)
+    results.to_csv(arguement_list[0], index=False)
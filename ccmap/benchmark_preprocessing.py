@@ -0,0 +1,217 @@
+import io
+import os
+import sys
+import json
+import time
+import inspect
+import platform
+import tempfile
+import warnings
+import functools
+import contextlib
+import tracemalloc
+from datetime import datetime
+import numpy as np
+import pandas as pd
+
+import data_process as dp
+import set_process as sp
+import instance_generator as ig
+from instance_cache import write_atomic
+from room_assignment_stability_mode_preferences_contact_opt import RoomAssignmentStabilityModePreferencesContactOpt
+
+
+benchmark_size_list = [1000, 5000, 10000, 50000]
+# a measurement is reported as a regression if it takes this many times as long as in the previous run of the same size
+regression_ratio = 1.5
+# measurements shorter than this many seconds are not compared, as their timings are mostly noise
+regression_min_seconds = 0.05
+
+
+class PhaseProfiler:
+    """
+    Measures the functions of set_process and the get_all_sets_params of each class in the hierarchy of a model,
+        by replacing them with timed wrappers while the profiler is used as a context manager.
+    Times are inclusive: a function that calls other measured functions includes their time.
+    If profile_memory is True, the peak memory allocated during each call is also traced, which slows down every call,
+        so timings should be taken from a run without it
+    """
+
+    def __init__(self, opt_class, profile_memory=False):
+        """
+        Input:
+            opt_class - type: class whose get_all_sets_params is measured, together with those of its ancestors
+            profile_memory - bool: if True, trace the peak memory of each call with tracemalloc
+        """
+        self.profile_memory = profile_memory
+        self.record_dict = dict() #maps a phase name to its number of calls, total seconds and peak memory
+        self.memory_stack = list() #[memory at the start, peak memory so far] of each measured call in progress
+        self.patch_list = [(sp, name, function) for name, function in vars(sp).items()
+                           if inspect.isfunction(function) and function.__module__ == sp.__name__]
+        self.patch_list += [(cls, "get_all_sets_params", cls.__dict__["get_all_sets_params"]) for cls in opt_class.__mro__
+                            if "get_all_sets_params" in cls.__dict__]
+
+    def __enter__(self):
+        if self.profile_memory:
+            tracemalloc.start()
+        for owner, name, function in self.patch_list:
+            setattr(owner, name, self.wrap(self.get_phase_name(owner, name), function))
+        return self
+
+    def __exit__(self, *exc_info):
+        for owner, name, function in self.patch_list:
+            setattr(owner, name, function)
+        if self.profile_memory:
+            tracemalloc.stop()
+        return False
+
+    @staticmethod
+    def get_phase_name(owner, name):
+        return (owner.__name__ if inspect.isclass(owner) else owner.__name__.split(".")[-1]) + "." + name
+
+    def wrap(self, phase_name, function):
+        @functools.wraps(function)
+        def measured_function(*args, **kwargs):
+            return self.call(phase_name, function, *args, **kwargs)
+        return measured_function
+
+    def call(self, phase_name, function, *args, **kwargs):
+        """
+        Calls function, and adds its time, and its peak memory if profiled, to the record of phase_name
+        """
+        if self.profile_memory:
+            current_memory, peak_memory = tracemalloc.get_traced_memory()
+            for memory_frame in self.memory_stack:
+                memory_frame[1] = max(memory_frame[1], peak_memory)
+            tracemalloc.reset_peak()
+            self.memory_stack.append([current_memory, current_memory])
+        start_time = time.perf_counter()
+        try:
+            return function(*args, **kwargs)
+        finally:
+            seconds = time.perf_counter() - start_time
+            record = self.record_dict.setdefault(phase_name, {"calls": 0, "seconds": 0.0, "peak_memory_mb": None})
+            record["calls"] += 1
+            record["seconds"] += seconds
+            if self.profile_memory:
+                start_memory, peak_memory = self.memory_stack.pop()
+                peak_memory = max(peak_memory, tracemalloc.get_traced_memory()[1])
+                for memory_frame in self.memory_stack:
+                    memory_frame[1] = max(memory_frame[1], peak_memory)
+                record["peak_memory_mb"] = max(record["peak_memory_mb"] or 0.0, (peak_memory - start_memory) / 2**20)
+
+
+def run_benchmark(num_section, seed=0, profile_memory=True, opt_class=RoomAssignmentStabilityModePreferencesContactOpt):
+    """
+    Input:
+        num_section - int: number of sections of the generated instance
+        seed - int: seed of the generated instance
+        profile_memory - bool: if True, preprocessing is run a second time to trace peak memory
+        opt_class - type: model class whose preprocessing is measured. Its constructor must take the arguments of
+                          RoomAssignmentStabilityModePreferencesContactOpt
+    Output:
+        result - dict{str: any}: size of the instance, and a list with the calls, seconds and peak memory of every phase
+
+    Writes a generated instance to csv files, reads it back with data_process, and runs get_all_sets_params
+    """
+    with tempfile.TemporaryDirectory() as instance_directory, contextlib.redirect_stdout(io.StringIO()), warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        course_data_filepath, room_data_filepath, building_location_filepath = ig.write_instance(*ig.generate_instance(num_section, seed=seed),
+                                                                                                 instance_directory,
+                                                                                                 str(num_section))
+
+        def get_opt(profiler):
+            course_data = profiler.call("data_process.clean_course_data", dp.clean_course_data, course_data_filepath)
+            room_data = profiler.call("data_process.clean_room_data", dp.clean_room_data, room_data_filepath)
+            building_location_data = profiler.call("data_process.clean_building_location_data", dp.clean_building_location_data,
+                                                   building_location_filepath, course_data)
+            return opt_class(course_data, room_data, building_location_data, 3, 15, 0.01, 0.1)
+
+        with PhaseProfiler(opt_class) as time_profiler:
+            opt = get_opt(time_profiler)
+            opt.get_all_sets_params()
+        record_dict = time_profiler.record_dict
+
+        if profile_memory:
+            with PhaseProfiler(opt_class, profile_memory=True) as memory_profiler:
+                get_opt(memory_profiler).get_all_sets_params()
+            for phase_name, record in memory_profiler.record_dict.items():
+                record_dict[phase_name]["peak_memory_mb"] = record["peak_memory_mb"]
+
+    return {"num_section": num_section,
+            "num_room": len(opt.all_room),
+            "num_pair": len(opt.pair_section_id),
+            "seed": seed,
+            "phase_list": [dict(phase=phase_name, **record) for phase_name, record in record_dict.items()]}
+
+def read_history(history_filepath):
+    """
+    Output:
+        history - list[dict]: earlier runs, oldest first. Empty if history_filepath does not exist
+    """
+    if not os.path.isfile(history_filepath):
+        return list()
+    with open(history_filepath) as history_file:
+        return json.load(history_file)
+
+def get_regressions(previous_run, run):
+    """
+    Input:
+        previous_run, run - dict: runs as stored in the history
+    Output:
+        regression_list - list[str]: phases that take regression_ratio times longer in run than in previous_run, for the same instance size
+    """
+    previous_seconds_dict = {(result["num_section"], result["seed"], phase["phase"]): phase["seconds"]
+                             for result in previous_run["result_list"] for phase in result["phase_list"]}
+    regression_list = list()
+    for result in run["result_list"]:
+        for phase in result["phase_list"]:
+            previous_seconds = previous_seconds_dict.get((result["num_section"], result["seed"], phase["phase"]))
+            if previous_seconds is not None and phase["seconds"] >= regression_min_seconds and phase["seconds"] > regression_ratio * previous_seconds:
+                regression_list.append(phase["phase"] + " with " + str(result["num_section"]) + " sections: " +
+                                       "%.3fs, was %.3fs" % (phase["seconds"], previous_seconds))
+    return regression_list
+
+def run_benchmark_suite(history_filepath, size_list=None, seed=0, profile_memory=True, label=""):
+    """
+    Input:
+        history_filepath - str: json file the run is appended to
+        size_list - list[int]: numbers of sections to benchmark. Defaults to benchmark_size_list
+        seed - int: seed of the generated instances
+        profile_memory - bool: if True, peak memory is traced as well
+        label - str: free text stored with the run, e.g. the commit being measured
+    Output:
+        run - dict: the run appended to the history
+
+    Warns about phases that became slower since the previous run in the history
+    """
+    size_list = benchmark_size_list if size_list is None else size_list
+    run = {"time": datetime.now().isoformat(timespec="seconds"),
+           "label": label,
+           "python": platform.python_version(),
+           "numpy": np.__version__,
+           "pandas": pd.__version__,
+           "machine": platform.platform(),
+           "result_list": list()}
+    for num_section in size_list:
+        print("benchmarking preprocessing of " + str(num_section) + " sections")
+        result = run_benchmark(num_section, seed=seed, profile_memory=profile_memory)
+        for phase in sorted(result["phase_list"], key=lambda phase: -phase["seconds"]):
+            print("    %-70s %8.3fs %6d calls" % (phase["phase"], phase["seconds"], phase["calls"]) +
+                  ("" if phase["peak_memory_mb"] is None else " %10.1f MB" % phase["peak_memory_mb"]))
+        run["result_list"].append(result)
+
+    history = read_history(history_filepath)
+    if len(history) > 0:
+        for regression in get_regressions(history[-1], run):
+            warnings.warn("Preprocessing regression: " + regression)
+    history.append(run)
+    write_atomic(history_filepath, json.dumps(history, indent=1).encode())
+    return run
+
+
+if __name__ == "__main__":
+
+    history_filepath = sys.argv[1] if len(sys.argv) > 1 else "benchmark_history.json"
+    size_list = [int(num_section) for num_section in sys.argv[2:]] if len(sys.argv) > 2 else None
+    run_benchmark_suite(history_filepath, size_list=size_list)
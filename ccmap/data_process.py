@@ -1,3 +1,6 @@
+import os
+import json
+import shutil
 import pandas as pd
 import numpy as np
 import warnings
@@ -51,6 +54,10 @@ building_location_columns = [
     "longitude"
 ]
 
+# bump whenever the layout of instance bundles changes, so that bundles written by an older version are rejected
+INSTANCE_BUNDLE_VERSION = 1
+instance_bundle_suffix = ".ccmap"
+
 def standardize_column_name(column_name):
     """
     Input: 
@@ -119,33 +126,12 @@ def mark_occurances(course_data):
         course_data - same as input dataframe, but now with a new column subject_course_section_occurrence,
                        which will be a unique identifier for each row
 
-    Intended as a helper method to clean_course_data
+    Intended as a helper method to clean_course_data.
+    A section may have any number of rows, e.g. one per meeting pattern
     """
 
-    course_data["repeated_section"] = course_data['subject_course_section'].eq(course_data['subject_course_section'].shift())
-    course_data['twice_repeated_section'] = (course_data['repeated_section'] & course_data['repeated_section'].eq(  course_data['repeated_section'].shift()))
-    # confirm no section meets more than 3 times a week
-    course_data['three_times_repeated_section'] = (course_data['twice_repeated_section'] & course_data['twice_repeated_section'].eq(course_data['twice_repeated_section'].shift()))
-    course_data['four_times_repeated_section'] = (course_data['three_times_repeated_section'] & course_data['three_times_repeated_section'].eq(course_data['three_times_repeated_section'].shift()))
-    course_data['five_times_repeated_section'] = (course_data['four_times_repeated_section'] & course_data['four_times_repeated_section'].eq(course_data['four_times_repeated_section'].shift()))
-
-    course_data["occurance"] = course_data.apply(
-        lambda row: 0 if not row["repeated_section"]
-        else (1 if not row["twice_repeated_section"]
-            else (2 if not row["three_times_repeated_section"]
-                else (3 if not row["four_times_repeated_section"]
-                    else 4
-            ))),
-        axis=1).astype(str)
-    assert not course_data['five_times_repeated_section'].any()
-
-    #remove helper colummns created earlier
-    del course_data['repeated_section']
-    del course_data['twice_repeated_section']
-    del course_data['three_times_repeated_section']
-    del course_data['four_times_repeated_section']
-    del course_data['five_times_repeated_section']
-
+    # number the rows of each section in order of appearance, so repeated rows of a section get 0, 1, 2, ...
+    course_data["occurance"] = course_data.groupby("subject_course_section", sort=False, dropna=False).cumcount().astype(str)
 
     # create subject_course_section_occurrence as a true unique identifier for sections
     course_data["subject_course_section_occurrence"] = course_data["subject_course_section"] + "_" + course_data["occurance"]
@@ -155,10 +141,13 @@ def mark_occurances(course_data):
 
     return course_data
 
-def clean_course_data(filepath):
+def clean_course_data(filepath, categorical_ids=False):
     """
     Input: 
-        filepath - str : full filepath of the excel course data that will be read
+        filepath - str : full filepath of the excel course data that will be read, or of an instance bundle
+                         written by write_instance_bundle, which is loaded as is
+        categorical_ids - bool : if True, the id columns subject_course_section, subject_course_section_occurrence and full_time
+                                 are stored as categoricals, which saves memory on large catalogs
 
     Output:
         df - pandas.DataFrame: data pulled from filepath
@@ -169,6 +158,12 @@ def clean_course_data(filepath):
     Todo: the waring for uniqueness should actually be an error. Since this is calaculated internall it should always be unique
     """
 
+    if is_instance_bundle(filepath):
+        course_data = read_instance_bundle(filepath)
+        if categorical_ids:
+            course_data = set_categorical_ids(course_data)
+        return course_data
+
     course_data = read_data(filepath, course_columns, course_columns_optional)
 
     course_data['subject_course_section'] = course_data["subject_code"].astype(str) + "_" + course_data["course_number"].astype(str)  \
@@ -187,6 +182,20 @@ def clean_course_data(filepath):
     #single column to keep track of course timeslot
     course_data['full_time'] = course_data['days'] + "_" + course_data['begin_time'].astype(str) + "_" + course_data['end_time'].astype(str)
 
+    if categorical_ids:
+        course_data = set_categorical_ids(course_data)
+
+    return course_data
+
+def set_categorical_ids(course_data):
+    """
+    Input:
+        course_data - pd.DataFrame: cleaned course dataframe
+    Output:
+        course_data - pd.DataFrame: same as input, but the id columns are stored as categoricals
+    """
+    for id_column in ["subject_course_section", "subject_course_section_occurrence", "full_time"]:
+        course_data[id_column] = course_data[id_column].astype("category")
     return course_data
 
 def separate_online_courses(course_data):
@@ -222,8 +231,12 @@ def clean_room_data(filepath):
 
     Should be called to load room dataframe before being passed into the constructor for RoomAssignmentOpt
     Dataprocessing is very minimal, and mainly to ensure standardization of column names for RoomAssignmentOpt
+    If filepath is an instance bundle, the room data it holds is returned as is
     """
 
+    if is_instance_bundle(filepath):
+        return read_instance_bundle(filepath)
+
     room_data = read_data(filepath, room_columns)
 
     if len(room_data["bldg_room"].unique()) != len(room_data):
@@ -263,6 +276,25 @@ def clean_room_assignment_output_data(filepath):
 
     return output_data
 
+def read_solution_file(filepath):
+    """
+    Input:
+        filepath - str: full filepath of a gurobi .sol file
+    Output:
+        solution - generator of (str, float): name and value of each variable in the file
+
+    The file is read one line at a time, so the solution is never held in memory as a whole.
+    Comment lines, such as the header with the objective value, are skipped
+    """
+
+    with open(filepath) as solution_file:
+        for line in solution_file:
+            line = line.strip()
+            if len(line) == 0 or line.startswith("#"):
+                continue
+            var_name, value = line.rsplit(None, 1)
+            yield var_name, float(value)
+
 def pad_str_prefix(str_object, desired_length, pad_value):
     """
     Input:
@@ -287,6 +319,21 @@ def pad_str_prefix(str_object, desired_length, pad_value):
         return pad_str_prefix(pad_value + str_object, desired_length, pad_value)
 
 
+def pad_building_number(building_number):
+    """
+    Input:
+        building_number - pd.Series: building numbers
+    Output:
+        building_number - pd.Series: same values, except that those shorter than 3 characters are zero filled strings, e.g. 12 becomes "012"
+
+    Vectorized equivalent of applying pad_str_prefix(str(building_number), 3, "0") to the short building numbers
+    """
+    building_number_str = building_number.map(str)
+    is_short = building_number_str.str.len() < 3
+    if not is_short.any():
+        return building_number
+    return building_number.where(~is_short, building_number_str.str.rjust(3, "0"))
+
 def clean_building_location_data(filepath, course_data=None):
     """
     Input: 
@@ -297,17 +344,20 @@ def clean_building_location_data(filepath, course_data=None):
         df - pandas.DataFrame: data pulled from filepath
 
     Should be called to load building location dataframe before being passed into the constructor for RoomAssignmentModePreferencesContactyOpt
+    If filepath is an instance bundle, the building location data it holds is returned as is. It was checked against course data when it was written
     """
 
+    if is_instance_bundle(filepath):
+        return read_instance_bundle(filepath)
+
     building_location_data = read_data(filepath, building_location_columns)
     building_location_data = building_location_data[building_location_data[building_location_columns].notnull()]
-    building_location_data['building_number'] = building_location_data['building_number'].apply(lambda building_number: pad_str_prefix(str(building_number), 3, "0") if len(str(building_number)) < 3  else building_number)
+    building_location_data['building_number'] = pad_building_number(building_location_data['building_number'])
     if len(building_location_data["building_number"].unique()) != len(building_location_data):
             warnings.warn("""Each row of the building location dataset should have unique values for the column: building_number""")
 
     if course_data is not None and "building_number" in course_data:
-        buildings_in_course_data = set(course_data['building_number'])
-        buildings_in_course_data = set(pad_str_prefix(str(building_number), 3, "0") if len(str(building_number)) < 3  else building_number for building_number in buildings_in_course_data)
+        buildings_in_course_data = set(pad_building_number(pd.Series(course_data['building_number'].unique())))
         buildings_in_building_location_data = set(building_location_data['building_number'])
 
         missing_buildings = {building for building in buildings_in_course_data if building not in buildings_in_building_location_data}
@@ -317,3 +367,118 @@ def clean_building_location_data(filepath, course_data=None):
                             str(missing_buildings))
 
     return building_location_data
+
+def is_instance_bundle(filepath):
+    """
+    Input:
+        filepath - str: filepath of some input data
+    Output:
+        is_bundle - bool: True if filepath is a directory written by write_instance_bundle
+    """
+    return os.path.isdir(filepath) and os.path.isfile(os.path.join(filepath, "schema.json"))
+
+def write_instance_bundle(df, filepath):
+    """
+    Input:
+        df - pd.DataFrame: cleaned course, room or building location data
+        filepath - str: directory to write the bundle to, conventionally ending with instance_bundle_suffix.
+                        An existing bundle at filepath is replaced
+
+    Stores each column, and the index, as a binary numpy file with a fixed dtype:
+        numeric and boolean columns as they are,
+        any other column as int32 categorical codes, whose categories are kept in schema.json together with the original dtype.
+    read_instance_bundle memory-maps the files, so reloading the data does not parse it again
+    """
+    temp_filepath = filepath.rstrip("/") + ".tmp"
+    if os.path.isdir(temp_filepath):
+        shutil.rmtree(temp_filepath)
+    os.makedirs(temp_filepath)
+
+    schema = {"version": INSTANCE_BUNDLE_VERSION,
+              "num_rows": len(df),
+              "index": write_bundle_column(df.index.to_series(), os.path.join(temp_filepath, "index")),
+              "columns": []}
+    for column_id, column in enumerate(df.columns):
+        column_schema = write_bundle_column(df[column], os.path.join(temp_filepath, "column_" + str(column_id)))
+        column_schema["name"] = column
+        schema["columns"].append(column_schema)
+    with open(os.path.join(temp_filepath, "schema.json"), "w") as schema_file:
+        json.dump(schema, schema_file, indent=1)
+
+    if os.path.isdir(filepath):
+        shutil.rmtree(filepath)
+    os.replace(temp_filepath, filepath)
+
+def write_bundle_column(column, filepath_prefix):
+    """
+    Input:
+        column - pd.Series: column to write
+        filepath_prefix - str: filepath of the written array, without the .npy suffix
+    Output:
+        column_schema - dict{str: any}: what read_bundle_column needs to restore the column
+    """
+    dtype = column.dtype
+    if isinstance(dtype, np.dtype) and dtype.kind in "biuf":
+        np.save(filepath_prefix + ".npy", np.ascontiguousarray(column.to_numpy()))
+        return {"kind": "array", "dtype": str(dtype), "file": os.path.basename(filepath_prefix) + ".npy"}
+
+    if isinstance(dtype, pd.CategoricalDtype):
+        codes = column.cat.codes.to_numpy()
+        categories = column.cat.categories
+        ordered = bool(dtype.ordered)
+    else:
+        codes, categories = pd.factorize(column, use_na_sentinel=True)
+        categories = pd.Index(categories)
+        ordered = False
+    category_list = [category.item() if isinstance(category, np.generic) else category for category in categories.tolist()]
+    for category in category_list:
+        if not isinstance(category, (str, int, float, bool)):
+            raise Exception("Column " + str(column.name) + " has a value that can not be written to an instance bundle: " + repr(category))
+
+    np.save(filepath_prefix + ".npy", codes.astype(np.int32))
+    return {"kind": "categorical",
+            "dtype": str(dtype),
+            "categories": category_list,
+            "categories_dtype": str(categories.dtype),
+            "ordered": ordered,
+            "file": os.path.basename(filepath_prefix) + ".npy"}
+
+def read_instance_bundle(filepath):
+    """
+    Input:
+        filepath - str: directory written by write_instance_bundle
+    Output:
+        df - pd.DataFrame: the dataframe that was written
+    """
+    print("filepath in read_instance_bundle: " + filepath)
+    with open(os.path.join(filepath, "schema.json")) as schema_file:
+        schema = json.load(schema_file)
+    if schema.get("version") != INSTANCE_BUNDLE_VERSION:
+        raise Exception("Instance bundle " + filepath + " has version " + str(schema.get("version")) +
+                        ", but version " + str(INSTANCE_BUNDLE_VERSION) + " is expected. It should be written again from the input files")
+
+    df = pd.DataFrame({column_schema["name"]: read_bundle_column(filepath, column_schema) for column_schema in schema["columns"]},
+                      index=pd.Index(read_bundle_column(filepath, schema["index"])),
+                      columns=[column_schema["name"] for column_schema in schema["columns"]])
+    if len(df) != schema["num_rows"]:
+        raise Exception("Instance bundle " + filepath + " is incomplete")
+    return df
+
+def read_bundle_column(filepath, column_schema):
+    """
+    Input:
+        filepath - str: directory of the bundle
+        column_schema - dict{str: any}: as returned by write_bundle_column
+    Output:
+        column - np.array or pd.Categorical or pd.array: values of the column
+    """
+    array = np.load(os.path.join(filepath, column_schema["file"]), mmap_mode="r")
+    if column_schema["kind"] == "array":
+        return array
+
+    categories = pd.Index(column_schema["categories"], dtype=column_schema["categories_dtype"])
+    if column_schema["dtype"] == "category":
+        return pd.Categorical.from_codes(array, categories=categories, ordered=column_schema["ordered"])
+    # code -1 marks a missing value, and picks the nan appended to the categories
+    values = np.append(categories.to_numpy(dtype=object), np.nan)[array]
+    return pd.array(values, dtype=column_schema["dtype"])
@@ -1,9 +1,16 @@
 from gurobipy import *
 import pandas as pd
+import numpy as np
+import copy
+import warnings
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
 from abc import ABC
 from abc import abstractmethod
 import data_process as dp
 import set_process as sp
+from model_ir import ModelIR
+from instrumentation import null_phase
 
 class GenericScheduleOpt(ABC):
     """
@@ -13,6 +20,23 @@ class GenericScheduleOpt(ABC):
     Nor does this class make assumptions about the data inputed to the optimization model
     """
 
+    # names of the parameters bounding sums over the whole problem, e.g. a minimum total of satisfied preferences.
+    # These constraints link all components, so models declaring any of them are not solved by solve_decomposed
+    global_side_constraints = []
+    # names of the attributes that determine the result of get_all_sets_params, e.g. the input data frames.
+    # They key the entries of instance_cache, so attributes only used to build the model, such as tolerances, are not listed
+    preprocessing_inputs = []
+    # InstanceCache storing the sets and parameters computed by get_all_sets_params, or None to always compute them
+    instance_cache = None
+    # names of the preprocessing_inputs that patch_sets_params can update incrementally
+    incremental_inputs = []
+    # If True, prepare_sets_params patches the latest cached run that only differs in incremental_inputs, instead of preprocessing from scratch
+    incremental_preprocessing = False
+    # If True, patched sets and parameters are compared to a rebuild from scratch
+    verify_incremental_preprocessing = False
+    # Instrumentation receiving the timings of the phases of construct_model and output_result, or None to not measure them
+    instrumentation = None
+
     def __init__(self):
         return
 
@@ -40,9 +64,268 @@ class GenericScheduleOpt(ABC):
             Gurobi.model : gurobi model already has variables, constraints, and objective defined.
             Once returned, the user should run model.optimize() to retrieve results
         """
-        self.get_all_sets_params()
+        with self.instrument("construct_model"):
+            self.prepare_sets_params()
+            return self.build_model()
+
+    def instrument(self, phase_name):
+        """
+        Input:
+            phase_name - str: name of a phase, e.g. "set_model_vars"
+        Output:
+            phase - context manager measuring the code it encloses, if instrumentation is set.
+                    Its set_counts method reports sizes, and its enabled attribute tells whether sizes that are costly to get are needed
+        """
+        if self.instrumentation is None:
+            return null_phase
+        return self.instrumentation.phase(phase_name, model_class=type(self).__name__)
+
+    def prepare_sets_params(self):
+        """
+        Calls get_all_sets_params, unless instance_cache holds the sets and parameters of the same inputs,
+        in which case they are loaded from the cache instead.
+        If incremental_preprocessing is True and the cache holds a run that only differs in incremental_inputs,
+        the sets and parameters of that run are patched with patch_sets_params
+        """
+        with self.instrument("prepare_sets_params"):
+            if self.instance_cache is None:
+                self.get_all_sets_params()
+                return
+
+            cache_key = self.instance_cache.get_key(self)
+            state = self.instance_cache.load(cache_key)
+            if state is not None:
+                print("loading sets and parameters from cache")
+                self.__dict__.update(state)
+                return
+
+            input_state = dict(self.__dict__)
+            previous_state = self.instance_cache.load_latest(self) if self.incremental_preprocessing else None
+            if previous_state is not None and self.patch_sets_params(previous_state):
+                if self.verify_incremental_preprocessing:
+                    self.verify_sets_params(input_state)
+            else:
+                self.get_all_sets_params()
+            state = {name: value for name, value in self.__dict__.items() if name not in input_state or input_state[name] is not value}
+            self.instance_cache.store(cache_key, state, lineage_key=self.instance_cache.get_lineage_key(self))
+
+    def patch_sets_params(self, previous_state):
+        """
+        Input:
+            previous_state - dict{str: any}: attributes set by get_all_sets_params for inputs that only differ in incremental_inputs
+        Output:
+            patched - bool: True if the sets and parameters were computed by patching previous_state.
+                      If False, nothing was changed and get_all_sets_params should be called instead
+
+        Descendant classes supporting incremental preprocessing override this method and list the inputs it handles in incremental_inputs
+        """
+        return False
+
+    def verify_sets_params(self, input_state):
+        """
+        Input:
+            input_state - dict{str: any}: attributes of self before its sets and parameters were computed
+
+        Computes the sets and parameters from scratch on a copy of self, and raises an exception if they differ from those of self
+        """
+        fresh_opt = copy.copy(self)
+        fresh_opt.__dict__ = dict(input_state)
+        fresh_opt.get_all_sets_params()
+        differing_names = [name for name, value in fresh_opt.__dict__.items()
+                           if (name not in input_state or input_state[name] is not value) and not _is_equal(value, self.__dict__.get(name))]
+        if len(differing_names) > 0:
+            raise Exception("Incrementally computed sets and parameters differ from a rebuild in: " + ", ".join(differing_names))
+        print("verified incrementally computed sets and parameters against a rebuild")
+
+    def build_model(self):
+        """
+        Output:
+            Gurobi.model : model built from the sets and parameters already computed by get_all_sets_params
+        """
+        model, _ = self.build_model_with_vars()
+        return model
+
+    def build_model_with_vars(self):
+        """
+        Output:
+            Gurobi.model : model built from the sets and parameters already computed by get_all_sets_params
+            model_vars - dict: handles to the variables of the model, as returned by set_model_vars
+        """
         model = Model("")
-        model_vars = self.set_model_vars(model)
-        self.set_model_constrs(model, model_vars)
-        self.set_objective(model, model_vars)
-        return model
\ No newline at end of file
+        # sizes are only available after an update, which is only done when the phases are measured
+        with self.instrument("set_model_vars") as phase:
+            model_vars = self.set_model_vars(model)
+            if phase.enabled:
+                model.update()
+                phase.set_counts(num_vars=model.NumVars)
+        with self.instrument("set_model_constrs") as phase:
+            self.set_model_constrs(model, model_vars)
+            if phase.enabled:
+                model.update()
+                phase.set_counts(num_constrs=model.NumConstrs, num_nonzeros=model.NumNZs)
+        with self.instrument("set_objective") as phase:
+            self.set_objective(model, model_vars)
+            if phase.enabled:
+                model.update()
+                phase.set_counts(num_objectives=model.NumObj)
+        return model, model_vars
+
+    def construct_model_ir(self):
+        """
+        Output:
+            ModelIR : solver independent model, equivalent to the model returned by construct_model.
+            It can be written to MPS or LP files with write_mps and write_lp, or loaded into gurobi with to_gurobi
+        """
+        self.prepare_sets_params()
+        return self.build_model_ir()
+
+    def build_model_ir(self):
+        """
+        Output:
+            ModelIR : model built from the sets and parameters already computed by get_all_sets_params
+        """
+        model_ir = ModelIR()
+        model_ir_vars = self.set_model_ir_vars(model_ir)
+        self.set_model_ir_constrs(model_ir, model_ir_vars)
+        self.set_model_ir_objective(model_ir, model_ir_vars)
+        return model_ir
+
+    def set_model_ir_vars(self, model_ir):
+        raise Exception(type(self).__name__ + " does not support ModelIR")
+
+    def set_model_ir_constrs(self, model_ir, model_ir_vars):
+        raise Exception(type(self).__name__ + " does not support ModelIR")
+
+    def set_model_ir_objective(self, model_ir, model_ir_vars):
+        raise Exception(type(self).__name__ + " does not support ModelIR")
+
+    def get_components(self):
+        """
+        Output:
+            all_component - list: independent parts of the problem, which share no variables or constraints
+
+        Descendant classes supporting solve_decomposed override this method and restrict_to_component
+        """
+        raise Exception(type(self).__name__ + " does not support decomposition")
+
+    def restrict_to_component(self, component):
+        """
+        Input:
+            component - one of the components returned by get_components
+
+        Restricts the sets and parameters, so that build_model only builds the part of the problem in component
+        """
+        raise Exception(type(self).__name__ + " does not support decomposition")
+
+    def solve_decomposed(self, max_workers=None, params=None):
+        """
+        Input:
+            max_workers - int: number of processes solving components concurrently. Defaults to the number of cpus
+            params - dict{str: any}: gurobi parameters set on every component model, e.g. {"OutputFlag": 0, "Threads": 1}
+        Output:
+            solution - dict{str: float}: value of every nonzero variable of the merged solution, by variable name.
+                       It can be passed to output_result in place of a solved model
+
+        Builds one model per component and solves the models concurrently in a process pool.
+        Objectives are sums over the components, so optimizing each component optimizes their sum.
+        A hierarchical objective with a nonzero relative tolerance may give up part of its optimum over the whole problem,
+            which is not the same as giving up that part in each component, so such models are not decomposed
+        """
+        if len(self.global_side_constraints) > 0:
+            raise Exception(type(self).__name__ + " cannot be decomposed, because the following constraints link all components: " +
+                            ", ".join(self.global_side_constraints))
+
+        self.prepare_sets_params()
+        all_component = self.get_components()
+        if len(all_component) > 0:
+            # every component model has the objectives of the whole model, so the smallest one is built to read them
+            tolerance_opt = copy.copy(self)
+            tolerance_opt.restrict_to_component(min(all_component, key=len))
+            relaxed_objective_list = self.get_relaxed_objectives(tolerance_opt.build_model())
+            if len(relaxed_objective_list) > 0:
+                raise Exception(type(self).__name__ + " cannot be decomposed, because the following objectives have a nonzero relative tolerance: " +
+                                ", ".join(relaxed_objective_list) + ". Set their tolerances to 0, or solve the model built by construct_model")
+        print("solving " + str(len(all_component)) + " components")
+
+        solution = {}
+        self.component_status_list = []
+        with ProcessPoolExecutor(max_workers=max_workers,
+                                 mp_context=multiprocessing.get_context("spawn"),
+                                 initializer=_set_decomposed_opt,
+                                 initargs=(self, params)) as executor:
+            for status, component_solution in executor.map(_solve_component, all_component):
+                self.component_status_list.append(status)
+                solution.update(component_solution)
+
+        if any(status != GRB.OPTIMAL for status in self.component_status_list):
+            warnings.warn("Not all components were solved to optimality. Gurobi status of each component: \n" + str(self.component_status_list))
+        return solution
+
+    @staticmethod
+    def get_relaxed_objectives(model):
+        """
+        Input:
+            model - Gurobi.model: model built by build_model
+        Output:
+            relaxed_objective_list - list[str]: objectives with a nonzero relative tolerance, which lets objectives of lower priority degrade them.
+                                     The tolerances of the objectives of the lowest priority have no effect, so they are not listed
+        """
+        model.update()
+        if not model.IsMultiObj:
+            return []
+        objective_list = list()
+        for objective_index in range(model.NumObj):
+            model.setParam("ObjNumber", objective_index)
+            objective_list.append((objective_index, model.ObjNName, model.ObjNPriority, model.ObjNRelTol))
+        lowest_priority = min(priority for _, _, priority, _ in objective_list)
+        return [(objective_name or "objective " + str(objective_index)) + " (priority " + str(priority) + ", relative tolerance " + str(reltol) + ")"
+                for objective_index, objective_name, priority, reltol in objective_list if priority > lowest_priority and reltol != 0]
+
+
+def _is_equal(value, other_value):
+    """
+    Input:
+        value, other_value - any: sets, parameters, or containers of them
+    Output:
+        is_equal - bool: True if both have the same type and content. numpy arrays must also have the same dtype
+    """
+    if type(value) is not type(other_value):
+        return False
+    if isinstance(value, np.ndarray):
+        return value.dtype == other_value.dtype and value.shape == other_value.shape and np.array_equal(value, other_value, equal_nan=value.dtype.kind in "fc")
+    if isinstance(value, (pd.DataFrame, pd.Series, pd.api.extensions.ExtensionArray)):
+        return value.equals(other_value)
+    if isinstance(value, dict):
+        return value.keys() == other_value.keys() and all(_is_equal(item, other_value[key]) for key, item in value.items())
+    if isinstance(value, (list, tuple)):
+        return len(value) == len(other_value) and all(_is_equal(item, other_item) for item, other_item in zip(value, other_value))
+    return bool(value == other_value)
+
+
+#schedule optimization object and gurobi parameters of the current worker process of solve_decomposed
+_decomposed_opt = None
+_decomposed_params = None
+
+def _set_decomposed_opt(opt, params):
+    global _decomposed_opt, _decomposed_params
+    _decomposed_opt = opt
+    _decomposed_params = params
+
+def _solve_component(component):
+    """
+    Input:
+        component - one of the components returned by get_components
+    Output:
+        status - int: gurobi status of the component model
+        component_solution - dict{str: float}: value of every nonzero variable, by variable name
+    """
+    opt = copy.copy(_decomposed_opt)
+    opt.restrict_to_component(component)
+    model = opt.build_model()
+    for param_name, param_value in (_decomposed_params or {}).items():
+        model.setParam(param_name, param_value)
+    model.optimize()
+    if model.SolCount == 0:
+        raise Exception("No solution was found for a component, gurobi status: " + str(model.Status))
+    component_solution = {var.varName: round(value) for var, value in zip(model.getVars(), model.getAttr("X", model.getVars())) if round(value) != 0}
+    return model.Status, component_solution
\ No newline at end of file
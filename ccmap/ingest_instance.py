@@ -0,0 +1,66 @@
+import os
+import sys
+
+import data_process as dp
+
+
+def read_filepaths(system_arguements):
+    """
+    Input:
+        system_arguements - list[str]: should be directly from sys.argv
+    Output:
+        input_filepaths - list[str]: course data filepath, room data filepath and optionally building location filepath
+        output_directory - str: directory to write the instance bundles to
+    """
+    if len(system_arguements) not in [4, 5]:
+        raise Exception("""ingest_instance requires the following commandline arguments:
+                        course_data_filepath, room_data_filepath, [building_location_filepath], output_directory""")
+    return system_arguements[1:-1], system_arguements[-1]
+
+def get_bundle_filepath(input_filepath, output_directory):
+    """
+    Input:
+        input_filepath - str: filepath of a course, room or building location file
+        output_directory - str: directory to write the instance bundle to
+    Output:
+        bundle_filepath - str: filepath of the bundle, which keeps the name of the input file,
+                               so that the read_filenames of the room assignment models accept it in place of the input file
+    """
+    input_filename = os.path.basename(input_filepath).split(".")[0]
+    return os.path.join(output_directory, input_filename + dp.instance_bundle_suffix)
+
+def ingest_instance(course_data_filepath, room_data_filepath, output_directory, building_location_filepath=None):
+    """
+    Input:
+        course_data_filepath - str: filepath of the course data, as excel or csv
+        room_data_filepath - str: filepath of the room data, as excel or csv
+        output_directory - str: directory to write the instance bundles to
+        building_location_filepath - str: filepath of the building location data, as excel or csv. Optional
+    Output:
+        bundle_filepath_list - list[str]: filepaths of the course, room and building location bundles
+
+    Cleans the input files once, and writes each of them as an instance bundle.
+    The bundles can be passed to any room_assignment_* entry point in place of the input files
+    """
+    os.makedirs(output_directory, exist_ok=True)
+
+    course_data = dp.clean_course_data(course_data_filepath)
+    data_list = [(course_data_filepath, course_data),
+                 (room_data_filepath, dp.clean_room_data(room_data_filepath))]
+    if building_location_filepath is not None:
+        data_list.append((building_location_filepath, dp.clean_building_location_data(building_location_filepath, course_data)))
+
+    bundle_filepath_list = []
+    for input_filepath, df in data_list:
+        bundle_filepath = get_bundle_filepath(input_filepath, output_directory)
+        dp.write_instance_bundle(df, bundle_filepath)
+        print("wrote " + bundle_filepath)
+        bundle_filepath_list.append(bundle_filepath)
+    return bundle_filepath_list
+
+
+if __name__ == "__main__":
+
+    input_filepaths, output_directory = read_filepaths(sys.argv)
+    ingest_instance(input_filepaths[0], input_filepaths[1], output_directory,
+                    building_location_filepath=input_filepaths[2] if len(input_filepaths) == 3 else None)
@@ -0,0 +1,162 @@
+import os
+import pickle
+import hashlib
+import pandas as pd
+
+# part of every key, so that entries written by an older version of the preprocessing are never read
+CACHE_FORMAT_VERSION = 1
+
+
+class InstanceCache:
+    """
+    Content addressed on-disk cache of the sets and parameters computed by get_all_sets_params.
+    Entries are keyed on a hash of the model class and of every input listed in the class's preprocessing_inputs,
+        so an entry is invalidated by any change to the cleaned data frames or to the parameters used in preprocessing,
+        while models that only differ in objective tolerances or weights share an entry.
+    The cache directory is kept under max_size_bytes by evicting the least recently used entries
+
+    Runs that only differ in the inputs listed in the class's incremental_inputs, e.g. a few edited course rows, form a lineage.
+    The latest entry of each lineage is remembered, so that the next run of the lineage can patch it instead of preprocessing from scratch
+    """
+
+    def __init__(self, cache_directory, max_size_bytes=2 * 1024 ** 3):
+        self.cache_directory = cache_directory
+        self.max_size_bytes = max_size_bytes
+        os.makedirs(cache_directory, exist_ok=True)
+
+    def get_key(self, opt):
+        """
+        Input:
+            opt - GenericScheduleOpt: schedule optimization object, before get_all_sets_params is called
+        Output:
+            key - str: hex digest identifying the preprocessing inputs of opt
+        """
+        return get_input_hash(opt, opt.preprocessing_inputs)
+
+    def get_lineage_key(self, opt):
+        """
+        Input:
+            opt - GenericScheduleOpt: schedule optimization object
+        Output:
+            lineage_key - str: hex digest identifying the preprocessing inputs of opt that patch_sets_params can not patch
+        """
+        return get_input_hash(opt, [input_name for input_name in opt.preprocessing_inputs if input_name not in opt.incremental_inputs])
+
+    def get_entry_path(self, key):
+        return os.path.join(self.cache_directory, key + ".pkl")
+
+    def get_lineage_path(self, lineage_key):
+        return os.path.join(self.cache_directory, lineage_key + ".latest")
+
+    def load(self, key):
+        """
+        Input:
+            key - str: output of get_key
+        Output:
+            state - dict{str: any}: attributes set by get_all_sets_params, or None if the key is not cached
+        """
+        entry_path = self.get_entry_path(key)
+        try:
+            with open(entry_path, "rb") as entry_file:
+                state = pickle.load(entry_file)
+        except FileNotFoundError:
+            return None
+        except Exception:
+            # an entry that can not be read, e.g. one that was only partially written, is dropped
+            os.remove(entry_path)
+            return None
+        os.utime(entry_path) #entries are evicted by last use
+        return state
+
+    def load_latest(self, opt):
+        """
+        Input:
+            opt - GenericScheduleOpt: schedule optimization object
+        Output:
+            state - dict{str: any}: attributes set by get_all_sets_params in the latest stored run of the lineage of opt,
+                    or None if it is not cached
+        """
+        try:
+            with open(self.get_lineage_path(self.get_lineage_key(opt))) as lineage_file:
+                key = lineage_file.read().strip()
+        except FileNotFoundError:
+            return None
+        return self.load(key)
+
+    def store(self, key, state, lineage_key=None):
+        """
+        Input:
+            key - str: output of get_key
+            state - dict{str: any}: attributes set by get_all_sets_params
+            lineage_key - str: output of get_lineage_key. If given, the entry becomes the latest entry of the lineage
+        """
+        entry_path = self.get_entry_path(key)
+        write_atomic(entry_path, pickle.dumps(state, protocol=pickle.HIGHEST_PROTOCOL))
+        if lineage_key is not None:
+            write_atomic(self.get_lineage_path(lineage_key), key.encode())
+        self.evict(keep_key=key)
+
+    def evict(self, keep_key=None):
+        """
+        Input:
+            keep_key - str: key of an entry that is never evicted, e.g. the one just stored
+
+        Removes the least recently used entries until the cache directory is no larger than max_size_bytes
+        """
+        entry_list = []
+        for entry_name in os.listdir(self.cache_directory):
+            if not entry_name.endswith(".pkl"):
+                continue
+            entry_stat = os.stat(os.path.join(self.cache_directory, entry_name))
+            entry_list.append((entry_stat.st_mtime, entry_stat.st_size, entry_name))
+        total_size = sum(entry_size for _, entry_size, _ in entry_list)
+        for _, entry_size, entry_name in sorted(entry_list):
+            if total_size <= self.max_size_bytes:
+                break
+            if keep_key is not None and entry_name == keep_key + ".pkl":
+                continue
+            os.remove(os.path.join(self.cache_directory, entry_name))
+            total_size -= entry_size
+
+
+def get_input_hash(opt, input_names):
+    """
+    Input:
+        opt - GenericScheduleOpt: schedule optimization object
+        input_names - list[str]: names of the attributes of opt that are hashed
+    Output:
+        input_hash - str: hex digest of the class of opt and of the given attributes
+    """
+    key_hash = hashlib.sha256()
+    key_hash.update(("%s.%s:%d" % (type(opt).__module__, type(opt).__qualname__, CACHE_FORMAT_VERSION)).encode())
+    for input_name in input_names:
+        key_hash.update(input_name.encode())
+        update_hash(key_hash, getattr(opt, input_name, None))
+    return key_hash.hexdigest()
+
+
+def write_atomic(path, content):
+    """
+    Input:
+        path - str: file to write
+        content - bytes: content of the file
+
+    Readers in other processes see either the previous file or the complete new one
+    """
+    temporary_path = path + "." + str(os.getpid()) + ".tmp"
+    with open(temporary_path, "wb") as temporary_file:
+        temporary_file.write(content)
+    os.replace(temporary_path, path)
+
+
+def update_hash(key_hash, value):
+    """
+    Input:
+        key_hash - hashlib hash: hash to update
+        value - any: data frame, or value with a deterministic repr, such as a number, str or bool
+    """
+    if isinstance(value, pd.DataFrame):
+        key_hash.update(repr([(str(column), str(dtype)) for column, dtype in value.dtypes.items()]).encode())
+        key_hash.update(pd.util.hash_pandas_object(value, index=True).values.tobytes())
+    else:
+        key_hash.update(repr(value).encode())
@@ -0,0 +1,191 @@
+import os
+import sys
+import numpy as np
+import pandas as pd
+
+import set_process as sp
+
+
+subject_code_list = ["ACCT", "BIOS", "CHEM", "CS", "ECE", "ECON", "HIST", "MATH", "ME", "PHYS", "PSYC", "SPAN"]
+
+# timeslot patterns: days a section may meet on, start times in minutes since midnight, and meeting length in minutes
+timeslot_pattern_dict = {
+    "MWF": (["MWF"], list(range(8 * 60, 17 * 60, 60)), 50),
+    "TR": (["TR"], list(range(8 * 60, 18 * 60, 90)), 75),
+    "evening": (["M", "T", "W", "R"], [18 * 60, 18 * 60 + 30], 165),
+}
+
+# raw preference of a section, and the delivery modes it allows, as in the examples directory
+preference_dict = {
+    "Hybrid": "hybrid_split, hybrid_touchpoint,residential_spread",
+    "Residential": "residential_spread",
+    "Remote": "remote",
+}
+
+default_room_use_mix = {"Class": 0.85, "Lab": 0.1, "Seminar": 0.05}
+default_timeslot_pattern_mix = {"MWF": 0.45, "TR": 0.4, "evening": 0.15}
+default_preference_mix = {"Hybrid": 0.8, "Residential": 0.15, "Remote": 0.05}
+
+
+def get_section_letters(section_number):
+    """
+    Input:
+        section_number - int: position of a section within its course, starting at 0
+    Output:
+        letters - str: section code, e.g. "A" for 0, "Z" for 25 and "AA" for 26
+    """
+    letters = ""
+    section_number += 1
+    while section_number > 0:
+        section_number, remainder = divmod(section_number - 1, 26)
+        letters = chr(ord("A") + remainder) + letters
+    return letters
+
+def draw_from_mix(rng, mix, size):
+    """
+    Input:
+        rng - np.random.Generator: random number generator
+        mix - dict{str: float}: relative frequency of each value
+        size - int: number of values to draw
+    Output:
+        values - np.array[str]: values drawn from mix
+    """
+    value_list = list(mix.keys())
+    probability = np.array([mix[value] for value in value_list], dtype=float)
+    return np.array(value_list, dtype=object)[rng.choice(len(value_list), size=size, p=probability / probability.sum())]
+
+def draw_lognormal(rng, median, sigma, size, lower, upper):
+    """
+    Output:
+        values - np.array[int]: lognormal values with the given median, rounded and clipped to [lower, upper]
+    """
+    return np.clip(np.round(rng.lognormal(np.log(median), sigma, size)), lower, upper).astype(np.int64)
+
+def generate_instance(num_section,
+                      num_room=None,
+                      num_building=None,
+                      room_use_mix=None,
+                      enrollment_median=30,
+                      enrollment_sigma=0.8,
+                      capacity_median=40,
+                      capacity_sigma=0.6,
+                      timeslot_pattern_mix=None,
+                      preference_mix=None,
+                      exclusively_online_fraction=0.03,
+                      keep_assigned_room_fraction=0.02,
+                      seed=0):
+    """
+    Input:
+        num_section - int: number of course sections
+        num_room - int: number of rooms. Defaults to one room for every 25 sections, about what a room holds in a week
+        num_building - int: number of buildings. Defaults to one building for every 15 rooms
+        room_use_mix - dict{str: float}: relative frequency of each room use. Sections use the same mix
+        enrollment_median, enrollment_sigma - float: lognormal distribution of section enrollments
+        capacity_median, capacity_sigma - float: lognormal distribution of room capacities
+        timeslot_pattern_mix - dict{str: float}: relative frequency of each pattern of timeslot_pattern_dict
+        preference_mix - dict{str: float}: relative frequency of each raw preference of preference_dict
+        exclusively_online_fraction - float: fraction of sections that are exclusively online
+        keep_assigned_room_fraction - float: fraction of sections that must keep their current room
+        seed - int: seed of the random number generator. The same arguments always give the same instance
+    Output:
+        course_data - pd.DataFrame: course sections, with the columns of examples/example_course_sections.csv
+        room_data - pd.DataFrame: rooms, with the columns of examples/example_classrooms.csv
+        building_location_data - pd.DataFrame: buildings, with the columns of examples/example_coordinates.csv
+
+    Every section is currently assigned to a room of its use, which is taken as its building number and room
+    """
+    rng = np.random.default_rng(seed)
+    num_room = max(1, num_section // 25) if num_room is None else num_room
+    num_building = max(1, num_room // 15) if num_building is None else num_building
+    room_use_mix = default_room_use_mix if room_use_mix is None else room_use_mix
+    timeslot_pattern_mix = default_timeslot_pattern_mix if timeslot_pattern_mix is None else timeslot_pattern_mix
+    preference_mix = default_preference_mix if preference_mix is None else preference_mix
+
+    # buildings around the example campus. The example coordinates list the longitude under latitude, which is kept here
+    building_number = np.arange(100, 100 + num_building)
+    building_location_data = pd.DataFrame({"building_number": building_number,
+                                           "latitude": np.round(-84.395 + rng.uniform(-0.01, 0.01, num_building), 8),
+                                           "longitude": np.round(33.776 + rng.uniform(-0.005, 0.005, num_building), 8)})
+
+    room_building_number = building_number[rng.integers(0, num_building, num_room)]
+    room_number = np.zeros(num_room, dtype=np.int64)
+    for building_id in range(num_building):
+        building_room_id = np.flatnonzero(room_building_number == building_number[building_id])
+        room_number[building_room_id] = 101 + np.arange(len(building_room_id))
+    room_use = draw_from_mix(rng, room_use_mix, num_room)
+    room_data = pd.DataFrame({"bldg_room": [str(building) + "_" + str(room) for building, room in zip(room_building_number, room_number)],
+                              "capacity": draw_lognormal(rng, capacity_median, capacity_sigma, num_room, 8, 500),
+                              "use": room_use})
+
+    # between one and four sections per course
+    num_section_course = rng.integers(1, 5, num_section)
+    section_course_id = np.repeat(np.arange(num_section), num_section_course)[:num_section]
+    section_number = np.arange(num_section) - np.searchsorted(section_course_id, section_course_id)
+
+    # sections only use room uses that some room has
+    section_room_use = draw_from_mix(rng, {use: share for use, share in room_use_mix.items() if use in set(room_use)}, num_section)
+    section_room_id = np.zeros(num_section, dtype=np.int64)
+    for use in sorted(set(section_room_use)):
+        use_section_id = np.flatnonzero(section_room_use == use)
+        use_room_id = np.flatnonzero(room_use == use)
+        section_room_id[use_section_id] = use_room_id[rng.integers(0, len(use_room_id), len(use_section_id))]
+
+    section_pattern = draw_from_mix(rng, timeslot_pattern_mix, num_section)
+    days = np.empty(num_section, dtype=object)
+    begin_minute = np.zeros(num_section, dtype=np.int64)
+    end_minute = np.zeros(num_section, dtype=np.int64)
+    for pattern in sorted(set(section_pattern)):
+        pattern_days, pattern_start_minute, pattern_length = timeslot_pattern_dict[pattern]
+        pattern_section_id = np.flatnonzero(section_pattern == pattern)
+        days[pattern_section_id] = np.array(pattern_days, dtype=object)[rng.integers(0, len(pattern_days), len(pattern_section_id))]
+        begin_minute[pattern_section_id] = np.array(pattern_start_minute)[rng.integers(0, len(pattern_start_minute), len(pattern_section_id))]
+        end_minute[pattern_section_id] = begin_minute[pattern_section_id] + pattern_length
+
+    raw_preference = draw_from_mix(rng, preference_mix, num_section)
+    course_data = pd.DataFrame({
+        "Subject Code": np.array(subject_code_list, dtype=object)[section_course_id % len(subject_code_list)],
+        "Course Number": 1000 + section_course_id // len(subject_code_list),
+        "Course Section": [get_section_letters(number) for number in section_number.tolist()],
+        "Enrollment": draw_lognormal(rng, enrollment_median, enrollment_sigma, num_section, 3, 400),
+        "Days": days,
+        "Begin Time": [int(sp.get_time_str(minute)) for minute in begin_minute.tolist()],
+        "End Time": [int(sp.get_time_str(minute)) for minute in end_minute.tolist()],
+        "Building Number": room_building_number[section_room_id],
+        "Room": room_number[section_room_id],
+        "Exclusively Online": (rng.random(num_section) < exclusively_online_fraction).astype(np.int64),
+        "Room Use": section_room_use,
+        "keep assigned room": (rng.random(num_section) < keep_assigned_room_fraction).astype(np.int64),
+        "Raw Preference": raw_preference,
+        "Preference": [preference_dict[preference] for preference in raw_preference],
+    })
+
+    return course_data, room_data, building_location_data
+
+def write_instance(course_data, room_data, building_location_data, output_directory, instance_name):
+    """
+    Input:
+        course_data, room_data, building_location_data - pd.DataFrame: output of generate_instance
+        output_directory - str: directory to write the csv files to
+        instance_name - str: suffix of the file names
+    Output:
+        course_data_filepath, room_data_filepath, building_location_filepath - str: filepaths of the written files.
+            They are named as read_filenames of the room assignment models expects
+    """
+    os.makedirs(output_directory, exist_ok=True)
+    course_data_filepath = os.path.join(output_directory, "room_assignment_opt_courses_" + instance_name + ".csv")
+    room_data_filepath = os.path.join(output_directory, "room_assignment_opt_rooms_" + instance_name + ".csv")
+    building_location_filepath = os.path.join(output_directory, "building_location_" + instance_name + ".csv")
+    course_data.to_csv(course_data_filepath, index=False)
+    room_data.to_csv(room_data_filepath, index=False)
+    building_location_data.to_csv(building_location_filepath, index=False)
+    return course_data_filepath, room_data_filepath, building_location_filepath
+
+
+if __name__ == "__main__":
+
+    if len(sys.argv) < 3:
+        raise Exception("instance_generator requires the following commandline arguments: num_section, output_directory, [seed]")
+    num_section = int(sys.argv[1])
+    seed = int(sys.argv[3]) if len(sys.argv) > 3 else 0
+    filepaths = write_instance(*generate_instance(num_section, seed=seed), sys.argv[2], str(num_section) + "_" + str(seed))
+    print("wrote " + ", ".join(filepaths))
@@ -0,0 +1,156 @@
+import sys
+import json
+import time
+import logging
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+
+def get_peak_rss_mb():
+    """
+    Output:
+        peak_rss_mb - float: largest resident set size of the process so far, in MB. None where the resource module is unavailable, e.g. on windows
+    """
+    if resource is None:
+        return None
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # linux reports kilobytes, macos reports bytes
+    return peak_rss / 2**20 if sys.platform == "darwin" else peak_rss / 2**10
+
+
+class Instrumentation:
+    """
+    Measures the phases of building and solving a model, and passes one record per phase to a sink.
+    A record holds:
+        phase - str: name of the phase, e.g. "set_model_constrs"
+        path - str: names of the enclosing phases and the phase, separated by "/"
+        wall_seconds, cpu_seconds - float: elapsed and process cpu time of the phase
+        peak_rss_delta_mb - float: growth of the peak resident set size of the process during the phase
+        counts - dict{str: int}: sizes reported by the phase, e.g. the number of variables
+        and the fields passed to phase, e.g. the model class
+    Records are emitted when a phase ends, so nested phases are emitted before the phase enclosing them
+    """
+
+    def __init__(self, sink):
+        """
+        Input:
+            sink - object with an emit(record) method, e.g. JsonLinesSink, LoggingSink or MemorySink
+        """
+        self.sink = sink
+        self.phase_stack = list()
+
+    def phase(self, phase_name, **fields):
+        """
+        Input:
+            phase_name - str: name of the phase
+            fields - any: added to the record as they are
+        Output:
+            phase - Phase: context manager measuring the code it encloses
+        """
+        return Phase(self, phase_name, fields)
+
+
+class Phase:
+    enabled = True
+
+    def __init__(self, instrumentation, phase_name, fields):
+        self.instrumentation = instrumentation
+        self.phase_name = phase_name
+        self.fields = fields
+        self.counts = dict()
+
+    def __enter__(self):
+        self.instrumentation.phase_stack.append(self.phase_name)
+        self.path = "/".join(self.instrumentation.phase_stack)
+        self.start_time = time.time()
+        self.start_peak_rss_mb = get_peak_rss_mb()
+        self.start_cpu_seconds = time.process_time()
+        self.start_wall_seconds = time.perf_counter()
+        return self
+
+    def set_counts(self, **counts):
+        """
+        Input:
+            counts - int: sizes to report for the phase, e.g. set_counts(num_vars=model.NumVars)
+        """
+        self.counts.update(counts)
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        wall_seconds = time.perf_counter() - self.start_wall_seconds
+        cpu_seconds = time.process_time() - self.start_cpu_seconds
+        peak_rss_mb = get_peak_rss_mb()
+        self.instrumentation.phase_stack.pop()
+        record = {"phase": self.phase_name,
+                  "path": self.path,
+                  "start_time": self.start_time,
+                  "wall_seconds": wall_seconds,
+                  "cpu_seconds": cpu_seconds,
+                  "peak_rss_delta_mb": None if peak_rss_mb is None else peak_rss_mb - self.start_peak_rss_mb,
+                  "counts": self.counts}
+        record.update(self.fields)
+        if exc_type is not None:
+            record["error"] = exc_type.__name__ + ": " + str(exc_value)
+        self.instrumentation.sink.emit(record)
+        return False
+
+
+class NullPhase:
+    """
+    Stands in for Phase when instrumentation is disabled, so that instrumented code runs unchanged at almost no cost
+    """
+    enabled = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
+
+    def set_counts(self, **counts):
+        pass
+
+null_phase = NullPhase()
+
+
+class JsonLinesSink:
+    """
+    Appends each record to a file as one line of json
+    """
+
+    def __init__(self, filepath):
+        self.filepath = filepath
+
+    def emit(self, record):
+        with open(self.filepath, "a") as record_file:
+            record_file.write(json.dumps(record, default=str) + "\n")
+
+
+class LoggingSink:
+    """
+    Logs each record with the logging module, as a short message followed by the record as json
+    """
+
+    def __init__(self, logger_name="ccmap", level=logging.INFO):
+        self.logger_name = logger_name
+        self.level = level
+
+    def emit(self, record):
+        logging.getLogger(self.logger_name).log(self.level, "%s took %.3fs: %s", record["path"], record["wall_seconds"], json.dumps(record, default=str))
+
+
+class MemorySink:
+    """
+    Keeps the records in a list, e.g. to check them in tests
+    """
+
+    def __init__(self):
+        self.records = list()
+
+    def emit(self, record):
+        self.records.append(record)
+
+    def get_records(self, phase_name):
+        return [record for record in self.records if record["phase"] == phase_name]
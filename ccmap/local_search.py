@@ -0,0 +1,186 @@
+import math
+import random
+import time
+import numpy as np
+
+
+def anneal_room_assignment(section_room_indptr,
+                           section_room_indices,
+                           pair_gain,
+                           pair_bound_coeff,
+                           bound_rhs,
+                           timeslot_mask_section_list,
+                           room_count_list,
+                           initial_pair_id=None,
+                           max_iterations=None,
+                           time_limit=None,
+                           seed=0):
+    """
+    Input:
+        section_room_indptr, section_room_indices - np.array[int]: output of sp.get_section_room_csr
+        pair_gain - np.array[float]: weighted objective coefficient of each (section, room) pair, which is maximized
+        pair_bound_coeff - np.array[float]: shape (number of pairs, number of bounds). Coefficient of each pair in each bounded sum
+        bound_rhs - list[float]: lower bound of each bounded sum
+        timeslot_mask_section_list - list[int]: timeslot bitset of each section id, see sp.get_timeslot_mask_section_dict
+        room_count_list - list[int]: number of sections each room id may hold at the same time
+        initial_pair_id - array-like[int]: assigned pairs of a conflict free starting solution, e.g. from sp.get_greedy_room_assignment
+        max_iterations - int: number of moves tried. Defaults to 100 moves per (section, room) pair
+        time_limit - float: seconds after which the search stops, even if max_iterations is not reached
+        seed - int: seed of the random number generator
+    Output:
+        best_pair_id - np.array[int]: sorted ids of the assigned pairs of the best solution found
+        search_info - dict{str: any}: "objective", "bound_value" and "feasible" of the best solution, and "iterations" performed
+
+    Simulated annealing over room assignments, with three moves:
+        relocate - move a section to another available room, or from remote to a room
+        swap - exchange the rooms of two assigned sections
+        make remote - unassign a section
+    Each move is evaluated incrementally from the coefficients of the pairs it changes.
+    Room occupancy is kept as a count per room and simplified timeslot, so conflicts are checked over the timeslots of the moved sections only.
+    Violated bounds are penalized, and the best solution satisfying all bounds is returned if one was visited.
+    Given a seed, the search is deterministic unless it is stopped by time_limit
+    """
+
+    rng = random.Random(seed)
+    num_section = len(section_room_indptr) - 1
+    num_bound = len(bound_rhs)
+    pair_section_id = np.repeat(np.arange(num_section), np.diff(section_room_indptr)).tolist()
+    section_room_indptr = section_room_indptr.tolist()
+    section_room_indices = section_room_indices.tolist()
+    pair_bound_coeff = np.asarray(pair_bound_coeff, dtype=float).reshape(len(section_room_indices), num_bound)
+
+    # a unit of violation of any bound costs more than the largest gain of a single pair
+    bound_penalty = [2 * (float(np.abs(pair_gain).max(initial=0)) + 1) / float(np.abs(bound_coeff[bound_coeff != 0]).min(initial=1))
+                     for bound_coeff in pair_bound_coeff.T]
+    pair_gain = np.asarray(pair_gain, dtype=float).tolist()
+    pair_bound_coeff = pair_bound_coeff.tolist()
+
+    timeslot_section_list = [[bit for bit in range(timeslot_mask.bit_length()) if timeslot_mask >> bit & 1] for timeslot_mask in timeslot_mask_section_list]
+    num_timeslot = max([timeslot[-1] + 1 for timeslot in timeslot_section_list if len(timeslot) > 0], default=0)
+    pair_id_room_section_list = [{section_room_indices[pair_id]: pair_id for pair_id in range(section_room_indptr[section_id], section_room_indptr[section_id + 1])}
+                                 for section_id in range(num_section)]
+    movable_section_list = [section_id for section_id in range(num_section) if section_room_indptr[section_id + 1] > section_room_indptr[section_id]]
+    if len(movable_section_list) == 0:
+        return np.zeros(0, dtype=np.int64), {"objective": 0.0, "bound_value": [0.0] * num_bound, "feasible": all(rhs <= 0 for rhs in bound_rhs), "iterations": 0}
+
+    occupancy_room_list = [[0] * num_timeslot for _ in room_count_list]
+    section_room_list = [list() for _ in room_count_list] #assigned sections of each room, for picking swap partners
+    pair_id_section_list = [-1] * num_section
+    objective = 0.0
+    bound_value = [0.0] * num_bound
+
+    def violation_penalty(current_bound_value):
+        return sum(penalty * max(0.0, rhs - value) for penalty, rhs, value in zip(bound_penalty, bound_rhs, current_bound_value))
+
+    def fits(section_id, room_id, leaving_section_id=-1):
+        occupancy = occupancy_room_list[room_id]
+        room_count = room_count_list[room_id]
+        leaving_timeslot = set(timeslot_section_list[leaving_section_id]) if leaving_section_id >= 0 else ()
+        return all(occupancy[timeslot] - (timeslot in leaving_timeslot) < room_count for timeslot in timeslot_section_list[section_id])
+
+    def set_pair(section_id, pair_id):
+        nonlocal objective
+        old_pair_id = pair_id_section_list[section_id]
+        if old_pair_id >= 0:
+            room_id = section_room_indices[old_pair_id]
+            for timeslot in timeslot_section_list[section_id]:
+                occupancy_room_list[room_id][timeslot] -= 1
+            section_room_list[room_id].remove(section_id)
+            objective -= pair_gain[old_pair_id]
+            for bound in range(num_bound):
+                bound_value[bound] -= pair_bound_coeff[old_pair_id][bound]
+        if pair_id >= 0:
+            room_id = section_room_indices[pair_id]
+            for timeslot in timeslot_section_list[section_id]:
+                occupancy_room_list[room_id][timeslot] += 1
+            section_room_list[room_id].append(section_id)
+            objective += pair_gain[pair_id]
+            for bound in range(num_bound):
+                bound_value[bound] += pair_bound_coeff[pair_id][bound]
+        pair_id_section_list[section_id] = pair_id
+
+    def get_delta(change_list):
+        #change_list - list[(section_id, new_pair_id)]
+        objective_delta = 0.0
+        new_bound_value = list(bound_value)
+        for section_id, new_pair_id in change_list:
+            old_pair_id = pair_id_section_list[section_id]
+            for pair_id, sign in [(old_pair_id, -1), (new_pair_id, 1)]:
+                if pair_id >= 0:
+                    objective_delta += sign * pair_gain[pair_id]
+                    for bound in range(num_bound):
+                        new_bound_value[bound] += sign * pair_bound_coeff[pair_id][bound]
+        return objective_delta - violation_penalty(new_bound_value) + violation_penalty(bound_value)
+
+    def propose_move():
+        section_id = rng.choice(movable_section_list)
+        old_pair_id = pair_id_section_list[section_id]
+        move_type = rng.random()
+        if old_pair_id >= 0 and move_type < 0.1:
+            return [(section_id, -1)]
+        pair_id = rng.randrange(section_room_indptr[section_id], section_room_indptr[section_id + 1])
+        if pair_id == old_pair_id:
+            return None
+        room_id = section_room_indices[pair_id]
+        if old_pair_id >= 0 and move_type < 0.4 and len(section_room_list[room_id]) > 0:
+            other_section_id = rng.choice(section_room_list[room_id])
+            other_pair_id = pair_id_room_section_list[other_section_id].get(section_room_indices[old_pair_id], -1)
+            if other_pair_id >= 0 and fits(section_id, room_id, other_section_id) and fits(other_section_id, section_room_indices[old_pair_id], section_id):
+                return [(section_id, pair_id), (other_section_id, other_pair_id)]
+            return None
+        if fits(section_id, room_id):
+            return [(section_id, pair_id)]
+        return None
+
+    def apply_move(change_list):
+        #sections leave their rooms before entering new ones, so that a swap never overfills a room
+        for section_id, _ in change_list:
+            set_pair(section_id, -1)
+        for section_id, new_pair_id in change_list:
+            set_pair(section_id, new_pair_id)
+
+    for pair_id in ([] if initial_pair_id is None else np.asarray(initial_pair_id, dtype=np.int64).tolist()):
+        set_pair(pair_section_id[pair_id], pair_id)
+
+    if max_iterations is None:
+        max_iterations = 100 * max(len(section_room_indices), 1)
+
+    # the starting temperature accepts an average worsening move about half of the time
+    sample_delta = [abs(get_delta(move)) for move in (propose_move() for _ in range(min(100, max_iterations))) if move is not None]
+    initial_temperature = (sum(sample_delta) / len(sample_delta) if len(sample_delta) > 0 else 1.0) / math.log(2) + 1e-9
+    final_temperature = initial_temperature * 1e-4
+
+    def get_penalized_key():
+        feasible = violation_penalty(bound_value) == 0
+        return (feasible, objective if feasible else objective - violation_penalty(bound_value))
+
+    best_key = get_penalized_key()
+    best_pair_id_section_list = list(pair_id_section_list)
+    best_bound_value = list(bound_value)
+    best_objective = objective
+    start_time = time.time()
+    iteration = 0
+    for iteration in range(1, max_iterations + 1):
+        if time_limit is not None and iteration % 1000 == 0 and time.time() - start_time > time_limit:
+            break
+        change_list = propose_move()
+        if change_list is None:
+            continue
+        delta = get_delta(change_list)
+        temperature = initial_temperature * (final_temperature / initial_temperature) ** (iteration / max_iterations)
+        if delta >= 0 or rng.random() < math.exp(delta / temperature):
+            apply_move(change_list)
+            current_key = get_penalized_key()
+            if current_key > best_key:
+                best_key = current_key
+                best_pair_id_section_list = list(pair_id_section_list)
+                best_bound_value = list(bound_value)
+                best_objective = objective
+
+    best_pair_id = np.array(sorted(pair_id for pair_id in best_pair_id_section_list if pair_id >= 0), dtype=np.int64)
+    search_info = {"objective": best_objective,
+                   "bound_value": best_bound_value,
+                   "feasible": best_key[0],
+                   "iterations": iteration}
+    return best_pair_id, search_info
+
@@ -0,0 +1,327 @@
+import numpy as np
+
+try:
+    import scipy.sparse as sparse
+except ImportError:
+    sparse = None
+
+
+class ModelIR:
+    """
+    Solver independent mixed integer linear program, stored in numpy arrays:
+        variables - name, lower bound, upper bound and type ("B" binary, "I" integer or "C" continuous) of each variable
+        constraints - sparse rows in csr format, each with a sense ("<", ">" or "=") and a right hand side
+        objectives - one coefficient vector per objective, optimized hierarchically by priority as in gurobi's setObjectiveN
+
+    Variables and constraints are added in blocks of arrays, so large models are built without a python loop per term.
+    The model can be written to MPS or LP files, or loaded into gurobi with to_gurobi
+    """
+
+    def __init__(self, name=""):
+        self.name = name
+        self.model_sense = 1 #1 to minimize and -1 to maximize, as gurobi's ModelSense
+        self.var_name = list()
+        self.objective_list = list()
+        self.num_vars = 0
+        self.num_constrs = 0
+        self._var_block_list = list() #(lb, ub, vtype) of each block of variables
+        self._constr_block_list = list() #(indptr, indices, data, sense, rhs) of each block of constraints
+
+    def add_vars(self, var_name, lb=0.0, ub=1.0, vtype="B"):
+        """
+        Input:
+            var_name - list[str]: name of each new variable
+            lb, ub - float or array-like: bounds of the new variables
+            vtype - str or array-like: type of the new variables
+        Output:
+            var_id - np.array[int]: id of each new variable, which is its column in the constraint matrix
+        """
+        num_new_vars = len(var_name)
+        var_id = np.arange(self.num_vars, self.num_vars + num_new_vars)
+        self.var_name.extend(var_name)
+        self._var_block_list.append((np.broadcast_to(np.asarray(lb, dtype=float), num_new_vars),
+                                     np.broadcast_to(np.asarray(ub, dtype=float), num_new_vars),
+                                     np.broadcast_to(np.asarray(vtype, dtype="U1"), num_new_vars)))
+        self.num_vars += num_new_vars
+        return var_id
+
+    def add_constrs(self, indptr, indices, data, sense, rhs):
+        """
+        Input:
+            indptr - array-like[int]: has one more entry than there are new constraints. The terms of the i-th new constraint are
+                                      given by indices[indptr[i]:indptr[i + 1]] and data[indptr[i]:indptr[i + 1]]
+            indices - array-like[int]: variable id of each term
+            data - array-like[float]: coefficient of each term
+            sense - str or array-like: "<", ">" or "=" for each new constraint
+            rhs - float or array-like: right hand side of each new constraint
+        """
+        indptr = np.asarray(indptr, dtype=np.int64)
+        num_new_constrs = len(indptr) - 1
+        self._constr_block_list.append((indptr - indptr[0],
+                                        np.asarray(indices, dtype=np.int64),
+                                        np.asarray(data, dtype=float),
+                                        np.broadcast_to(np.asarray(sense, dtype="U1"), num_new_constrs),
+                                        np.broadcast_to(np.asarray(rhs, dtype=float), num_new_constrs)))
+        self.num_constrs += num_new_constrs
+
+    def add_constr(self, var_id, coeff, sense, rhs):
+        """
+        Input:
+            var_id - array-like[int]: variable id of each term
+            coeff - array-like[float]: coefficient of each term. Terms with a zero coefficient are dropped
+            sense - str: "<", ">" or "="
+            rhs - float: right hand side
+        """
+        var_id = np.asarray(var_id, dtype=np.int64)
+        coeff = np.asarray(coeff, dtype=float)
+        nonzero = coeff != 0
+        self.add_constrs([0, int(nonzero.sum())], var_id[nonzero], coeff[nonzero], sense, rhs)
+
+    def set_objective_n(self, var_id, coeff, constant=0.0, index=0, priority=0, weight=1.0, abstol=1e-6, reltol=0.0, name=None):
+        """
+        Input:
+            var_id - array-like[int]: variable id of each term
+            coeff - array-like[float]: coefficient of each term
+            constant - float: constant term of the objective
+            index, priority, weight, abstol, reltol, name: same meaning as in gurobi's setObjectiveN
+        """
+        coeff_vector = np.zeros(self.num_vars)
+        np.add.at(coeff_vector, np.asarray(var_id, dtype=np.int64), np.asarray(coeff, dtype=float))
+        objective = {"coeff": coeff_vector,
+                     "constant": float(constant),
+                     "index": index,
+                     "priority": priority,
+                     "weight": weight,
+                     "abstol": 1e-6 if abstol is None else abstol,
+                     "reltol": 0.0 if reltol is None else reltol,
+                     "name": "OBJ" + str(index) if name is None else name}
+        self.objective_list = [other_objective for other_objective in self.objective_list if other_objective["index"] != index]
+        self.objective_list.append(objective)
+        self.objective_list.sort(key=lambda objective: objective["index"])
+
+    def get_vars(self):
+        """
+        Output:
+            lb, ub - np.array[float]: bounds of each variable
+            vtype - np.array[str]: type of each variable
+        """
+        if len(self._var_block_list) != 1:
+            self._var_block_list = [(np.concatenate([np.zeros(0)] + [var_block[0] for var_block in self._var_block_list]),
+                                     np.concatenate([np.zeros(0)] + [var_block[1] for var_block in self._var_block_list]),
+                                     np.concatenate([np.zeros(0, dtype="U1")] + [var_block[2] for var_block in self._var_block_list]))]
+        return self._var_block_list[0]
+
+    def get_constrs(self):
+        """
+        Output:
+            indptr, indices, data - np.array: constraint matrix in csr format
+            sense - np.array[str]: sense of each constraint
+            rhs - np.array[float]: right hand side of each constraint
+        """
+        if len(self._constr_block_list) != 1:
+            num_term_constr = np.concatenate([np.zeros(0, dtype=np.int64)] + [np.diff(constr_block[0]) for constr_block in self._constr_block_list])
+            self._constr_block_list = [(np.concatenate([[0], np.cumsum(num_term_constr)]).astype(np.int64),
+                                        np.concatenate([np.zeros(0, dtype=np.int64)] + [constr_block[1] for constr_block in self._constr_block_list]),
+                                        np.concatenate([np.zeros(0)] + [constr_block[2] for constr_block in self._constr_block_list]),
+                                        np.concatenate([np.zeros(0, dtype="U1")] + [constr_block[3] for constr_block in self._constr_block_list]),
+                                        np.concatenate([np.zeros(0)] + [constr_block[4] for constr_block in self._constr_block_list]))]
+        return self._constr_block_list[0]
+
+    def get_objective_coeff(self, objective):
+        # coefficient vectors are padded, since variables may be added after an objective was set
+        return np.concatenate([objective["coeff"], np.zeros(self.num_vars - len(objective["coeff"]))])
+
+    def is_single_objective(self):
+        # a single objective with default settings is written in the standard formats, which every solver reads
+        return len(self.objective_list) == 1 and self.objective_list[0]["weight"] == 1 and self.objective_list[0]["reltol"] == 0
+
+    def write_mps(self, filepath):
+        """
+        Input:
+            filepath - str: path of the .mps file
+
+        Multiple objectives are written in gurobi's extended MPS format, with the priority, weight, abstol and reltol of each N row
+        """
+        lb, ub, vtype = self.get_vars()
+        indptr, indices, data, sense, rhs = self.get_constrs()
+        constr_name = ["R" + str(constr_id) for constr_id in range(self.num_constrs)]
+        objective_coeff_list = [self.get_objective_coeff(objective) for objective in self.objective_list]
+
+        #constraint matrix in csc format, as the COLUMNS section lists the terms of each variable
+        column_order = np.argsort(indices, kind="stable")
+        column_indptr = np.concatenate([[0], np.cumsum(np.bincount(indices, minlength=self.num_vars))]).tolist()
+        column_constr_id = np.repeat(np.arange(self.num_constrs), np.diff(indptr))[column_order].tolist()
+        column_data = data[column_order].tolist()
+
+        with open(filepath, "w") as mps_file:
+            mps_file.write("NAME " + self.name + "\n")
+            mps_file.write("OBJSENSE " + ("MAX" if self.model_sense == -1 else "MIN") + "\n")
+            mps_file.write("ROWS\n")
+            for objective in self.objective_list:
+                if self.is_single_objective():
+                    mps_file.write(" N  " + objective["name"] + "\n")
+                else:
+                    mps_file.write(" N  " + " ".join([objective["name"]] + [_format_number(objective[attr]) for attr in ["priority", "weight", "abstol", "reltol"]]) + "\n")
+            mps_sense_dict = {"<": "L", ">": "G", "=": "E"}
+            for constr_id, constr_sense in enumerate(sense.tolist()):
+                mps_file.write(" " + mps_sense_dict[constr_sense] + "  " + constr_name[constr_id] + "\n")
+
+            mps_file.write("COLUMNS\n")
+            is_integer = False
+            for var_id, var_type in enumerate(vtype.tolist()):
+                if (var_type != "C") != is_integer:
+                    is_integer = var_type != "C"
+                    mps_file.write("    MARKER    'MARKER'    " + ("'INTORG'" if is_integer else "'INTEND'") + "\n")
+                column_line = ["    " + self.var_name[var_id] + "  " + objective["name"] + "  " + _format_number(objective_coeff[var_id]) + "\n"
+                               for objective, objective_coeff in zip(self.objective_list, objective_coeff_list) if objective_coeff[var_id] != 0]
+                column_line.extend("    " + self.var_name[var_id] + "  " + constr_name[constr_id] + "  " + _format_number(coeff) + "\n"
+                                   for constr_id, coeff in zip(column_constr_id[column_indptr[var_id]:column_indptr[var_id + 1]],
+                                                               column_data[column_indptr[var_id]:column_indptr[var_id + 1]]))
+                mps_file.writelines(column_line)
+            if is_integer:
+                mps_file.write("    MARKER    'MARKER'    'INTEND'\n")
+
+            mps_file.write("RHS\n")
+            for objective in self.objective_list:
+                if objective["constant"] != 0:
+                    mps_file.write("    RHS1  " + objective["name"] + "  " + _format_number(-objective["constant"]) + "\n")
+            for constr_id, constr_rhs in enumerate(rhs.tolist()):
+                if constr_rhs != 0:
+                    mps_file.write("    RHS1  " + constr_name[constr_id] + "  " + _format_number(constr_rhs) + "\n")
+
+            mps_file.write("BOUNDS\n")
+            for var_id, (var_lb, var_ub, var_type) in enumerate(zip(lb.tolist(), ub.tolist(), vtype.tolist())):
+                if var_type == "B":
+                    mps_file.write(" BV BND1  " + self.var_name[var_id] + "\n")
+                    continue
+                if var_lb == -np.inf and var_ub == np.inf:
+                    mps_file.write(" FR BND1  " + self.var_name[var_id] + "\n")
+                    continue
+                if var_lb != 0:
+                    mps_file.write((" MI BND1  " + self.var_name[var_id] if var_lb == -np.inf else " LO BND1  " + self.var_name[var_id] + "  " + _format_number(var_lb)) + "\n")
+                if var_ub != np.inf:
+                    mps_file.write(" UP BND1  " + self.var_name[var_id] + "  " + _format_number(var_ub) + "\n")
+            mps_file.write("ENDATA\n")
+
+    def write_lp(self, filepath):
+        """
+        Input:
+            filepath - str: path of the .lp file
+
+        Multiple objectives are written in gurobi's multi-objectives LP section
+        """
+        lb, ub, vtype = self.get_vars()
+        indptr, indices, data, sense, rhs = self.get_constrs()
+        indptr = indptr.tolist()
+        indices = indices.tolist()
+        data = data.tolist()
+
+        with open(filepath, "w") as lp_file:
+            lp_file.write("\\ Model " + self.name + "\n")
+            lp_file.write("Maximize" if self.model_sense == -1 else "Minimize")
+            if self.is_single_objective():
+                lp_file.write("\n")
+            else:
+                lp_file.write(" multi-objectives\n")
+            for objective in self.objective_list:
+                objective_coeff = self.get_objective_coeff(objective)
+                objective_var_id = np.flatnonzero(objective_coeff).tolist()
+                if self.is_single_objective():
+                    lp_file.write("  " + objective["name"] + ":")
+                else:
+                    lp_file.write("  " + objective["name"] + ": " + " ".join(attr_name + "=" + _format_number(objective[attr])
+                                                                            for attr_name, attr in [("Priority", "priority"), ("Weight", "weight"),
+                                                                                                    ("AbsTol", "abstol"), ("RelTol", "reltol")]) + "\n  ")
+                self._write_lp_terms(lp_file, objective_var_id, objective_coeff[objective_var_id].tolist())
+                if objective["constant"] != 0:
+                    lp_file.write(" " + _format_signed_number(objective["constant"]))
+                lp_file.write("\n")
+
+            lp_file.write("Subject To\n")
+            lp_sense_dict = {"<": "<=", ">": ">=", "=": "="}
+            for constr_id, (constr_sense, constr_rhs) in enumerate(zip(sense.tolist(), rhs.tolist())):
+                lp_file.write(" R" + str(constr_id) + ":")
+                if indptr[constr_id + 1] > indptr[constr_id]:
+                    self._write_lp_terms(lp_file, indices[indptr[constr_id]:indptr[constr_id + 1]], data[indptr[constr_id]:indptr[constr_id + 1]])
+                else:
+                    lp_file.write(" 0 " + self.var_name[0])
+                lp_file.write(" " + lp_sense_dict[constr_sense] + " " + _format_number(constr_rhs) + "\n")
+
+            lp_file.write("Bounds\n")
+            for var_id, (var_lb, var_ub, var_type) in enumerate(zip(lb.tolist(), ub.tolist(), vtype.tolist())):
+                if var_type == "B" or (var_lb == 0 and var_ub == np.inf):
+                    continue
+                if var_lb == -np.inf and var_ub == np.inf:
+                    lp_file.write(" " + self.var_name[var_id] + " free\n")
+                else:
+                    lp_file.write(" " + _format_number(var_lb) + " <= " + self.var_name[var_id] + " <= " + _format_number(var_ub) + "\n")
+            for section_name, section_type in [("Binaries", "B"), ("Generals", "I")]:
+                section_var_id = np.flatnonzero(vtype == section_type).tolist()
+                if len(section_var_id) > 0:
+                    lp_file.write(section_name + "\n")
+                    for line_start in range(0, len(section_var_id), 8):
+                        lp_file.write(" " + " ".join(self.var_name[var_id] for var_id in section_var_id[line_start:line_start + 8]) + "\n")
+            lp_file.write("End\n")
+
+    def _write_lp_terms(self, lp_file, var_id, coeff):
+        #terms are split over lines, as some LP readers limit the length of a line
+        for line_start in range(0, len(var_id), 8):
+            if line_start > 0:
+                lp_file.write("\n  ")
+            lp_file.write(" " + " ".join(_format_signed_number(term_coeff) + " " + self.var_name[term_var_id]
+                                         for term_var_id, term_coeff in zip(var_id[line_start:line_start + 8], coeff[line_start:line_start + 8])))
+
+    def to_gurobi(self):
+        """
+        Output:
+            Gurobi.model : model with the same variables, constraints and objectives
+
+        Constraints are loaded with the matrix API if scipy is installed, and row by row otherwise
+        """
+        from gurobipy import Model, LinExpr
+
+        lb, ub, vtype = self.get_vars()
+        indptr, indices, data, sense, rhs = self.get_constrs()
+        model = Model(self.name)
+        X = model.addMVar(self.num_vars, lb=lb, ub=ub, vtype=vtype)
+        model.update()
+        all_var = X.tolist()
+        model.setAttr("VarName", all_var, self.var_name)
+
+        if sparse is not None:
+            model.addMConstr(sparse.csr_matrix((data, indices, indptr), shape=(self.num_constrs, self.num_vars)), X, sense, rhs)
+        else:
+            indptr = indptr.tolist()
+            indices = indices.tolist()
+            data = data.tolist()
+            for constr_id, (constr_sense, constr_rhs) in enumerate(zip(sense.tolist(), rhs.tolist())):
+                model.addLConstr(LinExpr(data[indptr[constr_id]:indptr[constr_id + 1]],
+                                         [all_var[var_id] for var_id in indices[indptr[constr_id]:indptr[constr_id + 1]]]),
+                                 constr_sense, constr_rhs)
+
+        model.ModelSense = self.model_sense
+        for objective in self.objective_list:
+            objective_coeff = self.get_objective_coeff(objective)
+            objective_var_id = np.flatnonzero(objective_coeff).tolist()
+            model.setObjectiveN(LinExpr(objective_coeff[objective_var_id].tolist(), [all_var[var_id] for var_id in objective_var_id]) + objective["constant"],
+                                index=objective["index"],
+                                priority=objective["priority"],
+                                weight=objective["weight"],
+                                abstol=objective["abstol"],
+                                reltol=objective["reltol"],
+                                name=objective["name"])
+        model.update()
+        return model
+
+
+def _format_number(value):
+    # shortest representation that reads back to the same float
+    if value == np.inf:
+        return "inf"
+    if value == -np.inf:
+        return "-inf"
+    value_str = repr(float(value))
+    return value_str[:-2] if value_str.endswith(".0") else value_str
+
+def _format_signed_number(value):
+    return ("- " + _format_number(-value)) if value < 0 else ("+ " + _format_number(value))
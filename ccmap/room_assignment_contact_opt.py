@@ -1,4 +1,5 @@
 import pandas as pd
+import numpy as np
 import sys
 from gurobipy import *
 
@@ -10,6 +11,10 @@ class RoomAssignmentContactyOpt(RoomAssignmentOpt):
     
     model_description = "contact_max"
     informative_output_columns = ["subject_code", "course_number", "course_section", "bldg_room", "delivery_mode", "in_person_hours", "preference"]
+    # "timeslot": one room occupancy constraint per room and simplified timeslot
+    # "clique": one room occupancy constraint per maximal clique of overlapping sections in a room
+    conflict_constraint_strategy = "timeslot"
+    preprocessing_inputs = RoomAssignmentOpt.preprocessing_inputs + ["minimum_section_contact_days", "weeks_in_semester", "conflict_constraint_strategy"]
 
     def __init__(self, course_data, room_data, minimum_section_contact_days, weeks_in_semester):
         super().__init__()
@@ -22,70 +27,227 @@ class RoomAssignmentContactyOpt(RoomAssignmentOpt):
 
     def get_all_sets_params(self):
         super().get_all_sets_params()
-        self.num_weekly_meeting_days_section_dictionary = sp.get_num_weekly_meeting_days(self.timeslot_section_dictionary)
-        self.meeting_hours_section_dictionary = sp.get_meeting_hours(self.timeslot_section_dictionary)
-        self.total_contact_hours_section_room_dict, self.delivery_mode_section_room_dict = sp.get_contact_hours(all_section=self.all_section,
-                                                                                                                all_room=self.all_room,
-                                                                                                                capacity_room_dictionary=self.capacity_room_dictionary,
-                                                                                                                enrollment_section_dictionary=self.enrollment_section_dictionary,
-                                                                                                                meeting_hours_section_dictionary=self.meeting_hours_section_dictionary,
-                                                                                                                num_weekly_meeting_days_section_dictionary=self.num_weekly_meeting_days_section_dictionary,
-                                                                                                                minimum_section_contact_days=self.minimum_section_contact_days,
-                                                                                                                weeks_in_semester=self.weeks_in_semester
-                                                                                                                )
-        self.priority_boost_section_dict = sp.get_priority_boost(self.course_data,
-                                                                self.all_section)
-
-        sp.remove_remote_rooms_availability(self.room_section_dictionary,
-                                            self.section_room_dictionary,
-                                            self.delivery_mode_section_room_dict)
-
-
-    def set_model_vars(self, model):
-        print("defining variables")
-        X_xr = {}
-        for section in self.all_section:
-            for room in self.room_section_dictionary[section]:
-                X_xr[(section, room)] = model.addVar(vtype=GRB.BINARY, name='X_xr[%s+%s]' % (section, room))
-
-        model_vars = {"X_xr": X_xr}
-        return model_vars
+        with self.instrument("sets.contact_hours") as phase:
+            self.num_weekly_meeting_days_section_dictionary = sp.get_num_weekly_meeting_days(self.timeslot_section_dictionary)
+            self.meeting_hours_section_dictionary = sp.get_meeting_hours(self.timeslot_section_dictionary)
+            self.preferred_delivery_mode_section_dict = self.get_preferred_delivery_mode_section_dict()
+            self.total_contact_hours_pair_array, self.delivery_mode_pair_array = self.get_pair_params(["total_contact_hours_pair_array", "delivery_mode_pair_array"],
+                                                                                                     lambda pair_id: self.get_contact_hours_params(preferred_delivery_mode_section_dict=self.preferred_delivery_mode_section_dict,
+                                                                                                                                                   pair_id=pair_id))
+            self.priority_boost_section_dict = sp.get_priority_boost(self.course_data,
+                                                                    self.all_section)
+            self.priority_boost_section_array = np.array([self.priority_boost_section_dict[section] for section in self.all_section], dtype=float)
+
+            # a section may not be taught in a room that would make it remote
+            self.filter_section_room_pairs(self.delivery_mode_pair_array != sp.delivery_mode_list.index("remote"),
+                                           ["total_contact_hours_pair_array", "delivery_mode_pair_array"])
+            self.total_contact_hours_section_room_dict = sp.get_pair_dict(self.all_section,
+                                                                          self.all_room,
+                                                                          self.pair_section_id,
+                                                                          self.section_room_indices,
+                                                                          self.total_contact_hours_pair_array)
+            self.delivery_mode_section_room_dict = sp.get_pair_dict(self.all_section,
+                                                                    self.all_room,
+                                                                    self.pair_section_id,
+                                                                    self.section_room_indices,
+                                                                    np.array(sp.delivery_mode_list)[self.delivery_mode_pair_array])
+            phase.set_counts(num_pairs=len(self.pair_section_id))
+        self.set_room_conflict_sets()
+
+    def set_room_conflict_sets(self):
+        with self.instrument("sets.room_conflict"):
+            if self.conflict_constraint_strategy == "timeslot":
+                self.room_timeslot_section_dict = sp.get_room_timeslot_section_dict(self.room_section_dictionary,
+                                                                                    self.section_timeslot_clash_dictionary)
+            elif self.conflict_constraint_strategy == "clique":
+                self.room_clique_dict = sp.get_room_maximal_clique_dict(self.section_room_dictionary,
+                                                                        self.timeslot_section_dictionary)
+            else:
+                raise Exception("conflict_constraint_strategy must be 'timeslot' or 'clique', but was: " + str(self.conflict_constraint_strategy))
+
+    def update_pair_params(self, pair_id):
+        super().update_pair_params(pair_id)
+        self.total_contact_hours_pair_array[pair_id], self.delivery_mode_pair_array[pair_id] = self.get_contact_hours_params(preferred_delivery_mode_section_dict=self.preferred_delivery_mode_section_dict,
+                                                                                                                             pair_id=pair_id)
+        for section_id, room_id, total_contact_hours, delivery_mode in zip(self.pair_section_id[pair_id].tolist(),
+                                                                             self.section_room_indices[pair_id].tolist(),
+                                                                             self.total_contact_hours_pair_array[pair_id].tolist(),
+                                                                             self.delivery_mode_pair_array[pair_id].tolist()):
+            section_room = (self.all_section[section_id], self.all_room[room_id])
+            self.total_contact_hours_section_room_dict[section_room] = total_contact_hours
+            self.delivery_mode_section_room_dict[section_room] = sp.delivery_mode_list[delivery_mode]
+
+    def get_pair_array_names(self):
+        return super().get_pair_array_names() + ["total_contact_hours_pair_array", "delivery_mode_pair_array"]
+
+    def restrict_to_component(self, component):
+        super().restrict_to_component(component)
+        self.set_room_conflict_sets()
+
+
+    def get_preferred_delivery_mode_section_dict(self):
+        """
+        Output:
+            preferred_delivery_mode_section_dict - dict{str: set(str)}: preferred delivery modes of each section,
+                                                   or None if the model has no mode preferences, as here
+        """
+        return None
+
+    def get_contact_hours_params(self, preferred_delivery_mode_section_dict=None, pair_id=None):
+        """
+        Input:
+            preferred_delivery_mode_section_dict - dict{str: set(str)}: preferred delivery modes of each section, if known
+            pair_id - np.array[int]: ids of the (section, room) pairs to compute parameters for. Defaults to all pairs
+        Output:
+            total_contact_hours_pair_array - np.array[float]: contact hours of each (section, room) pair in pair_id
+            delivery_mode_pair_array - np.array[int]: delivery mode code of each (section, room) pair in pair_id, see sp.delivery_mode_list
+        """
+        if pair_id is None:
+            pair_id = np.arange(len(self.section_room_indices))
+        if preferred_delivery_mode_section_dict is not None:
+            residential_spread_preferred = ["residential_spread" in preferred_delivery_mode_section_dict[section] for section in self.all_section]
+        else:
+            residential_spread_preferred = None
+        return sp.get_contact_hours_pair(pair_section_id=self.pair_section_id[pair_id],
+                                         pair_room_id=self.section_room_indices[pair_id],
+                                         capacity=self.capacity_room_array,
+                                         enrollment=self.enrollment_section_array,
+                                         meeting_hours=[self.meeting_hours_section_dictionary[section] for section in self.all_section],
+                                         weekly_meeting_days=[self.num_weekly_meeting_days_section_dictionary[section] for section in self.all_section],
+                                         minimum_section_contact_days=self.minimum_section_contact_days,
+                                         weeks_in_semester=self.weeks_in_semester,
+                                         residential_spread_preferred=residential_spread_preferred
+                                         )
 
     def set_model_constrs(self, model, model_vars):
         print("setting model constraints")
         X_xr = model_vars["X_xr"]
+        X_xr_pair = model_vars["X_xr_pair"]
+        section_room_indptr = self.section_room_indptr.tolist()
+        section_id_with_room = np.flatnonzero(np.diff(self.section_room_indptr) > 0).tolist()
 
-        model.addConstrs((quicksum(X_xr[(section,room)] for room in self.room_section_dictionary[section]) <= 1
-                                 for section in self.all_section),"")
+        model.addConstrs((quicksum(X_xr_pair[section_room_indptr[section_id]:section_room_indptr[section_id + 1]]) <= 1
+                                 for section_id in section_id_with_room),"")
 
-        model.addConstrs((quicksum(X_xr[(section, room)] for section in set(self.all_section).intersection(set(self.section_room_dictionary[room])).intersection(set(self.section_timeslot_clash_dictionary[day_starttime]))) <= 1
-                                for room in self.all_room for day_starttime in self.all_simple_timeslot), "")
+        if self.conflict_constraint_strategy == "clique":
+            self.set_room_clique_constrs(model, model_vars)
+        else:
+            self.set_room_timeslot_constrs(model, model_vars)
 
+        self.set_side_constrs(model, model_vars)
         return
 
-    def set_contact_hours_objective(self, model, model_vars, index, priority):
+    def get_room_occupancy_sets(self):
+        """
+        Output:
+            room_conflict_dict - dict{(str, any): list[str]}: sections of each room occupancy constraint, by (room, key), where key is
+                                 the simplified timeslot or the clique index, depending on conflict_constraint_strategy.
+                                 At most room_count_dict[room] of the sections may be assigned to the room.
+
+        A constraint is only needed if more sections could use the room at the same time than there are rooms
+        """
+        if self.conflict_constraint_strategy == "clique":
+            return {(room, clique_index): clique for room, all_clique in self.room_clique_dict.items()
+                    for clique_index, clique in enumerate(all_clique) if len(clique) > self.room_count_dict[room]}
+        return {(room, day_starttime): candidate_section for room, timeslot_section_dict in self.room_timeslot_section_dict.items()
+                for day_starttime, candidate_section in timeslot_section_dict.items() if len(candidate_section) > self.room_count_dict[room]}
+
+    def set_room_timeslot_constrs(self, model, model_vars):
+        X_xr = model_vars["X_xr"]
+
+        room_timeslot_conflict = self.get_room_occupancy_sets()
+        model.addConstrs((quicksum(X_xr[(section, room)] for section in room_timeslot_conflict[room, day_starttime]) <= self.room_count_dict[room]
+                                for room, day_starttime in room_timeslot_conflict), "")
+        self.num_skipped_room_timeslot_constrs = len(self.all_room) * len(self.all_simple_timeslot) - len(room_timeslot_conflict)
+        print("skipped " + str(self.num_skipped_room_timeslot_constrs) + " room and timeslot constraints that could not be violated")
+        return
+
+    def set_room_clique_constrs(self, model, model_vars):
         X_xr = model_vars["X_xr"]
-        model.setObjectiveN(quicksum(self.total_contact_hours_section_room_dict[section, room] * self.enrollment_section_dictionary[section] * self.priority_boost_section_dict[section] * X_xr[(section, room)] \
-                           for section in self.all_section for room in self.room_section_dictionary[section]),
+
+        room_clique = self.get_room_occupancy_sets()
+        model.addConstrs((quicksum(X_xr[(section, room)] for section in room_clique[room, clique_index]) <= self.room_count_dict[room]
+                                for room, clique_index in room_clique), "")
+        print("set " + str(len(room_clique)) + " room clique constraints")
+        return
+
+    def set_model_ir_constrs(self, model_ir, model_ir_vars):
+        print("setting model constraints")
+        X_xr_pair = model_ir_vars["X_xr_pair"]
+
+        num_room_section = np.diff(self.section_room_indptr)
+        model_ir.add_constrs(np.concatenate([[0], np.cumsum(num_room_section[num_room_section > 0])]),
+                             X_xr_pair,
+                             np.ones(len(X_xr_pair)),
+                             "<",
+                             1)
+
+        room_conflict_dict = self.get_room_occupancy_sets()
+        conflict_section = [section for candidate_section in room_conflict_dict.values() for section in candidate_section]
+        conflict_room = [room for room, _ in room_conflict_dict.keys()]
+        num_section_conflict = [len(candidate_section) for candidate_section in room_conflict_dict.values()]
+        pair_id = sp.get_pair_id(self.section_room_indptr,
+                                 self.section_room_indices,
+                                 len(self.all_room),
+                                 [self.section_id_dict[section] for section in conflict_section],
+                                 np.repeat([self.room_id_dict[room] for room in conflict_room], num_section_conflict))
+        model_ir.add_constrs(np.concatenate([[0], np.cumsum(num_section_conflict)]),
+                             X_xr_pair[pair_id],
+                             np.ones(len(pair_id)),
+                             "<",
+                             [self.room_count_dict[room] for room in conflict_room])
+        print("set " + str(len(room_conflict_dict)) + " room occupancy constraints")
+
+        self.set_model_ir_side_constrs(model_ir, model_ir_vars)
+        return
+
+    def get_contact_hours_coeff(self):
+        """
+        Output:
+            contact_hours_coeff - np.array[float]: objective coefficient of each (section, room) pair in the contact hours objective
+        """
+        return self.total_contact_hours_pair_array * self.enrollment_section_array[self.pair_section_id] * self.priority_boost_section_array[self.pair_section_id]
+
+    def get_contact_hours_lin_expr(self, model_vars):
+        return LinExpr(self.get_contact_hours_coeff().tolist(), model_vars["X_xr_pair"])
+
+    def set_contact_hours_objective(self, model, model_vars, index, priority):
+        model.setObjectiveN(self.get_contact_hours_lin_expr(model_vars),
                             index=index,
                             priority=priority,
                             reltol=self.contact_hours_objective_tollerance)
         return
 
+    def set_model_ir_contact_hours_objective(self, model_ir, model_ir_vars, index, priority):
+        model_ir.set_objective_n(model_ir_vars["X_xr_pair"],
+                                 self.get_contact_hours_coeff(),
+                                 index=index,
+                                 priority=priority,
+                                 reltol=self.contact_hours_objective_tollerance)
+        return
+
     def set_objective(self, model, model_vars):
         print("setting objective")
         model.ModelSense = GRB.MAXIMIZE
-        set_contact_hours_objective(model,model_vars, priority=1)
+        self.set_contact_hours_objective(model, model_vars, index=0, priority=1)
+        return
+
+    def set_model_ir_objective(self, model_ir, model_ir_vars):
+        model_ir.model_sense = GRB.MAXIMIZE
+        self.set_model_ir_contact_hours_objective(model_ir, model_ir_vars, index=0, priority=1)
         return
 
 
     def get_additional_output_columns(self, output):
-        output['delivery_mode'] = output.apply(lambda row: self.delivery_mode_section_room_dict[row["subject_course_section_occurrence"], row["bldg_room"]] \
-                                                if (row["subject_course_section_occurrence"], row["bldg_room"]) in self.delivery_mode_section_room_dict \
-                                                else "remote", axis=1)
-        output['in_person_hours'] = output.apply(lambda row: self.total_contact_hours_section_room_dict[row["subject_course_section_occurrence"], row["bldg_room"]]
-                                                if (row["subject_course_section_occurrence"], row["bldg_room"]) in self.total_contact_hours_section_room_dict \
-                                                else 0, axis=1,)
+        # sections without an assigned pair, including exclusively online sections, are remote
+        pair_id = output["pair_id"].to_numpy()
+        assigned = pair_id >= 0
+        delivery_mode = np.full(len(output), "remote", dtype=object)
+        delivery_mode[assigned] = np.array(sp.delivery_mode_list, dtype=object)[self.delivery_mode_pair_array[pair_id[assigned]]]
+        in_person_hours = np.zeros(len(output))
+        in_person_hours[assigned] = self.total_contact_hours_pair_array[pair_id[assigned]]
+        output['delivery_mode'] = delivery_mode
+        output['in_person_hours'] = in_person_hours
         return output
 
     @classmethod
@@ -1,4 +1,5 @@
 import pandas as pd
+import numpy as np
 import sys
 from gurobipy import *
 
@@ -17,51 +18,98 @@ class RoomAssignmentModePreferencesContactOpt(RoomAssignmentContactyOpt):
         return
 
 
-    def get_all_sets_params(self):
-        super().get_all_sets_params()
-
-        self.preferred_delivery_mode_section_dict = sp.get_preferred_delivery_mode(self.course_data,
-                                                                                  self.all_section
-                                                                                  )
+    def get_preferred_delivery_mode_section_dict(self):
+        # contact hours depend on mode preferences, so they are passed to the contact hours step of get_all_sets_params
+        return sp.get_preferred_delivery_mode(self.course_data,
+                                              self.all_section
+                                              )
 
-        self.total_contact_hours_section_room_dict, self.delivery_mode_section_room_dict = sp.get_contact_hours(all_section=self.all_section,
-                                                                                                                all_room=self.all_room,
-                                                                                                                capacity_room_dictionary=self.capacity_room_dictionary,
-                                                                                                                enrollment_section_dictionary=self.enrollment_section_dictionary,
-                                                                                                                meeting_hours_section_dictionary=self.meeting_hours_section_dictionary,
-                                                                                                                num_weekly_meeting_days_section_dictionary=self.num_weekly_meeting_days_section_dictionary,
-                                                                                                                minimum_section_contact_days=self.minimum_section_contact_days,
-                                                                                                                weeks_in_semester=self.weeks_in_semester,
-                                                                                                                preferred_delivery_mode_section_dict=self.preferred_delivery_mode_section_dict,
-                                                                                                                )
 
-        self.preferred_room_section_dictionary, self.preferred_section_room_dictionary = sp.get_preferred_room_sets(self.course_data,
-                                                                                                                    self.room_data,
-                                                                                                                    self.room_section_dictionary,
-                                                                                                                    self.section_room_dictionary,
-                                                                                                                    self.preferred_delivery_mode_section_dict,
-                                                                                                                    self.delivery_mode_section_room_dict)
+    def get_all_sets_params(self):
+        super().get_all_sets_params()
 
+        with self.instrument("sets.mode_preferences") as phase:
+            self.preferred_room_section_dictionary, self.preferred_section_room_dictionary = sp.get_preferred_room_sets(self.course_data,
+                                                                                                                        self.room_data,
+                                                                                                                        self.room_section_dictionary,
+                                                                                                                        self.section_room_dictionary,
+                                                                                                                        self.preferred_delivery_mode_section_dict,
+                                                                                                                        self.delivery_mode_section_room_dict)
+            preferred_delivery_mode_array = sp.get_preferred_delivery_mode_array(self.all_section, self.preferred_delivery_mode_section_dict)
+            self.preferred_pair_array = preferred_delivery_mode_array[self.pair_section_id, self.delivery_mode_pair_array]
+            self.remote_preferred_section_array = preferred_delivery_mode_array[:, sp.delivery_mode_list.index("remote")]
+            phase.set_counts(num_preferred_section=len(self.preferred_room_section_dictionary))
 
 
         return
 
 
+    def update_pair_params(self, pair_id):
+        super().update_pair_params(pair_id)
+        preferred_delivery_mode_array = sp.get_preferred_delivery_mode_array(self.all_section, self.preferred_delivery_mode_section_dict)
+        self.preferred_pair_array[pair_id] = preferred_delivery_mode_array[self.pair_section_id[pair_id], self.delivery_mode_pair_array[pair_id]]
+        for section_id, room_id, preferred in zip(self.pair_section_id[pair_id].tolist(), self.section_room_indices[pair_id].tolist(), self.preferred_pair_array[pair_id].tolist()):
+            section, room = self.all_section[section_id], self.all_room[room_id]
+            if preferred:
+                self.preferred_room_section_dictionary[section].add(room)
+                self.preferred_section_room_dictionary[room].add(section)
+            else:
+                self.preferred_room_section_dictionary[section].discard(room)
+                self.preferred_section_room_dictionary[room].discard(section)
+
+    def get_pair_array_names(self):
+        return super().get_pair_array_names() + ["preferred_pair_array"]
+
+    def get_mode_preferences_coeff(self):
+        """
+        Output:
+            preference_coeff - np.array[float]: objective coefficient of each (section, room) pair in the mode preferences objective
+            preference_constant - float: constant term of the mode preferences objective
+        """
+        # sections taught in a preferred room, plus sections that prefer remote and are not assigned a room
+        preference_coeff = self.preferred_pair_array.astype(float) - self.remote_preferred_section_array[self.pair_section_id]
+        return preference_coeff, float(self.remote_preferred_section_array.sum())
+
+    def get_residential_spread_preferences_coeff(self):
+        """
+        Output:
+            residential_spread_preference_coeff - np.array[float]: 1 for the preferred (section, room) pairs of sections that only accept residential_spread
+        """
+        residential_spread_only_section_array = np.array([self.preferred_delivery_mode_section_dict[section] == {"residential_spread"} for section in self.all_section], dtype=bool)
+        return (self.preferred_pair_array & residential_spread_only_section_array[self.pair_section_id]).astype(float)
+
+    def get_mode_preferences_lin_expr(self, model_vars):
+        preference_coeff, preference_constant = self.get_mode_preferences_coeff()
+        return LinExpr(preference_coeff.tolist(), model_vars["X_xr_pair"]) + preference_constant
+
     def set_mode_preferences_objective(self, model,model_vars, index, priority):
-        X_xr = model_vars["X_xr"]
-        model.setObjectiveN(quicksum(X_xr[(section, room)] for section in self.all_section for room in self.preferred_room_section_dictionary[section]) +
-                            quicksum(1 - quicksum(X_xr[(section, room)] for room in self.room_section_dictionary[section]) for section in self.all_section if "remote" in self.preferred_delivery_mode_section_dict[section]),
+        model.setObjectiveN(self.get_mode_preferences_lin_expr(model_vars),
                            index=index,
                            priority=priority,
                            reltol=self.preference_objective_tollerance)
 
 
+    def set_model_ir_mode_preferences_objective(self, model_ir, model_ir_vars, index, priority):
+        preference_coeff, preference_constant = self.get_mode_preferences_coeff()
+        model_ir.set_objective_n(model_ir_vars["X_xr_pair"],
+                                 preference_coeff,
+                                 constant=preference_constant,
+                                 index=index,
+                                 priority=priority,
+                                 reltol=self.preference_objective_tollerance)
+
     def set_objective(self, model, model_vars):
         model.ModelSense = GRB.MAXIMIZE
         self.set_mode_preferences_objective(model,model_vars, index=0, priority=2)
         self.set_contact_hours_objective(model,model_vars, index=1, priority=1)
         return
 
+    def set_model_ir_objective(self, model_ir, model_ir_vars):
+        model_ir.model_sense = GRB.MAXIMIZE
+        self.set_model_ir_mode_preferences_objective(model_ir, model_ir_vars, index=0, priority=2)
+        self.set_model_ir_contact_hours_objective(model_ir, model_ir_vars, index=1, priority=1)
+        return
+
 
 if __name__ == "__main__":
 
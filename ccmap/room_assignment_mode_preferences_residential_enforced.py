@@ -10,6 +10,7 @@ class RoomAssignmentModePreferencesResidentialEnforced(RoomAssignmentModePrefere
 
     informative_output_columns = ["subject_code", "course_number", "course_section", "bldg_room", "delivery_mode", "in_person_hours", "preference"]
     model_description = "mode_preference_residential_enforced"
+    global_side_constraints = ["residential_spread_preference_bound"]
 
     def __init__(self, course_data, room_data, minimum_section_contact_days, weeks_in_semester, residential_spread_preference_bound):
         super().__init__(course_data=course_data, room_data=room_data, minimum_section_contact_days=minimum_section_contact_days, weeks_in_semester=weeks_in_semester, preference_objective_tollerance=0)
@@ -18,19 +19,21 @@ class RoomAssignmentModePreferencesResidentialEnforced(RoomAssignmentModePrefere
         return
 
 
-    def set_model_constrs(self, model, model_vars):
-        super().set_model_constrs(model, model_vars)
-        X_xr = model_vars["X_xr"]
-        X_xr = model_vars["X_xr"]
-        residential_spread_preferences_lin_expr = quicksum(X_xr[(section, room)] for section in self.all_section for room in self.preferred_room_section_dictionary[section] if self.preferred_delivery_mode_section_dict[section] == {"residential_spread"})
-        model.addConstr(residential_spread_preferences_lin_expr >= self.residential_spread_preference_bound, "")
-        return
+    def get_side_constraints(self):
+        side_constraint_dict = super().get_side_constraints()
+        side_constraint_dict["residential_spread_preference_bound"] = (self.get_residential_spread_preferences_coeff(), self.residential_spread_preference_bound)
+        return side_constraint_dict
 
     def set_objective(self, model, model_vars):
         model.ModelSense = GRB.MAXIMIZE
         self.set_mode_preferences_objective(model,model_vars, index=0, priority=1)
         return
 
+    def set_model_ir_objective(self, model_ir, model_ir_vars):
+        model_ir.model_sense = GRB.MAXIMIZE
+        self.set_model_ir_mode_preferences_objective(model_ir, model_ir_vars, index=0, priority=1)
+        return
+
 
 if __name__ == "__main__":
 
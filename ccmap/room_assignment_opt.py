@@ -1,5 +1,6 @@
 import pandas as pd
-import csv
+import numpy as np
+import warnings
 from gurobipy import *
 from abc import ABC
 from abc import abstractmethod
@@ -9,49 +10,474 @@ from abc import abstractmethod
 import data_process as dp
 import set_process as sp
 from generic_schedule_opt import GenericScheduleOpt
+from model_ir import ModelIR
 
 class RoomAssignmentOpt(GenericScheduleOpt):
     
     model_description = "generic_room_assignment"
     informative_output_columns = ["subject_code", "course_number", "course_section", "bldg_room"]
+    # If True, rooms with the same building, capacity and use are modeled as a single class of rooms.
+    # Sections are assigned to classes, and output_result picks a concrete room in the class for each section
+    aggregate_equivalent_rooms = False
+    preprocessing_inputs = ["course_data", "room_data", "aggregate_equivalent_rooms"]
+    incremental_inputs = ["course_data", "room_data"]
+    # set by patch_sets_params while get_all_sets_params runs: the previous state, and masks of the sections and rooms whose rows changed
+    preprocessing_patch = None
     
     def __init__(self):
         super().__init__()
         return
 
     def get_all_sets_params(self):
-        self.all_course = self.course_data['subject_course_section'].unique().tolist()
-        self.all_section = self.course_data['subject_course_section_occurrence'].tolist()
-        self.all_room = self.room_data['bldg_room'].tolist()
-        self.all_timeslot = self.course_data['full_time'].unique()
-        self.all_simple_timeslot = sp.get_all_simplieid_timeslot(self.all_timeslot)
-
-        print("setting course to section set")
-        self.section_course_dict = sp.get_section_set(self.course_data, self.all_course)
-        print("setting room to section set")
-        self.room_section_dictionary, self.section_room_dictionary = sp.get_room_sets(self.course_data, self.room_data,
-                                                                                      self.all_room, self.all_section)
-        print("setting time to section availability set")
-        self.section_timeslot_clash_dictionary = sp.get_sections_with_overlapping_time_slot(self.all_timeslot, self.all_simple_timeslot, self.all_section, self.course_data)
-
-        print("setting parameters")
-        self.enrollment_section_dictionary = sp.get_enrollement_per_section(self.course_data,
-                                                  enrollment_column='enrollment'
-                                                  )
-        self.capacity_room_dictionary = sp.get_room_capacity(self.room_data, capacity_column='capacity')
-        self.timeslot_section_dictionary = sp.get_course_time(self.course_data)
+        with self.instrument("sets.ids") as phase:
+            if self.aggregate_equivalent_rooms:
+                self.model_room_data, self.room_class_dict = sp.get_room_equivalence_classes(self.room_data)
+            else:
+                self.model_room_data, self.room_class_dict = self.room_data, None
+
+            self.all_course = self.course_data['subject_course_section'].unique().tolist()
+            self.all_section = self.course_data['subject_course_section_occurrence'].tolist()
+            self.all_room = self.model_room_data['bldg_room'].tolist()
+            self.all_timeslot = self.course_data['full_time'].unique()
+            self.all_simple_timeslot = sp.get_all_simplieid_timeslot(self.all_timeslot)
+            self.section_id_dict = sp.get_id_dict(self.all_section)
+            self.room_id_dict = sp.get_id_dict(self.all_room)
+            self.timeslot_id_dict = sp.get_id_dict(self.all_timeslot)
+            phase.set_counts(num_section=len(self.all_section), num_room=len(self.all_room), num_timeslot=len(self.all_timeslot))
+
+        with self.instrument("sets.section_course") as phase:
+            print("setting course to section set")
+            self.section_course_dict = sp.get_section_set(self.course_data, self.all_course)
+            phase.set_counts(num_course=len(self.all_course))
+        with self.instrument("sets.section_room") as phase:
+            print("setting room to section set")
+            if self.preprocessing_patch is None:
+                self.room_section_dictionary, self.section_room_dictionary = sp.get_room_sets(self.course_data, self.model_room_data,
+                                                                                              self.all_room, self.all_section)
+                self.section_room_indptr, self.section_room_indices = sp.get_section_room_csr(self.all_section, self.room_id_dict, self.room_section_dictionary)
+                self.pair_section_id = sp.get_pair_section_id(self.section_room_indptr)
+            else:
+                self.set_patched_section_room_pairs()
+            phase.set_counts(num_pairs=len(self.pair_section_id))
+        with self.instrument("sets.timeslot_clash") as phase:
+            print("setting time to section availability set")
+            self.section_timeslot_clash_dictionary = sp.get_sections_with_overlapping_time_slot(self.all_timeslot, self.all_simple_timeslot, self.all_section, self.course_data)
+            phase.set_counts(num_simple_timeslot=len(self.section_timeslot_clash_dictionary))
+
+        with self.instrument("sets.params"):
+            print("setting parameters")
+            self.enrollment_section_dictionary = sp.get_enrollement_per_section(self.course_data,
+                                                      enrollment_column='enrollment'
+                                                      )
+            self.capacity_room_dictionary = sp.get_room_capacity(self.model_room_data, capacity_column='capacity')
+            # number of rooms each room in all_room stands for, which is more than one for a class of equivalent rooms
+            self.room_count_dict = {room: len(self.room_class_dict[room]) if self.room_class_dict is not None else 1 for room in self.all_room}
+            self.timeslot_section_dictionary = sp.get_course_time(self.course_data)
+            self.enrollment_section_array = np.array([self.enrollment_section_dictionary[section] for section in self.all_section], dtype=float)
+            self.capacity_room_array = np.array([self.capacity_room_dictionary[room] for room in self.all_room], dtype=float)
+            self.timeslot_id_section_array = np.array([self.timeslot_id_dict[self.timeslot_section_dictionary[section]] for section in self.all_section], dtype=np.int64)
+            self.course_row_hash_array = pd.util.hash_pandas_object(self.course_data, index=False).values
+            self.room_row_hash_array = pd.util.hash_pandas_object(self.room_data, index=False).values
         pass
 
+    def patch_sets_params(self, previous_state):
+        """
+        Input:
+            previous_state - dict{str: any}: attributes set by get_all_sets_params for another course_data and room_data
+        Output:
+            patched - bool: True if the sets and parameters were computed by patching previous_state
+
+        Rows of course_data and room_data are compared by hash. Per section and per room sets and parameters are computed as usual,
+            while (section, room) pairs and their parameters are only computed for the sections and rooms whose rows changed,
+            and are copied from previous_state for the others.
+        Only edits of existing rows are patched. If sections or rooms were added, removed or reordered,
+            or rooms are aggregated into classes, nothing is patched
+        """
+        if self.aggregate_equivalent_rooms:
+            return False
+        if (self.course_data['subject_course_section_occurrence'].tolist() != previous_state["all_section"] or
+                self.room_data['bldg_room'].tolist() != previous_state["all_room"]):
+            print("sections or rooms changed since the cached run, preprocessing from scratch")
+            return False
+
+        changed_section = pd.util.hash_pandas_object(self.course_data, index=False).values != previous_state["course_row_hash_array"]
+        changed_room = pd.util.hash_pandas_object(self.room_data, index=False).values != previous_state["room_row_hash_array"]
+        print("patching cached sets and parameters for " + str(changed_section.sum()) + " changed sections and " + str(changed_room.sum()) + " changed rooms")
+        self.preprocessing_patch = {"previous_state": previous_state, "changed_section": changed_section, "changed_room": changed_room}
+        try:
+            self.get_all_sets_params()
+        finally:
+            del self.preprocessing_patch
+        return True
+
+    def set_patched_section_room_pairs(self):
+        """
+        Compatibility structure of patch_sets_params: the pairs of previous_state of unchanged sections and rooms are kept,
+            and the compatible rooms of changed sections, and compatible sections of changed rooms, are added.
+        Pairs of unchanged sections and rooms that were filtered out of previous_state, e.g. because they would make the section remote,
+            are left out, since they would be filtered out again
+        """
+        previous_state = self.preprocessing_patch["previous_state"]
+        changed_section = self.preprocessing_patch["changed_section"]
+        changed_room = self.preprocessing_patch["changed_room"]
+        num_room = len(self.all_room)
+
+        previous_pair_section_id = previous_state["pair_section_id"]
+        previous_pair_room_id = previous_state["section_room_indices"]
+        keep_pair = ~changed_section[previous_pair_section_id] & ~changed_room[previous_pair_room_id]
+        pair_section_id_list = [previous_pair_section_id[keep_pair]]
+        pair_room_id_list = [previous_pair_room_id[keep_pair]]
+
+        changed_section_list = [self.all_section[section_id] for section_id in np.flatnonzero(changed_section)]
+        changed_room_list = [self.all_room[room_id] for room_id in np.flatnonzero(changed_room)]
+        room_section_dictionary, _ = sp.get_room_sets(self.course_data, self.model_room_data, self.all_room, changed_section_list)
+        _, section_room_dictionary = sp.get_room_sets(self.course_data, self.model_room_data, changed_room_list, self.all_section)
+        for section, available_room in room_section_dictionary.items():
+            pair_section_id_list.append(np.full(len(available_room), self.section_id_dict[section], dtype=np.int64))
+            pair_room_id_list.append(np.array([self.room_id_dict[room] for room in available_room], dtype=np.int64))
+        for room, available_section in section_room_dictionary.items():
+            pair_section_id_list.append(np.array([self.section_id_dict[section] for section in available_section], dtype=np.int64))
+            pair_room_id_list.append(np.full(len(available_section), self.room_id_dict[room], dtype=np.int64))
+
+        self.section_room_indptr, self.section_room_indices = sp.get_section_room_csr_from_pairs(len(self.all_section), num_room,
+                                                                                                 np.concatenate(pair_section_id_list),
+                                                                                                 np.concatenate(pair_room_id_list))
+        self.pair_section_id = sp.get_pair_section_id(self.section_room_indptr)
+        self.room_section_dictionary, self.section_room_dictionary = sp.get_room_sets_from_csr(self.all_section,
+                                                                                              self.all_room,
+                                                                                              self.section_room_indptr,
+                                                                                              self.section_room_indices)
+
+    def get_pair_params(self, pair_array_names, get_params_of_pairs):
+        """
+        Input:
+            pair_array_names - list[str]: names of the attributes the per pair parameters are stored in
+            get_params_of_pairs - function: maps an np.array[int] of pair ids to a tuple with one np.array of parameters per name
+        Output:
+            pair_params - tuple(np.array): parameters of every (section, room) pair, aligned with section_room_indices
+
+        While patch_sets_params runs, parameters are only computed for the pairs of changed sections or rooms,
+            and copied from the previous state for the other pairs
+        """
+        if self.preprocessing_patch is None:
+            return get_params_of_pairs(np.arange(len(self.section_room_indices)))
+
+        previous_state = self.preprocessing_patch["previous_state"]
+        changed_pair = self.preprocessing_patch["changed_section"][self.pair_section_id] | self.preprocessing_patch["changed_room"][self.section_room_indices]
+        changed_pair_id = np.flatnonzero(changed_pair)
+        unchanged_pair_id = np.flatnonzero(~changed_pair)
+        previous_pair_id = sp.get_pair_id(previous_state["section_room_indptr"],
+                                          previous_state["section_room_indices"],
+                                          len(self.all_room),
+                                          self.pair_section_id[unchanged_pair_id],
+                                          self.section_room_indices[unchanged_pair_id])
+        pair_params = []
+        for pair_array_name, changed_pair_value in zip(pair_array_names, get_params_of_pairs(changed_pair_id)):
+            pair_value = np.empty(len(self.section_room_indices), dtype=changed_pair_value.dtype)
+            pair_value[changed_pair_id] = changed_pair_value
+            pair_value[unchanged_pair_id] = previous_state[pair_array_name][previous_pair_id]
+            pair_params.append(pair_value)
+        return tuple(pair_params)
+
+    def filter_section_room_pairs(self, keep_pair, pair_array_names):
+        """
+        Input:
+            keep_pair - np.array[bool]: aligned with section_room_indices. True for the (section, room) pairs that should be kept
+            pair_array_names - list[str]: names of the attributes holding per pair parameters, which are filtered in the same way
+
+        Removes (section, room) pairs from the compatibility structure, and refreshes room_section_dictionary and section_room_dictionary
+        """
+        self.section_room_indptr, self.section_room_indices = sp.filter_section_room_csr(self.section_room_indptr,
+                                                                                         self.section_room_indices,
+                                                                                         keep_pair)
+        self.pair_section_id = sp.get_pair_section_id(self.section_room_indptr)
+        for pair_array_name in pair_array_names:
+            setattr(self, pair_array_name, getattr(self, pair_array_name)[keep_pair])
+        self.room_section_dictionary, self.section_room_dictionary = sp.get_room_sets_from_csr(self.all_section,
+                                                                                              self.all_room,
+                                                                                              self.section_room_indptr,
+                                                                                              self.section_room_indices)
+
+    def __getstate__(self):
+        # gurobi constraints cannot be pickled, and belong to a model that is not sent to worker processes
+        state = self.__dict__.copy()
+        state.pop("side_constr_dict", None)
+        return state
+
+    def get_side_constraints(self):
+        """
+        Output:
+            side_constraint_dict - dict{str: (np.array[float], float)}: coefficient of each (section, room) pair and right hand side
+                                   of each side constraint, by the name of the parameter it enforces, see global_side_constraints.
+                                   Each side constraint is a lower bound on a weighted sum of the assignment variables
+        """
+        return {}
+
+    def set_side_constrs(self, model, model_vars):
+        """
+        Adds the constraints of get_side_constraints, and keeps their handles in side_constr_dict by parameter name
+        """
+        X_xr_pair = model_vars["X_xr_pair"]
+        self.side_constr_dict = {constraint_name: model.addLConstr(LinExpr(coeff.tolist(), X_xr_pair), GRB.GREATER_EQUAL, rhs, "C_" + constraint_name)
+                                 for constraint_name, (coeff, rhs) in self.get_side_constraints().items()}
+
+    def set_model_ir_side_constrs(self, model_ir, model_ir_vars):
+        for coeff, rhs in self.get_side_constraints().values():
+            model_ir.add_constr(model_ir_vars["X_xr_pair"], coeff, ">", rhs)
+
+    def update_pair_params(self, pair_id):
+        """
+        Input:
+            pair_id - np.array[int]: ids of the (section, room) pairs whose parameters are recomputed
+
+        Refreshes per pair parameters after a change of per room or per section parameters, e.g. capacity_room_array.
+        The compatibility structure is not changed. Descendant classes with capacity dependent parameters override this method
+        """
+        return
+
+    def get_pair_array_names(self):
+        """
+        Output:
+            pair_array_names - list[str]: names of the attributes holding per pair parameters, aligned with section_room_indices
+        """
+        return []
+
+    def get_components(self):
+        """
+        Output:
+            all_component - list[np.array[int]]: section ids of each connected component of the section room compatibility graph
+        """
+        return sp.get_section_room_components(self.section_room_indptr, self.section_room_indices, len(self.all_room))
+
+    def restrict_to_component(self, component):
+        keep_section = np.zeros(len(self.all_section), dtype=bool)
+        keep_section[component] = True
+        self.filter_section_room_pairs(keep_section[self.pair_section_id], self.get_pair_array_names())
+
     def set_model_vars(self, model):
         print("defining variables")
         X_xr = {}
-        for section in self.all_section:
-            for room in self.room_section_dictionary[section]:
-                X_xr[(section, room)] = model.addVar(vtype=GRB.BINARY, name='X_xr[%s+%s]' % (section, room))
+        X_xr_pair = [] #same variables as X_xr, aligned with section_room_indices
+        for section_id, room_id in zip(self.pair_section_id.tolist(), self.section_room_indices.tolist()):
+            section = self.all_section[section_id]
+            room = self.all_room[room_id]
+            X_xr[(section, room)] = model.addVar(vtype=GRB.BINARY, name='X_xr[%s+%s]' % (section, room))
+            X_xr_pair.append(X_xr[(section, room)])
 
-        model_vars = {"X_xr": X_xr}
+        model_vars = {"X_xr": X_xr, "X_xr_pair": X_xr_pair}
         return model_vars
 
+    def set_model_ir_vars(self, model_ir):
+        X_xr_pair = model_ir.add_vars(['X_xr[%s+%s]' % (self.all_section[section_id], self.all_room[room_id])
+                                       for section_id, room_id in zip(self.pair_section_id.tolist(), self.section_room_indices.tolist())],
+                                      vtype="B")
+        model_ir_vars = {"X_xr_pair": X_xr_pair}
+        return model_ir_vars
+
+    def get_greedy_pair_score(self):
+        """
+        Output:
+            pair_score - np.array[float]: shape (number of pairs, number of objectives). Gain of each (section, room) pair
+                                          in each objective, in decreasing order of priority
+        """
+        model_ir = ModelIR()
+        model_ir_vars = self.set_model_ir_vars(model_ir)
+        self.set_model_ir_objective(model_ir, model_ir_vars)
+        objective_list = sorted(model_ir.objective_list, key=lambda objective: -objective["priority"])
+        return np.column_stack([-model_ir.model_sense * model_ir.get_objective_coeff(objective)[model_ir_vars["X_xr_pair"]] for objective in objective_list] +
+                               [np.zeros((len(self.section_room_indices), 0))])
+
+    def get_greedy_room_assignment(self):
+        """
+        Output:
+            room_assignment_section_dict - dict{str: str}: maps each assigned section to its room
+
+        Constructive heuristic: sections are placed one at a time in their best free room, ranking pairs by the model's objectives.
+        Room occupancy constraints are respected, but side constraints bounding sums over all sections are not enforced.
+        get_all_sets_params must have been called, e.g. through construct_model
+        """
+        return self.get_room_assignment_from_pairs(self.get_greedy_pair_id(self.get_greedy_pair_score()))
+
+    def get_greedy_pair_id(self, pair_score, assigned_pair_id=None):
+        """
+        Input:
+            pair_score - np.array[float]: shape (number of pairs, number of criteria), see sp.get_greedy_room_assignment
+            assigned_pair_id - array-like[int]: pairs that are already assigned
+        Output:
+            assigned_pair_id - np.array[int]: ids of the assigned (section, room) pairs
+        """
+        timeslot_mask_section_dict = sp.get_timeslot_mask_section_dict(self.section_timeslot_clash_dictionary, self.all_simple_timeslot)
+        return sp.get_greedy_room_assignment(self.section_room_indptr,
+                                             self.section_room_indices,
+                                             pair_score,
+                                             [timeslot_mask_section_dict.get(section, 0) for section in self.all_section],
+                                             [self.room_count_dict[room] for room in self.all_room],
+                                             assigned_pair_id)
+
+    def get_room_assignment_from_pairs(self, assigned_pair_id):
+        """
+        Input:
+            assigned_pair_id - np.array[int]: ids of the assigned (section, room) pairs
+        Output:
+            room_assignment_section_dict - dict{str: str}: maps each assigned section to its room
+        """
+        return {self.all_section[section_id]: self.all_room[room_id]
+                for section_id, room_id in zip(self.pair_section_id[assigned_pair_id].tolist(), self.section_room_indices[assigned_pair_id].tolist())}
+
+    def solve_greedy(self):
+        """
+        Output:
+            solution - dict{str: float}: value of every nonzero variable of the greedy solution, by variable name.
+                       It can be passed to output_result in place of a solved model
+        """
+        self.prepare_sets_params()
+        return self.get_solution_from_room_assignment(self.get_greedy_room_assignment())
+
+    def get_solution_from_room_assignment(self, room_assignment_section_dict):
+        """
+        Input:
+            room_assignment_section_dict - dict{str: str}: maps each assigned section to its room, as in the model
+        Output:
+            solution - dict{str: float}: value of every nonzero variable, by variable name
+        """
+        return {'X_xr[%s+%s]' % (section, room): 1.0 for section, room in room_assignment_section_dict.items()}
+
+    def set_mip_start(self, model, room_assignment_section_dict):
+        """
+        Input:
+            model - Gurobi.model: model returned by construct_model
+            room_assignment_section_dict - dict{str: str}: maps each assigned section to its room, as in the model
+
+        Sets the start value of every assignment variable, so that gurobi can use the assignment as an incumbent
+        """
+        model.update()
+        all_var = model.getVars()
+        model.setAttr("Start", all_var, [0.0] * len(all_var))
+        for var_name in self.get_solution_from_room_assignment(room_assignment_section_dict):
+            var = model.getVarByName(var_name)
+            if var is not None:
+                var.Start = 1.0
+
+    def get_room_assignment_from_classes(self, assigned_pair_id):
+        """
+        Input:
+            assigned_pair_id - np.array[int]: ids of the assigned (section, room) pairs, whose rooms are classes of rooms
+        Output:
+            room_assignment_section_dict - dict{str: str}: maps each assigned section to a concrete room
+            assigned_pair_id - np.array[int]: sorted ids of the assigned pairs, after sections were moved to another class or left unassigned
+
+        Only relevant if aggregate_equivalent_rooms is True.
+        The class constraints only bound the number of sections of a class that meet at the same time on each day,
+            so sections meeting on different combinations of days may not fit in the rooms of their class together.
+        Sections are placed with sp.assign_rooms_in_class, keeping them in their existing room when possible.
+            The sections it cannot place are re-solved on the concrete rooms with place_unassigned_sections,
+            and the sections that still have no room are left unassigned, so they are remote.
+        Sets unassigned_section, moved_section and plan_optimal
+        """
+        if "building_number" in self.course_data.columns and "room" in self.course_data.columns:
+            existing_room_assignment_section_dict = sp.get_existing_room_assignment_section_dict(self.course_data)
+        else:
+            existing_room_assignment_section_dict = dict()
+        class_assignment_section_dict = self.get_room_assignment_from_pairs(assigned_pair_id)
+        room_assignment_section_dict, unassigned_section = sp.assign_rooms_in_class(class_assignment_section_dict,
+                                                                                    self.room_class_dict,
+                                                                                    self.timeslot_section_dictionary,
+                                                                                    existing_room_assignment_section_dict)
+        self.unassigned_section, self.moved_section = list(), list()
+        if len(unassigned_section) > 0:
+            print("re-solving " + str(len(unassigned_section)) + " sections that do not fit in the rooms of their class")
+            room_assignment_section_dict = self.place_unassigned_sections(unassigned_section,
+                                                                          class_assignment_section_dict,
+                                                                          room_assignment_section_dict,
+                                                                          existing_room_assignment_section_dict)
+            class_room_dict = {room: room_class for room_class, class_room in self.room_class_dict.items() for room in class_room}
+            self.unassigned_section = [section for section in unassigned_section if section not in room_assignment_section_dict]
+            self.moved_section = [section for section in unassigned_section
+                                  if section in room_assignment_section_dict and class_room_dict[room_assignment_section_dict[section]] != class_assignment_section_dict[section]]
+            assigned_section = list(room_assignment_section_dict)
+            assigned_pair_id = np.sort(sp.get_pair_id(self.section_room_indptr,
+                                                      self.section_room_indices,
+                                                      len(self.all_room),
+                                                      [self.section_id_dict[section] for section in assigned_section],
+                                                      [self.room_id_dict[class_room_dict[room_assignment_section_dict[section]]] for section in assigned_section]))
+
+        self.plan_optimal = len(self.unassigned_section) == 0 and len(self.moved_section) == 0
+        if not self.plan_optimal:
+            warnings.warn("The room assignment is not optimal: the rooms of some classes cannot hold the sections the model assigned to them. \n" +
+                          "Sections moved to a room of another class: " + str(self.moved_section) + "\n" +
+                          "Sections left without a room, which are remote: " + str(self.unassigned_section))
+        return room_assignment_section_dict, assigned_pair_id
+
+    def place_unassigned_sections(self,
+                                  unassigned_section,
+                                  class_assignment_section_dict,
+                                  room_assignment_section_dict,
+                                  existing_room_assignment_section_dict):
+        """
+        Input:
+            unassigned_section - list[str]: sections of class_assignment_section_dict that are not in room_assignment_section_dict
+            class_assignment_section_dict - dict{str: str}: maps each assigned section to its class of rooms, as in the model
+            room_assignment_section_dict - dict{str: str}: maps the other assigned sections to a concrete room, see sp.assign_rooms_in_class
+            existing_room_assignment_section_dict - dict{str: str}: maps each section to its existing room assignment
+        Output:
+            room_assignment_section_dict - dict{str: str}: maps the assigned sections to a concrete room.
+                                           Sections of unassigned_section that cannot be placed are left out
+
+        Re-solves the sections of the classes that could not hold all of their sections, on the concrete rooms.
+            Sections of these classes that were placed stay in a room of their class, but may be moved to another room of it.
+            Unassigned sections may use a room of any class they are compatible with, if it is free when they meet.
+        The objectives, by priority, are to place as many unassigned sections as possible,
+            to keep as many of them in their class as possible, and to keep as many sections as possible in their existing room
+        """
+        class_room_dict = {room: room_class for room_class, class_room in self.room_class_dict.items() for room in class_room}
+        unassigned_section = set(unassigned_section)
+        full_class = set(class_assignment_section_dict[section] for section in unassigned_section)
+        # sections that keep their room, by concrete room outside of the full classes
+        fixed_section_room_dict = dict()
+        for section, room in room_assignment_section_dict.items():
+            if class_room_dict[room] not in full_class:
+                fixed_section_room_dict.setdefault(room, list()).append(sp.get_timeslot(self.timeslot_section_dictionary[section]))
+
+        candidate_room_section_dict = dict() #concrete rooms each re-solved section may be placed in
+        for section in sorted(set(section for section, room_class in class_assignment_section_dict.items() if room_class in full_class)):
+            if section not in unassigned_section:
+                candidate_room_section_dict[section] = list(self.room_class_dict[class_assignment_section_dict[section]])
+                continue
+            timeslot = sp.get_timeslot(self.timeslot_section_dictionary[section])
+            section_id = self.section_id_dict[section]
+            candidate_room_section_dict[section] = [room for room_id in self.section_room_indices[self.section_room_indptr[section_id]:self.section_room_indptr[section_id + 1]].tolist()
+                                                    for room in self.room_class_dict[self.all_room[room_id]]
+                                                    if not any(timeslot.overlaps(other_timeslot) for other_timeslot in fixed_section_room_dict.get(room, []))]
+        section_room_dictionary = dict()
+        for section, candidate_room in candidate_room_section_dict.items():
+            for room in candidate_room:
+                section_room_dictionary.setdefault(room, set()).add(section)
+
+        model = Model("")
+        model.Params.OutputFlag = 0
+        Y_xr = {(section, room): model.addVar(vtype=GRB.BINARY, name="Y_xr[%s+%s]" % (section, room))
+                for section, candidate_room in candidate_room_section_dict.items() for room in candidate_room}
+        for section, candidate_room in candidate_room_section_dict.items():
+            if section in unassigned_section:
+                model.addConstr(quicksum(Y_xr[(section, room)] for room in candidate_room) <= 1)
+            else:
+                model.addConstr(quicksum(Y_xr[(section, room)] for room in candidate_room) == 1)
+        for room, room_clique in sp.get_room_maximal_clique_dict(section_room_dictionary, self.timeslot_section_dictionary).items():
+            for clique in room_clique:
+                model.addConstr(quicksum(Y_xr[(section, room)] for section in clique) <= 1)
+        model.ModelSense = GRB.MAXIMIZE
+        model.setObjectiveN(quicksum(var for (section, _), var in Y_xr.items() if section in unassigned_section), index=0, priority=2)
+        model.setObjectiveN(quicksum(var for (section, room), var in Y_xr.items()
+                                     if section in unassigned_section and class_room_dict[room] == class_assignment_section_dict[section]), index=1, priority=1)
+        model.setObjectiveN(quicksum(var for (section, room), var in Y_xr.items() if existing_room_assignment_section_dict.get(section) == room), index=2, priority=0)
+        model.optimize()
+        if model.Status != GRB.OPTIMAL:
+            raise Exception("Re-solving the sections that do not fit in the rooms of their class failed with gurobi status " + str(model.Status))
+
+        room_assignment_section_dict = {section: room for section, room in room_assignment_section_dict.items() if section not in candidate_room_section_dict}
+        room_assignment_section_dict.update({section: room for (section, room), var in Y_xr.items() if var.X > 0.5})
+        return room_assignment_section_dict
+
     @abstractmethod
     def set_model_constrs(self, model, model_vars):
         pass
@@ -93,7 +519,7 @@ class RoomAssignmentOpt(GenericScheduleOpt):
 
     @abstractmethod
     def get_additional_output_columns(self, output):
-        pass
+        return output
 
     # @classmethod
     def output_result(
@@ -110,56 +536,86 @@ class RoomAssignmentOpt(GenericScheduleOpt):
         ["Subject Code","Course Code", "Course Section","Occurrence","Bldg_room","Bldg Code","Room Code"]
         Parameters:
         -------------
-        model: str or gurobipy.Model, default=None
+        model: str, dict or gurobipy.Model, default=None
             If a str is passed, it should be the filepath of .sol file.
             ATTENTION: if read from a .sol file, the variable name must not have white space when define.
+            If a dict is passed, it should map variable names to their values, as returned by solve_decomposed
             If a gurobipy.Model is passes, it should be a solved gurobi Model
         output_path: str, default="room_asignment_opt_output_example.csv"
             the output path of the .csv file. Save to the same path as project file by default.
         occurrence: bool, default = False
             Wether include occurrence column in the output file, false by default
         '''
-        print("Output file generating")
+        with self.instrument("output_result") as phase:
+            print("Output file generating")
+
+            assigned_pair_id = self.get_assigned_pair_id(model)
+            if getattr(self, "room_class_dict", None) is not None:
+                room_assignment_section_dict, assigned_pair_id = self.get_room_assignment_from_classes(assigned_pair_id)
+            else:
+                room_assignment_section_dict = None
+                self.unassigned_section, self.moved_section, self.plan_optimal = list(), list(), True
+            pair_id_section_array = np.full(len(self.all_section), -1, dtype=np.int64)
+            pair_id_section_array[self.pair_section_id[assigned_pair_id]] = assigned_pair_id
+            #room as it appears in the model, which is a class of rooms if aggregate_equivalent_rooms is True
+            model_room_section_dict = self.get_room_assignment_from_pairs(assigned_pair_id)
+            if room_assignment_section_dict is None:
+                room_assignment_section_dict = model_room_section_dict
+
+            final_output = course_data.copy()
+            section_column = final_output["subject_course_section_occurrence"]
+            section_id = section_column.map(self.section_id_dict).fillna(-1).astype(np.int64).to_numpy()
+            final_output["pair_id"] = np.where(section_id >= 0, pair_id_section_array[section_id], -1)
+            final_output["model_room"] = section_column.map(model_room_section_dict)
+            final_output["bldg_room"] = section_column.map(room_assignment_section_dict)
+            room_column_dict = room_data.drop_duplicates("bldg_room").set_index("bldg_room")
+            final_output["capacity"] = final_output["bldg_room"].map(room_column_dict["capacity"])
+            final_output["Room Use"] = final_output["bldg_room"].map(room_column_dict["use"])
+            final_output = self.get_additional_output_columns(final_output)
+            columns_to_keep = self.informative_output_columns + ["enrollment", "capacity", "days", "begin_time", "end_time", "exclusively_online", "Room Use"]
+            final_output = final_output[columns_to_keep]
+            final_output.to_csv(output_path, index=False)
+            phase.set_counts(num_rows=len(final_output), num_assigned=len(assigned_pair_id), num_unassigned_section=len(self.unassigned_section))
 
-        solution = {}
+    def get_assigned_pair_id(self, model):
+        """
+        Input:
+            model - str, dict or gurobipy.Model: solution, see output_result
+        Output:
+            assigned_pair_id - np.array[int]: sorted ids of the (section, room) pairs whose assignment variable is one
 
+        The variables of a model built by this object are in pair order, so their values are read in bulk and used as they are.
+        Variable names of a dict or .sol solution are mapped to pairs with a dictionary, rather than being parsed
+        """
         if isinstance(model, Model):
-            for v in model.getVars():
-                if v.x == 1:
-                    solution[v.varName] = v.x
-
-        elif isinstance(model, str):
-            with open(file=model, newline='\n') as csvfile:
-                reader = csv.reader((line.replace('  ', ' ') for line in csvfile), delimiter=' ')
-                next(reader)  # skip header
-
-                for var, value in reader:
-                    if int(value) == 1:
-                        solution[var] = float(value)
+            all_var = model.getVars()
+            if len(all_var) != len(self.section_room_indices) or (len(all_var) > 0 and all_var[-1].VarName != self.get_var_name(len(all_var) - 1)):
+                raise Exception("model was not built from the sets and parameters of this object")
+            return np.flatnonzero(np.array(model.getAttr("X", all_var)) > 0.5)
+
+        if isinstance(model, str):
+            solution = dp.read_solution_file(model)
+        elif isinstance(model, dict):
+            solution = model.items()
         else:
-            raise TypeError("model should be str or gurobipy.Model")
-
-        # Split the varName into seperate columns
-        sol = pd.DataFrame.from_dict(solution, orient='index')
-        sol.reset_index(level=0, inplace=True)
-        sol.columns = ["X_xr", "value"]
-        sol["X_xr"] = sol.X_xr.str.extract(r'\[(.*)\]')
-
-        output = sol["X_xr"].str.split("+", expand=True)
-        temp = output[0].str.split("_", expand=True)
-        output["Building"] = output[1].str.extract(r'^(.+?)_')
-        output["Room"] = output[1].str.extract(r'[^_]*_(.*)')
-        output.rename(columns={0: 'subject_course_section_occurrence', 1: 'bldg_room'}, inplace=True)
-
-
-        final_output = pd.merge(course_data, output, how='left', left_on=["subject_course_section_occurrence"],
-                                right_on=["subject_course_section_occurrence"])
-        final_output = pd.merge(final_output, room_data, how="left", left_on="bldg_room", right_on="bldg_room")
-        final_output = self.get_additional_output_columns(final_output)
-        final_output.rename(columns={"use": 'Room Use'}, inplace=True)
-        columns_to_keep = self.informative_output_columns + ["enrollment", "capacity", "days", "begin_time", "end_time", "exclusively_online", "Room Use"]
-        final_output = final_output[columns_to_keep]
-        final_output.to_csv(output_path, index=False)
+            raise TypeError("model should be str, dict or gurobipy.Model")
+        pair_id_var_name_dict = {self.get_var_name(pair_id): pair_id for pair_id in range(len(self.section_room_indices))}
+        assigned_pair_id = list()
+        for var_name, value in solution:
+            if value > 0.5:
+                if var_name not in pair_id_var_name_dict:
+                    raise Exception("The solution has a variable that is not in the model: " + str(var_name))
+                assigned_pair_id.append(pair_id_var_name_dict[var_name])
+        return np.array(sorted(assigned_pair_id), dtype=np.int64)
+
+    def get_var_name(self, pair_id):
+        """
+        Input:
+            pair_id - int: id of a (section, room) pair
+        Output:
+            var_name - str: name of the assignment variable of the pair
+        """
+        return 'X_xr[%s+%s]' % (self.all_section[self.pair_section_id[pair_id]], self.all_room[self.section_room_indices[pair_id]])
 
 if __name__ == "__main__":
 
@@ -1,4 +1,5 @@
 import pandas as pd
+import numpy as np
 import sys
 from gurobipy import *
 
@@ -11,6 +12,9 @@ class RoomAssignmentStabilityModePreferencesContactOpt(RoomAssignmentModePrefere
     # model_description = "stability_mode_preferences_contact_max"
     informative_output_columns = ["subject_code", "course_number", "course_section", "bldg_room", "delivery_mode", "in_person_hours", "preference"]
     model_description = "stability_mode_preferences_contact_max"
+    # reassignment cost of moving a section to another room of its existing building
+    same_building_penalty = 50
+    preprocessing_inputs = RoomAssignmentModePreferencesContactOpt.preprocessing_inputs + ["building_location_data", "same_building_penalty"]
 
     def __init__(self, course_data, room_data, building_location_data, minimum_section_contact_days, weeks_in_semester, preference_objective_tollerance, contact_hours_objective_tollerance):
         super().__init__(course_data, room_data, minimum_section_contact_days, weeks_in_semester, preference_objective_tollerance)
@@ -22,22 +26,95 @@ class RoomAssignmentStabilityModePreferencesContactOpt(RoomAssignmentModePrefere
     def get_all_sets_params(self):
         super().get_all_sets_params()
 
-        self.existing_room_assignment_section_dict = sp.get_existing_room_assignment_section_dict(self.course_data)
-        self.room_building_dict, self.building_room_dict = sp.get_room_building_sets(self.all_room, self.course_data)
-        self.all_building = set(self.room_building_dict.keys())
-        self.dist_between_building_dict = sp.get_dist_between_buildings(self.building_location_data,
-                                                                        self.all_building)
-        self.reassginment_cost_section_room_dict = sp.get_reassignment_cost(self.all_section,
-                                                                            self.all_room,
-                                                                            self.dist_between_building_dict,
-                                                                            self.existing_room_assignment_section_dict,
-                                                                            self.building_room_dict)
+        with self.instrument("sets.plan_stability") as phase:
+            self.existing_room_assignment_section_dict = sp.get_existing_room_assignment_section_dict(self.course_data)
+            if self.room_class_dict is not None:
+                # staying in any room of the existing room's class counts as staying in the same room
+                class_room_dict = {room: room_class for room_class, class_room in self.room_class_dict.items() for room in class_room}
+                self.existing_room_assignment_section_dict = {section: class_room_dict.get(room, room) for section, room in self.existing_room_assignment_section_dict.items()}
+            self.room_building_dict, self.building_room_dict = sp.get_room_building_sets(self.all_room, self.course_data)
+            self.all_building = set(self.room_building_dict.keys())
+            self.building_id_dict, self.dist_between_building_matrix = sp.get_dist_between_buildings_matrix(self.building_location_data,
+                                                                                                            self.all_building)
+            self.reassignment_cost_pair_array, = self.get_pair_params(["reassignment_cost_pair_array"], self.get_reassignment_cost_params)
+            self.reassginment_cost_section_room_dict = sp.get_pair_dict(self.all_section,
+                                                                        self.all_room,
+                                                                        self.pair_section_id,
+                                                                        self.section_room_indices,
+                                                                        self.reassignment_cost_pair_array)
+            phase.set_counts(num_building=len(self.all_building))
         return
 
+    def get_reassignment_cost_params(self, pair_id):
+        """
+        Input:
+            pair_id - np.array[int]: ids of the (section, room) pairs to compute parameters for
+        Output:
+            reassignment_cost_pair_array - np.array[float]: cost of reassigning the section of each pair in pair_id to the room of the pair
+        """
+        return (sp.get_reassignment_cost_pair(self.pair_section_id[pair_id],
+                                              self.section_room_indices[pair_id],
+                                              self.all_section,
+                                              self.all_room,
+                                              self.building_id_dict,
+                                              self.dist_between_building_matrix,
+                                              self.existing_room_assignment_section_dict,
+                                              self.building_room_dict,
+                                              same_building_penalty=self.same_building_penalty),)
+
+    def get_pair_array_names(self):
+        return super().get_pair_array_names() + ["reassignment_cost_pair_array"]
+
+    def get_same_room_coeff(self):
+        """
+        Output:
+            same_room_coeff - np.array[float]: 1 for the (section, room) pairs that keep a section in its existing room
+        """
+        existing_room_id_section_array = np.array([self.room_id_dict.get(self.existing_room_assignment_section_dict.get(section), -1) for section in self.all_section], dtype=np.int64)
+        return (existing_room_id_section_array[self.pair_section_id] == self.section_room_indices).astype(float)
+
+    def get_repair_room_assignment(self):
+        """
+        Output:
+            room_assignment_section_dict - dict{str: str}: maps each assigned section to its room
+
+        Repair heuristic seeded from the existing room assignment:
+            sections keep their existing room whenever it is still available to them and free,
+            in decreasing order of contact hours objective coefficient, so conflicting sections with less contact hours are displaced.
+            Displaced sections, and sections without an existing room, are then placed in their free room with the lowest reassignment cost.
+            Sections that prefer to be remote are not moved to another room.
+        get_all_sets_params must have been called, e.g. through construct_model
+        """
+        contact_hours_coeff = self.get_contact_hours_coeff()
+        same_room_coeff = self.get_same_room_coeff()
+        kept_pair_id = self.get_greedy_pair_id(np.column_stack([np.where(same_room_coeff > 0, 1.0, -1.0), contact_hours_coeff]))
+
+        preference_coeff, _ = self.get_mode_preferences_coeff()
+        assigned_pair_id = self.get_greedy_pair_id(np.column_stack([np.where(preference_coeff >= 0, 1.0, -1.0), -self.reassignment_cost_pair_array, contact_hours_coeff]),
+                                                   assigned_pair_id=kept_pair_id)
+        print("kept " + str(len(kept_pair_id)) + " sections in their existing room, and moved " + str(len(assigned_pair_id) - len(kept_pair_id)) + " sections")
+        return self.get_room_assignment_from_pairs(assigned_pair_id)
+
+    def solve_repair(self):
+        """
+        Output:
+            solution - dict{str: float}: value of every nonzero variable of the repaired assignment, by variable name.
+                       It can be passed to output_result in place of a solved model
+        """
+        self.prepare_sets_params()
+        return self.get_solution_from_room_assignment(self.get_repair_room_assignment())
+
+    def get_plan_stability_lin_expr(self, model_vars):
+        return LinExpr(self.reassignment_cost_pair_array.tolist(), model_vars["X_xr_pair"])
+
+    def set_model_ir_plan_stability_objective(self, model_ir, model_ir_vars, index, priority):
+        model_ir.set_objective_n(model_ir_vars["X_xr_pair"],
+                                 -1 * self.reassignment_cost_pair_array,
+                                 index=index,
+                                 priority=priority)
+
     def set_plan_stability_objective(self, model, model_vars, index, priority):
-        X_xr = model_vars["X_xr"]
-        model.setObjectiveN(-1 * quicksum(self.reassginment_cost_section_room_dict[section, room] *  X_xr[(section, room)] \
-                           for section in self.all_section for room in self.room_section_dictionary[section]),
+        model.setObjectiveN(-1 * self.get_plan_stability_lin_expr(model_vars),
                            index=index,
                            priority=priority)
 
@@ -49,6 +126,13 @@ class RoomAssignmentStabilityModePreferencesContactOpt(RoomAssignmentModePrefere
         self.set_plan_stability_objective(model,model_vars, index=2, priority=1)
         return
 
+    def set_model_ir_objective(self, model_ir, model_ir_vars):
+        model_ir.model_sense = GRB.MAXIMIZE
+        self.set_model_ir_mode_preferences_objective(model_ir, model_ir_vars, index=0, priority=3)
+        self.set_model_ir_contact_hours_objective(model_ir, model_ir_vars, index=1, priority=2)
+        self.set_model_ir_plan_stability_objective(model_ir, model_ir_vars, index=2, priority=1)
+        return
+
 
     @classmethod
     def read_filenames(cls, system_arguements):
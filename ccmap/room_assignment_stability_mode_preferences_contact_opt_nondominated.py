@@ -1,15 +1,22 @@
 import pandas as pd
+import numpy as np
 import sys
+import os
+import time
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
 from gurobipy import *
 
 import data_process as dp
 import set_process as sp
+import local_search as ls
 from room_assignment_stability_mode_preferences_contact_opt import RoomAssignmentStabilityModePreferencesContactOpt
 
 class RoomAssignmentStabilityModePreferencesContactOptNondominated(RoomAssignmentStabilityModePreferencesContactOpt):
     
     informative_output_columns = ["subject_code", "course_number", "course_section", "bldg_room", "delivery_mode", "in_person_hours", "preference", "raw_preference"]
     model_description = "nondominated_stability_mode_preferences_contact_max"
+    global_side_constraints = ["preference_min_bound", "contact_hours_min_bound", "same_room_min_count"]
 
     def __init__(self, course_data, room_data, building_location_data, minimum_section_contact_days, weeks_in_semester, preference_objective_weight, contact_hours_objective_weight, plan_stability_objective_weight, preference_min_bound, contact_hours_min_bound, same_room_min_count, distance_max_bound):
         super().__init__(course_data, room_data, building_location_data, minimum_section_contact_days, weeks_in_semester, preference_objective_tollerance=None, contact_hours_objective_tollerance=None)
@@ -24,43 +31,205 @@ class RoomAssignmentStabilityModePreferencesContactOptNondominated(RoomAssignmen
 
 
     def set_full_mode_preference_contact_hours_plan_stability_objective(self, model, model_vars, index=0, priority=1):
-        X_xr = model_vars["X_xr"]
-
-        plan_stability_lin_expr = quicksum(self.reassginment_cost_section_room_dict[section, room] *  X_xr[(section, room)] \
-                                                for section in self.all_section for room in self.room_section_dictionary[section])
-        preferences_lin_expr = quicksum(X_xr[(section, room)] for section in self.all_section for room in self.preferred_room_section_dictionary[section]) + \
-                                    quicksum(1 - quicksum(X_xr[(section, room)] for room in self.room_section_dictionary[section]) for section in self.all_section if "remote" in self.preferred_delivery_mode_section_dict[section])
-        contact_hours_lin_expr = quicksum(self.total_contact_hours_section_room_dict[section, room] * self.enrollment_section_dictionary[section] * self.priority_boost_section_dict[section] * X_xr[(section, room)] \
-                                          for section in self.all_section for room in self.room_section_dictionary[section])
+        plan_stability_lin_expr = self.get_plan_stability_lin_expr(model_vars)
+        preferences_lin_expr = self.get_mode_preferences_lin_expr(model_vars)
+        contact_hours_lin_expr = self.get_contact_hours_lin_expr(model_vars)
         
         model.setObjectiveN( plan_stability_lin_expr * self.plan_stability_objective_weight + preferences_lin_expr * self.preference_objective_weight + contact_hours_lin_expr * self.contact_hours_objective_weight, index=index, priority=priority)
         pass
 
-    def set_model_constrs(self, model, model_vars):
+    def get_full_mode_preference_contact_hours_plan_stability_coeff(self):
+        """
+        Output:
+            full_coeff - np.array[float]: objective coefficient of each (section, room) pair in the weighted objective
+            full_constant - float: constant term of the weighted objective
+        """
+        preference_coeff, preference_constant = self.get_mode_preferences_coeff()
+        full_coeff = self.reassignment_cost_pair_array * self.plan_stability_objective_weight + preference_coeff * self.preference_objective_weight + self.get_contact_hours_coeff() * self.contact_hours_objective_weight
+        return full_coeff, preference_constant * self.preference_objective_weight
 
-        super().set_model_constrs(model, model_vars)
+    def set_model_ir_full_mode_preference_contact_hours_plan_stability_objective(self, model_ir, model_ir_vars, index=0, priority=1):
+        full_coeff, full_constant = self.get_full_mode_preference_contact_hours_plan_stability_coeff()
+        model_ir.set_objective_n(model_ir_vars["X_xr_pair"], full_coeff, constant=full_constant, index=index, priority=priority)
 
-        X_xr = model_vars["X_xr"]
+    def get_local_search_room_assignment(self, max_iterations=None, time_limit=None, seed=0):
+        """
+        Input:
+            max_iterations - int: number of moves tried, see ls.anneal_room_assignment
+            time_limit - float: seconds after which the search stops
+            seed - int: seed of the random number generator
+        Output:
+            room_assignment_section_dict - dict{str: str}: maps each assigned section to its room
 
-        preferences_lin_expr = quicksum(X_xr[(section, room)] for section in self.all_section for room in self.preferred_room_section_dictionary[section]) + \
-                                    quicksum(1 - quicksum(X_xr[(section, room)] for room in self.room_section_dictionary[section]) for section in self.all_section if "remote" in self.preferred_delivery_mode_section_dict[section])
+        Solver free simulated annealing on the weighted objective, started from the greedy assignment.
+        preference_min_bound, contact_hours_min_bound and same_room_min_count are enforced through penalties,
+        and whether the returned assignment satisfies them is stored in local_search_info["feasible"].
+        Constraints and objectives added by descendant classes are not taken into account.
+        get_all_sets_params must have been called, e.g. through construct_model
+        """
+        full_coeff, _ = self.get_full_mode_preference_contact_hours_plan_stability_coeff()
+        preference_coeff, preference_constant = self.get_mode_preferences_coeff()
+        timeslot_mask_section_dict = sp.get_timeslot_mask_section_dict(self.section_timeslot_clash_dictionary, self.all_simple_timeslot)
+        assigned_pair_id, self.local_search_info = ls.anneal_room_assignment(self.section_room_indptr,
+                                                                             self.section_room_indices,
+                                                                             full_coeff,
+                                                                             np.column_stack([preference_coeff, self.get_contact_hours_coeff(), self.get_same_room_coeff()]),
+                                                                             [self.preference_min_bound - preference_constant, self.contact_hours_min_bound, self.same_room_min_count],
+                                                                             [timeslot_mask_section_dict.get(section, 0) for section in self.all_section],
+                                                                             [self.room_count_dict[room] for room in self.all_room],
+                                                                             initial_pair_id=self.get_greedy_pair_id(self.get_greedy_pair_score()),
+                                                                             max_iterations=max_iterations,
+                                                                             time_limit=time_limit,
+                                                                             seed=seed)
+        print("local search objective: " + str(self.local_search_info["objective"]) + ", satisfies bounds: " + str(self.local_search_info["feasible"]))
+        return self.get_room_assignment_from_pairs(assigned_pair_id)
 
-        contact_hours_lin_expr = quicksum(self.total_contact_hours_section_room_dict[section, room] * self.enrollment_section_dictionary[section] * self.priority_boost_section_dict[section] * X_xr[(section, room)] \
-                                          for section in self.all_section for room in self.room_section_dictionary[section])
-        same_room_lin_expr = quicksum(X_xr[(section, self.existing_room_assignment_section_dict[section])] for section in self.all_section if section in self.existing_room_assignment_section_dict and self.existing_room_assignment_section_dict[section] in self.room_section_dictionary[section])
-        plan_stability_lin_expr = quicksum(self.reassginment_cost_section_room_dict[section, room] *  X_xr[(section, room)] \
-                                                for section in self.all_section for room in self.room_section_dictionary[section])
+    def solve_local_search(self, max_iterations=None, time_limit=None, seed=0):
+        """
+        Output:
+            solution - dict{str: float}: value of every nonzero variable of the local search solution, by variable name.
+                       It can be passed to output_result in place of a solved model
+        """
+        self.prepare_sets_params()
+        return self.get_solution_from_room_assignment(self.get_local_search_room_assignment(max_iterations, time_limit, seed))
 
-        C_preference_bound = model.addConstr(preferences_lin_expr >= self.preference_min_bound, "")
-        C_preference_bound = model.addConstr(preferences_lin_expr >= self.preference_min_bound, "")
-        C_contact_hours_bound = model.addConstr(contact_hours_lin_expr >= self.contact_hours_min_bound, "")
-        C_stability_same_room_bound = model.addConstr(same_room_lin_expr >= self.same_room_min_count, "")
+    def get_side_constraints(self):
+        side_constraint_dict = super().get_side_constraints()
+        preference_coeff, preference_constant = self.get_mode_preferences_coeff()
+        side_constraint_dict["preference_min_bound"] = (preference_coeff, self.preference_min_bound - preference_constant)
+        side_constraint_dict["contact_hours_min_bound"] = (self.get_contact_hours_coeff(), self.contact_hours_min_bound)
+        side_constraint_dict["same_room_min_count"] = (self.get_same_room_coeff(), self.same_room_min_count)
+        return side_constraint_dict
+
+    def get_objective_components(self, pair_value):
+        """
+        Input:
+            pair_value - np.array[float]: value of the assignment variable of each (section, room) pair
+        Output:
+            objective_component_dict - dict{str: float}: value of each of the weighted objective terms, and of the same room count
+        """
+        preference_coeff, preference_constant = self.get_mode_preferences_coeff()
+        return {"preference": float(preference_coeff @ pair_value) + preference_constant,
+                "contact_hours": float(self.get_contact_hours_coeff() @ pair_value),
+                "reassignment_cost": float(self.reassignment_cost_pair_array @ pair_value),
+                "same_room_count": float(self.get_same_room_coeff() @ pair_value)}
+
+    def get_frontier(self, bound_grid, output_directory=None, max_workers=1, params=None):
+        """
+        Input:
+            bound_grid - dict{str: list[float]}: values to sweep for any of preference_min_bound, contact_hours_min_bound and same_room_min_count.
+                         Every combination of values is solved. Bounds that are not in bound_grid keep their current value
+            output_directory - str: if passed, the plan of every grid point is written to output_directory/frontier_<point>.csv
+            max_workers - int: number of processes solving grid points concurrently
+            params - dict{str: any}: gurobi parameters, e.g. {"OutputFlag": 0, "TimeLimit": 60}
+        Output:
+            frontier - pd.DataFrame: one row per grid point with its bounds, gurobi status, solve time in seconds,
+                       weighted objective and objective components
+
+        Epsilon constraint method: the model is built once per process, and only the right hand sides of the bound constraints change between points.
+        Grid points are visited in snake order, so consecutive points are neighbors, and each solve starts from the solution of the previous point
+        """
+        for bound_name in bound_grid:
+            if bound_name not in ["preference_min_bound", "contact_hours_min_bound", "same_room_min_count"]:
+                raise Exception("bound_grid may only sweep preference_min_bound, contact_hours_min_bound and same_room_min_count, but got: " + str(bound_name))
+
+        self.prepare_sets_params()
+        bound_name_list = list(bound_grid.keys())
+        point_list = [dict(zip(bound_name_list, bound_value)) for bound_value in get_snake_product([list(bound_grid[bound_name]) for bound_name in bound_name_list])]
+        indexed_point_list = list(enumerate(point_list))
+        if max_workers == 1:
+            frontier_row_list = self.solve_frontier_points(indexed_point_list, output_directory, params)
+        else:
+            chunk_size = -(-len(indexed_point_list) // max_workers)
+            point_chunk_list = [indexed_point_list[chunk_start:chunk_start + chunk_size] for chunk_start in range(0, len(indexed_point_list), chunk_size)]
+            frontier_row_list = []
+            with ProcessPoolExecutor(max_workers=max_workers, mp_context=multiprocessing.get_context("spawn")) as executor:
+                for chunk_row_list in executor.map(_solve_frontier_chunk, [(self, point_chunk, output_directory, params) for point_chunk in point_chunk_list]):
+                    frontier_row_list.extend(chunk_row_list)
+        return pd.DataFrame(frontier_row_list).sort_values("point").reset_index(drop=True)
+
+    def solve_frontier_points(self, indexed_point_list, output_directory=None, params=None):
+        """
+        Input:
+            indexed_point_list - list[(int, dict{str: float})]: index and bound values of each grid point, in solving order
+            output_directory, params: see get_frontier
+        Output:
+            frontier_row_list - list[dict{str: any}]: one frontier row per grid point
+        """
+        model = self.build_model()
+        for param_name, param_value in (params or {}).items():
+            model.setParam(param_name, param_value)
+        model.update()
+        all_var = model.getVars()
+        _, preference_constant = self.get_mode_preferences_coeff()
+
+        frontier_row_list = []
+        # the bounds are set for each point while it is solved, and the bounds the object had before are restored afterwards
+        initial_bound_dict = {bound_name: getattr(self, bound_name) for point_index, point in indexed_point_list for bound_name in point}
+        try:
+            for point_index, point in indexed_point_list:
+                for bound_name, bound_value in point.items():
+                    setattr(self, bound_name, bound_value)
+                self.side_constr_dict["preference_min_bound"].RHS = self.preference_min_bound - preference_constant
+                self.side_constr_dict["contact_hours_min_bound"].RHS = self.contact_hours_min_bound
+                self.side_constr_dict["same_room_min_count"].RHS = self.same_room_min_count
+
+                start_time = time.time()
+                model.optimize()
+                frontier_row = {"point": point_index,
+                                "preference_min_bound": self.preference_min_bound,
+                                "contact_hours_min_bound": self.contact_hours_min_bound,
+                                "same_room_min_count": self.same_room_min_count,
+                                "status": model.Status,
+                                "solve_time": time.time() - start_time}
+                if model.SolCount > 0:
+                    pair_value = np.array(model.getAttr("X", all_var))
+                    frontier_row["weighted_objective"] = model.ObjVal
+                    frontier_row.update(self.get_objective_components(pair_value))
+                    model.setAttr("Start", all_var, pair_value.tolist())
+                    if output_directory is not None:
+                        self.output_result(pd.concat([self.course_data, self.course_data_exclusively_online]),
+                                           self.room_data,
+                                           model,
+                                           output_path=os.path.join(output_directory, "frontier_" + str(point_index) + ".csv"))
+                frontier_row_list.append(frontier_row)
+        finally:
+            for bound_name, bound_value in initial_bound_dict.items():
+                setattr(self, bound_name, bound_value)
+        return frontier_row_list
 
     def set_objective(self, model, model_vars):
         model.ModelSense = GRB.MAXIMIZE
         self.set_full_mode_preference_contact_hours_plan_stability_objective(model, model_vars)
         return
 
+    def set_model_ir_objective(self, model_ir, model_ir_vars):
+        model_ir.model_sense = GRB.MAXIMIZE
+        self.set_model_ir_full_mode_preference_contact_hours_plan_stability_objective(model_ir, model_ir_vars)
+        return
+
+
+def get_snake_product(value_list_list):
+    """
+    Input:
+        value_list_list - list[list]: values of each dimension of a grid
+    Output:
+        all_point - list[tuple]: every point of the grid, ordered so that consecutive points differ in a single dimension
+    """
+    if len(value_list_list) == 0:
+        return [()]
+    all_point = []
+    for value_index, value in enumerate(value_list_list[0]):
+        all_inner_point = get_snake_product(value_list_list[1:])
+        if value_index % 2 == 1:
+            all_inner_point.reverse()
+        all_point.extend((value,) + inner_point for inner_point in all_inner_point)
+    return all_point
+
+def _solve_frontier_chunk(frontier_chunk_args):
+    opt, indexed_point_list, output_directory, params = frontier_chunk_args
+    return opt.solve_frontier_points(indexed_point_list, output_directory, params)
+
 
 if __name__ == "__main__":
 
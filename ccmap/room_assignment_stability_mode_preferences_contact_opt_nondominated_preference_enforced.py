@@ -11,6 +11,7 @@ class RoomAssignmentStabilityModePreferencesContactOptNondominatedPreferenceEnfo
     # model_description = "stability_mode_preferences_contact_max"
     informative_output_columns = ["subject_code", "course_number", "course_section", "bldg_room", "delivery_mode", "in_person_hours", "preference", "raw_preference"]
     model_description = "nondominated_stability_mode_preferences_contact_preference_enforced"
+    global_side_constraints = RoomAssignmentStabilityModePreferencesContactOptNondominated.global_side_constraints + ["total_pererence_bound", "residential_spread_preference_bound"]
 
     def __init__(self, course_data, room_data, building_location_data, minimum_section_contact_days, weeks_in_semester, preference_objective_weight, contact_hours_objective_weight, plan_stability_objective_weight, preference_min_bound, contact_hours_min_bound, same_room_min_count, distance_max_bound, total_pererence_bound, residential_spread_preference_bound):
         super().__init__(course_data, room_data, building_location_data, minimum_section_contact_days, weeks_in_semester, preference_objective_weight, contact_hours_objective_weight, plan_stability_objective_weight, preference_min_bound, contact_hours_min_bound, same_room_min_count, distance_max_bound)
@@ -19,21 +20,22 @@ class RoomAssignmentStabilityModePreferencesContactOptNondominatedPreferenceEnfo
         return
 
 
-    def set_model_constrs(self, model, model_vars):
-        super().set_model_constrs(model, model_vars)
-        X_xr = model_vars["X_xr"]
-
-        residential_spread_preferences_lin_expr = quicksum(X_xr[(section, room)] for section in self.all_section for room in self.preferred_room_section_dictionary[section] if self.preferred_delivery_mode_section_dict[section] == {"residential_spread"})
-        C_residential_preference_bound = model.addConstr(residential_spread_preferences_lin_expr >= self.residential_spread_preference_bound, "")
-
-        preferences_lin_expr = quicksum(X_xr[(section, room)] for section in self.all_section for room in self.preferred_room_section_dictionary[section])
-        C_residential_preference_bound = model.addConstr(preferences_lin_expr >= self.total_pererence_bound, "")
+    def get_side_constraints(self):
+        side_constraint_dict = super().get_side_constraints()
+        side_constraint_dict["residential_spread_preference_bound"] = (self.get_residential_spread_preferences_coeff(), self.residential_spread_preference_bound)
+        side_constraint_dict["total_pererence_bound"] = (self.preferred_pair_array.astype(float), self.total_pererence_bound)
+        return side_constraint_dict
 
     def set_objective(self, model, model_vars):
         model.ModelSense = GRB.MAXIMIZE
         self.set_full_mode_preference_contact_hours_plan_stability_objective(model, model_vars, index=0, priority=1)
         return
 
+    def set_model_ir_objective(self, model_ir, model_ir_vars):
+        model_ir.model_sense = GRB.MAXIMIZE
+        self.set_model_ir_full_mode_preference_contact_hours_plan_stability_objective(model_ir, model_ir_vars, index=0, priority=1)
+        return
+
 
 if __name__ == "__main__":
 
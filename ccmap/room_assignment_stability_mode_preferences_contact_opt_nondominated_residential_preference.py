@@ -25,12 +25,26 @@ class RoomAssignmentStabilityModePreferencesContactOptNondominatedResidentialPre
         model.setObjectiveN(residential_spread_preferences_lin_expr, index=index, priority=priority, reltol=self.residential_preference_tollerance)
 
 
+    def set_model_ir_residential_preference_objective(self, model_ir, model_ir_vars, index, priority):
+        model_ir.set_objective_n(model_ir_vars["X_xr_pair"],
+                                 self.get_residential_spread_preferences_coeff(),
+                                 index=index,
+                                 priority=priority,
+                                 reltol=self.residential_preference_tollerance)
+
+
     def set_objective(self, model, model_vars):
         model.ModelSense = GRB.MAXIMIZE
         self.set_residential_preference_objective(model, model_vars, index=0, priority=2)
         self.set_full_mode_preference_contact_hours_plan_stability_objective(model, model_vars, index=1, priority=1)
         return
 
+    def set_model_ir_objective(self, model_ir, model_ir_vars):
+        model_ir.model_sense = GRB.MAXIMIZE
+        self.set_model_ir_residential_preference_objective(model_ir, model_ir_vars, index=0, priority=2)
+        self.set_model_ir_full_mode_preference_contact_hours_plan_stability_objective(model_ir, model_ir_vars, index=1, priority=1)
+        return
+
 
 if __name__ == "__main__":
 
@@ -10,6 +10,7 @@ class RoomAssignmentStabilityOptPreferenceEnforcedResdentialPreferenceEnforced(R
 
     informative_output_columns = ["subject_code", "course_number", "course_section", "bldg_room", "delivery_mode", "in_person_hours", "preference"]
     model_description = "stability_preference_enforced_resdential_preference_enforced"
+    global_side_constraints = ["residential_spread_preference_bound", "total_pererence_bound"]
 
     def __init__(self, course_data, room_data, building_location_data, minimum_section_contact_days, weeks_in_semester, residential_spread_preference_bound, total_pererence_bound):
         super().__init__(course_data=course_data, room_data=room_data, building_location_data=building_location_data, minimum_section_contact_days=minimum_section_contact_days, weeks_in_semester=weeks_in_semester, preference_objective_tollerance=0, contact_hours_objective_tollerance=1)
@@ -18,22 +19,22 @@ class RoomAssignmentStabilityOptPreferenceEnforcedResdentialPreferenceEnforced(R
         return
 
 
-    def set_model_constrs(self, model, model_vars):
-        super().set_model_constrs(model, model_vars)
-        X_xr = model_vars["X_xr"]
-
-        residential_spread_preferences_lin_expr = quicksum(X_xr[(section, room)] for section in self.all_section for room in self.preferred_room_section_dictionary[section] if self.preferred_delivery_mode_section_dict[section] == {"residential_spread"})
-        C_residential_preference_bound = model.addConstr(residential_spread_preferences_lin_expr >= self.residential_spread_preference_bound, "")
-
-        preferences_lin_expr = quicksum(X_xr[(section, room)] for section in self.all_section for room in self.preferred_room_section_dictionary[section])
-        C_residential_preference_bound = model.addConstr(preferences_lin_expr >= self.total_pererence_bound, "")
-
+    def get_side_constraints(self):
+        side_constraint_dict = super().get_side_constraints()
+        side_constraint_dict["residential_spread_preference_bound"] = (self.get_residential_spread_preferences_coeff(), self.residential_spread_preference_bound)
+        side_constraint_dict["total_pererence_bound"] = (self.preferred_pair_array.astype(float), self.total_pererence_bound)
+        return side_constraint_dict
 
     def set_objective(self, model, model_vars):
         model.ModelSense = GRB.MAXIMIZE
         self.set_plan_stability_objective(model,model_vars, index=0, priority=1)
         return
 
+    def set_model_ir_objective(self, model_ir, model_ir_vars):
+        model_ir.model_sense = GRB.MAXIMIZE
+        self.set_model_ir_plan_stability_objective(model_ir, model_ir_vars, index=0, priority=1)
+        return
+
 
 if __name__ == "__main__":
 
@@ -1,7 +1,9 @@
 from math import floor
+from itertools import product
+from heapq import heappush, heappop
 import numpy as np
 import pandas as pd
-from haversine import haversine
+from haversine import haversine_vector
 
 
 all_permissible_delivery_mode = {"residential_spread",
@@ -9,6 +11,65 @@ all_permissible_delivery_mode = {"residential_spread",
                                 "hybrid_touchpoint",
                                 "remote"}
 
+#delivery modes are coded by their position in this list, e.g. in the output of get_contact_hours_matrix
+delivery_mode_list = ["residential_spread",
+                      "hybrid_split",
+                      "hybrid_touchpoint",
+                      "remote"]
+
+dow_bit_dict = {"M": 1,
+                "T": 2,
+                "W": 4,
+                "R": 8,
+                "F": 16,
+                "S": 32,
+                "U": 64}
+
+#number of days in each day of week bitmask
+dow_count_array = np.array([bin(dow_mask).count("1") for dow_mask in range(1 << len(dow_bit_dict))], dtype=np.int64)
+
+
+class Timeslot:
+    """
+    Parsed timeslot, e.g. "MWF_1010_1100" is held as Timeslot(dow_mask=21, start_minute=610, end_minute=660)
+        dow_mask - int: bitmask of the days of the week the timeslot is taught, according to dow_bit_dict
+        start_minute - int: start of the timeslot, in minutes since midnight
+        end_minute - int: end of the timeslot, in minutes since midnight
+    Timeslots should be created with get_timeslot, which parses each distinct timeslot string only once
+    """
+
+    __slots__ = ("dow_mask", "start_minute", "end_minute")
+
+    def __init__(self, dow_mask, start_minute, end_minute):
+        self.dow_mask = dow_mask
+        self.start_minute = start_minute
+        self.end_minute = end_minute
+
+    def __repr__(self):
+        return "Timeslot(" + "".join(self.get_days()) + "_" + get_time_str(self.start_minute) + "_" + get_time_str(self.end_minute) + ")"
+
+    def __eq__(self, other):
+        return isinstance(other, Timeslot) and self.get_interval() == other.get_interval()
+
+    def __hash__(self):
+        return hash(self.get_interval())
+
+    def get_interval(self):
+        return self.dow_mask, self.start_minute, self.end_minute
+
+    def get_days(self):
+        """
+        Output:
+            days - list[str]: days of the week the timeslot is taught, in the order of dow_bit_dict
+        """
+        return [single_dow for single_dow, dow_bit in dow_bit_dict.items() if self.dow_mask & dow_bit]
+
+    def overlaps(self, other):
+        return bool(self.dow_mask & other.dow_mask) and self.start_minute < other.end_minute and other.start_minute < self.end_minute
+
+#maps each timeslot string parsed so far to its Timeslot
+timeslot_intern_dict = dict()
+
 
 def get_section_set(course_data, all_course):
     """
@@ -124,31 +185,43 @@ def get_room_sets(course_data, room_data, all_room, all_section):
         to the given row in course_data
 
 
-    The implmentation bellow is naive and may be improved for runtime
+    Rooms are first indexed by their "use", so each section only visits the rooms
+        that match one of its "room_use" values rather than every room
     """
 
-
-    #naive implementation
     bldgroom_section_dictionary = dict()
-    section_bldgroom_dictionary = dict()
     use_section_dict = pd.Series(course_data['room_use'].values,index=course_data['subject_course_section_occurrence']).to_dict()
     use_section_dict = {section: use.replace(" ", "").split(",") for section, use in use_section_dict.items()}
     use_bldgroom_dict = pd.Series(room_data['use'].values,index=room_data['bldg_room']).to_dict()
     use_bldgroom_dict = {bldgroom: use.replace(" ", "") for bldgroom, use in use_bldgroom_dict.items()}
-    
+
+    #index rooms by use, built once
+    bldgroom_use_dict = dict()
     for bldgroom in all_room:
-        section_bldgroom_dictionary[bldgroom] = set()
+        current_room_use = use_bldgroom_dict[bldgroom]
+        if current_room_use in bldgroom_use_dict:
+            bldgroom_use_dict[current_room_use].add(bldgroom)
+        else:
+            bldgroom_use_dict[current_room_use] = {bldgroom}
 
+    #compatible rooms for a section are the union over its uses
+    section_use_dict = dict()
     for section in all_section:
-        current_section_all_use = set(use_section_dict[section])
         bldgroom_current_section = set() #initialize set of bldgroom for current section
-        for bldgroom in all_room:
-            current_room_use = use_bldgroom_dict[bldgroom]
-            if current_room_use in current_section_all_use:
-                bldgroom_current_section.add(bldgroom)
-                section_bldgroom_dictionary[bldgroom].add(section)
+        for current_section_use in set(use_section_dict[section]):
+            if current_section_use in bldgroom_use_dict:
+                bldgroom_current_section.update(bldgroom_use_dict[current_section_use])
+            if current_section_use in section_use_dict:
+                section_use_dict[current_section_use].add(section)
+            else:
+                section_use_dict[current_section_use] = {section}
         bldgroom_section_dictionary[section] = bldgroom_current_section #let the value of bldgroom_section_dictionary point to this set
 
+    #reverse map, one grouped pass over rooms. Each room gets its own set, since later steps modify these sets in place
+    section_bldgroom_dictionary = dict()
+    for bldgroom in all_room:
+        section_bldgroom_dictionary[bldgroom] = set(section_use_dict.get(use_bldgroom_dict[bldgroom], set()))
+
     return bldgroom_section_dictionary, section_bldgroom_dictionary
 
 
@@ -259,6 +332,277 @@ def get_room_sets_trivial(course_data, room_data, all_room, all_section):
     return room_section_dictionary, section_room_dictionary
 
 
+def get_id_dict(all_value):
+    """
+    Input:
+        all_value - list[str]: all values of a categorical field, e.g. all_section or all_room
+    Output:
+        id_dict - dict{str: int}: maps each value to its integer id, which is its position in all_value
+    """
+
+    return {value: value_id for value_id, value in enumerate(all_value)}
+
+
+def get_section_room_csr(all_section, room_id_dict, room_section_dictionary):
+    """
+    Input:
+        all_section - list[str]: all sections available in the optimization problem, in id order
+        room_id_dict - dict{str: int}: maps each room to its integer id
+        room_section_dictionary - dict{str: set(str)}: maps sections to rooms in which they may be taught
+    Output:
+        section_room_indptr - np.array[int]: has one more entry than all_section. The rooms available to the section with id i
+                                            are given by section_room_indices[section_room_indptr[i]:section_room_indptr[i + 1]]
+        section_room_indices - np.array[int]: room id of each (section, room) pair. Room ids are sorted within each section
+
+    Each (section, room) pair is identified by its position in section_room_indices,
+        so per pair parameters can be stored in numpy arrays aligned with section_room_indices
+    """
+
+    section_room_indptr = np.zeros(len(all_section) + 1, dtype=np.int64)
+    room_id_list = list()
+    for section_id, section in enumerate(all_section):
+        room_id_list.extend(sorted(room_id_dict[room] for room in room_section_dictionary[section]))
+        section_room_indptr[section_id + 1] = len(room_id_list)
+    section_room_indices = np.array(room_id_list, dtype=np.int64)
+    return section_room_indptr, section_room_indices
+
+
+def get_section_room_csr_from_pairs(num_section, num_room, pair_section_id, pair_room_id):
+    """
+    Input:
+        num_section, num_room - int: number of sections and rooms, i.e. len(all_section) and len(all_room)
+        pair_section_id, pair_room_id - array-like[int]: section and room ids of (section, room) pairs, in any order and possibly repeated
+    Output:
+        section_room_indptr, section_room_indices - np.array[int]: same structure as the output of get_section_room_csr, including each pair once
+    """
+
+    pair_key = np.unique(np.asarray(pair_section_id, dtype=np.int64) * num_room + np.asarray(pair_room_id, dtype=np.int64))
+    num_room_section = np.bincount(pair_key // num_room, minlength=num_section) if num_room > 0 else np.zeros(num_section, dtype=np.int64)
+    section_room_indptr = np.concatenate([[0], np.cumsum(num_room_section)]).astype(np.int64)
+    return section_room_indptr, (pair_key % num_room if num_room > 0 else pair_key).astype(np.int64)
+
+
+def get_pair_section_id(section_room_indptr):
+    """
+    Input:
+        section_room_indptr - np.array[int]: row pointers from get_section_room_csr
+    Output:
+        pair_section_id - np.array[int]: section id of each (section, room) pair, aligned with section_room_indices
+    """
+
+    return np.repeat(np.arange(len(section_room_indptr) - 1), np.diff(section_room_indptr))
+
+
+def filter_section_room_csr(section_room_indptr, section_room_indices, keep_pair):
+    """
+    Input:
+        section_room_indptr, section_room_indices - np.array[int]: output of get_section_room_csr
+        keep_pair - np.array[bool]: aligned with section_room_indices. True for the pairs that should be kept
+    Output:
+        section_room_indptr, section_room_indices - np.array[int]: same structure, only including the kept pairs
+
+    Pair parameters aligned with the input should be filtered with the same mask, e.g. total_contact_hours_pair_array[keep_pair]
+    """
+
+    pair_section_id = get_pair_section_id(section_room_indptr)
+    num_room_section = np.bincount(pair_section_id[keep_pair], minlength=len(section_room_indptr) - 1)
+    filtered_section_room_indptr = np.concatenate([[0], np.cumsum(num_room_section)]).astype(np.int64)
+    return filtered_section_room_indptr, section_room_indices[keep_pair]
+
+
+def get_room_sets_from_csr(all_section, all_room, section_room_indptr, section_room_indices):
+    """
+    Input:
+        all_section - list[str]: all sections available in the optimization problem, in id order
+        all_room - list[str]: all rooms available in the optimization problem, in id order
+        section_room_indptr, section_room_indices - np.array[int]: output of get_section_room_csr
+    Output:
+        room_section_dictionary - dict{str: set(str)}: maps sections to rooms in which they may be taught
+        section_room_dictionary - dict{str: set(str)}: maps rooms to sections that may be taught in that room
+
+    Dictionary view of the compatibility structure, in the same format as get_room_sets
+    """
+
+    room_section_dictionary = dict()
+    section_room_dictionary = {room: set() for room in all_room}
+    section_room_indptr = section_room_indptr.tolist()
+    section_room_indices = section_room_indices.tolist()
+    for section_id, section in enumerate(all_section):
+        available_room = {all_room[room_id] for room_id in section_room_indices[section_room_indptr[section_id]:section_room_indptr[section_id + 1]]}
+        room_section_dictionary[section] = available_room
+        for room in available_room:
+            section_room_dictionary[room].add(section)
+    return room_section_dictionary, section_room_dictionary
+
+
+def get_pair_id(section_room_indptr, section_room_indices, num_room, section_id, room_id):
+    """
+    Input:
+        section_room_indptr, section_room_indices - np.array[int]: output of get_section_room_csr
+        num_room - int: number of rooms, i.e. len(all_room)
+        section_id, room_id - array-like[int]: section and room ids of the (section, room) pairs to look up
+    Output:
+        pair_id - np.array[int]: position of each (section, room) pair in section_room_indices
+
+    Pairs are sorted by section and then by room, so they are located with a binary search on section_id * num_room + room_id
+    """
+
+    pair_key = get_pair_section_id(section_room_indptr) * num_room + section_room_indices
+    query_key = np.asarray(section_id, dtype=np.int64) * num_room + np.asarray(room_id, dtype=np.int64)
+    pair_id = np.searchsorted(pair_key, query_key)
+    if np.any(pair_id >= len(pair_key)) or np.any(pair_key[np.minimum(pair_id, len(pair_key) - 1)] != query_key):
+        raise Exception("Some of the (section, room) pairs are not available")
+    return pair_id
+
+
+def get_section_room_components(section_room_indptr, section_room_indices, num_room):
+    """
+    Input:
+        section_room_indptr, section_room_indices - np.array[int]: output of get_section_room_csr
+        num_room - int: number of rooms, i.e. len(all_room)
+    Output:
+        all_component - list[np.array[int]]: section ids of each connected component of the section room compatibility graph,
+                        largest component first. Sections without any available room are not part of any component
+
+    Room conflicts only link sections that share an available room, so the components can be optimized independently
+    """
+
+    parent_room_id = list(range(num_room))
+
+    def find_root(room_id):
+        while parent_room_id[room_id] != room_id:
+            parent_room_id[room_id] = parent_room_id[parent_room_id[room_id]]
+            room_id = parent_room_id[room_id]
+        return room_id
+
+    num_section = len(section_room_indptr) - 1
+    section_room_indptr = section_room_indptr.tolist()
+    section_room_indices = section_room_indices.tolist()
+    for section_id in range(num_section):
+        available_room_id = section_room_indices[section_room_indptr[section_id]:section_room_indptr[section_id + 1]]
+        if len(available_room_id) > 1:
+            root_room_id = find_root(available_room_id[0])
+            for room_id in available_room_id[1:]:
+                other_root_room_id = find_root(room_id)
+                if other_root_room_id != root_room_id:
+                    parent_room_id[other_root_room_id] = root_room_id
+
+    root_room_id_section_array = np.array([find_root(section_room_indices[section_room_indptr[section_id]])
+                                           if section_room_indptr[section_id + 1] > section_room_indptr[section_id] else -1
+                                           for section_id in range(num_section)], dtype=np.int64)
+    section_id_array = np.flatnonzero(root_room_id_section_array >= 0)
+    if len(section_id_array) == 0:
+        return list()
+    section_id_array = section_id_array[np.argsort(root_room_id_section_array[section_id_array], kind="stable")]
+    _, component_start = np.unique(root_room_id_section_array[section_id_array], return_index=True)
+    all_component = np.split(section_id_array, component_start[1:])
+    return sorted(all_component, key=len, reverse=True)
+
+
+def get_pair_dict(all_section, all_room, pair_section_id, pair_room_id, pair_value):
+    """
+    Input:
+        all_section - list[str]: all sections available in the optimization problem, in id order
+        all_room - list[str]: all rooms available in the optimization problem, in id order
+        pair_section_id - np.array[int]: section id of each (section, room) pair
+        pair_room_id - np.array[int]: room id of each (section, room) pair
+        pair_value - array-like: value of each (section, room) pair
+    Output:
+        value_section_room_dict - dict{(str, str): any}: maps each (section, room) pair to its value
+    """
+
+    section_room_pair = zip([all_section[section_id] for section_id in pair_section_id.tolist()],
+                            [all_room[room_id] for room_id in pair_room_id.tolist()])
+    return dict(zip(section_room_pair, np.asarray(pair_value).tolist()))
+
+
+def get_room_equivalence_classes(room_data):
+    """
+    Input:
+        room_data - pd.DataFrame: properly formatted room dataframe
+    Output:
+        class_room_data - pd.DataFrame: one row per class of equivalent rooms, with the same columns as room_data
+                                        The bldg_room of a class is the bldg_room of its room, if the class has a single room,
+                                        and "buildingcode_class" followed by a number otherwise
+        room_class_dict - dict{str: list(str)}: maps each class to the rooms in that class
+
+    Rooms in the same building, with the same capacity and the same use, are equivalent for every room assignment model,
+        except for the "same room" case of the plan stability objective
+    """
+
+    room_data = room_data.copy()
+    room_data["building"] = room_data["bldg_room"].astype(str).str.split("_").str[0]
+    room_class_dict = dict()
+    class_row_list = list()
+    num_class_building_dict = dict()
+    for (building, _, _), class_data in room_data.groupby(["building", "capacity", "use"], sort=False):
+        class_room = class_data["bldg_room"].tolist()
+        if len(class_room) == 1:
+            room_class = class_room[0]
+        else:
+            num_class_building_dict[building] = num_class_building_dict.get(building, -1) + 1
+            room_class = building + "_class" + str(num_class_building_dict[building])
+        room_class_dict[room_class] = class_room
+        class_row = class_data.iloc[0].copy()
+        class_row["bldg_room"] = room_class
+        class_row_list.append(class_row)
+
+    class_room_data = pd.DataFrame(class_row_list, columns=room_data.columns).drop(columns="building").reset_index(drop=True)
+    return class_room_data, room_class_dict
+
+
+def assign_rooms_in_class(class_assignment_section_dict,
+                          room_class_dict,
+                          timeslot_section_dictionary,
+                          existing_room_assignment_section_dict=None):
+    """
+    Input:
+        class_assignment_section_dict - dict{str: str}: maps each assigned section to the class of rooms it was assigned to
+        room_class_dict - dict{str: list(str)}: maps each class to the rooms in that class, see get_room_equivalence_classes
+        timeslot_section_dictionary - dict{str: str}: maps a section to its timeslot
+        existing_room_assignment_section_dict - dict{str: str}: maps each section to its existing room assignment.
+                                                If passed, sections are placed in their existing room whenever it is free
+    Output:
+        room_assignment_section_dict - dict{str: str}: maps each assigned section to a room in its class
+        unassigned_section - list[str]: sections that could not be placed in any room of their class without a time conflict
+
+    Rooms are picked by coloring the interval graph of each class: sections are visited by start time,
+        and each is placed in the first room of its class that is free on all of its days.
+    On a single day this uses no more rooms than the largest set of overlapping sections, which the class constraints bound.
+    Sections meeting on different combinations of days may still need more rooms, so unassigned_section should be checked
+    """
+
+    if existing_room_assignment_section_dict is None:
+        existing_room_assignment_section_dict = dict()
+
+    section_class_dict = dict()
+    for section, room_class in class_assignment_section_dict.items():
+        if room_class in section_class_dict:
+            section_class_dict[room_class].append(section)
+        else:
+            section_class_dict[room_class] = [section]
+
+    room_assignment_section_dict = dict()
+    unassigned_section = list()
+    for room_class, class_section in section_class_dict.items():
+        class_room = room_class_dict.get(room_class, [room_class])
+        timeslot_class_section_dict = {section: get_timeslot(timeslot_section_dictionary[section]) for section in class_section}
+        occupied_timeslot_room_dict = {room: list() for room in class_room} #timeslots already placed in each room
+        for section in sorted(class_section, key=lambda section: (timeslot_class_section_dict[section].start_minute, -timeslot_class_section_dict[section].end_minute, section)):
+            timeslot = timeslot_class_section_dict[section]
+            existing_room = existing_room_assignment_section_dict.get(section)
+            candidate_room = ([existing_room] if existing_room in occupied_timeslot_room_dict else []) + class_room
+            for room in candidate_room:
+                if not any(timeslot.overlaps(other_timeslot) for other_timeslot in occupied_timeslot_room_dict[room]):
+                    occupied_timeslot_room_dict[room].append(timeslot)
+                    room_assignment_section_dict[section] = room
+                    break
+            else:
+                unassigned_section.append(section)
+
+    return room_assignment_section_dict, unassigned_section
+
+
 def get_all_simplieid_timeslot(all_timeslot):
     """
      Input:
@@ -271,12 +615,14 @@ def get_all_simplieid_timeslot(all_timeslot):
             Moreover, each day dow element of an entry in all_simplified_timeslot may only involve a single day
             For example, if an entry in all_timeslot is 'MWF_13100_1400', 
             then the corresponding entries in all_simplified_timeslot would be 'M_13100_x', 'W_13100_x', 'F_13100_x'
+            Start times are written without leading zeros, as in get_time_str
     """
 
     all_simplified_timeslot = set()
-    for timeslot in all_timeslot:
-        dow, start_time, end_time = timeslot.split("_")
-        for single_dow in dow:
+    for timeslot in set(all_timeslot):
+        timeslot = get_timeslot(timeslot)
+        start_time = get_time_str(timeslot.start_minute)
+        for single_dow in timeslot.get_days():
             simplified_timeslot = single_dow + "_" + start_time + "_x"
             all_simplified_timeslot.add(simplified_timeslot)
 
@@ -308,9 +654,10 @@ def add_to_timeslot(timeslot, minutes):
     """
     Input:
         timeslot - str: any timeslot value. Must have 4 digits
-        minutes - str: 
+        minutes - str: number of minutes to add. Must have 2 digits
     Output:
-        timeslot - str: equivalent to timeslot, but with minutes added
+        timeslot - str: equivalent to timeslot, but with minutes added. Has 4 digits
+            e.g. if timeslot = "0930" and minutes = "30", then the output is "1000"
     """
 
     if len(timeslot) != 4:
@@ -318,13 +665,7 @@ def add_to_timeslot(timeslot, minutes):
     if len(minutes) != 2:
         raise Exception("minutes must have 2 digits")
 
-    total_minutes = int(timeslot[3:]) + int(minutes)
-    if total_minutes > 60:
-        adjusted_minutes = total_minutes - 60
-        total_hours = int(timeslot[:3]) + 1
-        return str(total_hours) + str(adjusted_minutes)
-    else:
-        return timeslot[:3] + str(total_minutes)
+    return get_time_str(get_time_minutes(timeslot) + int(minutes)).zfill(4)
 
 def get_overlapping_time_slots(all_timeslot, current_timeslot):
 
@@ -332,7 +673,7 @@ def get_overlapping_time_slots(all_timeslot, current_timeslot):
     Input:
         all_timeslot - list[str]: all possible timeslots
         current_timeslot - str: timeslot currently being considered
-                                Timeslots must be formated as: "dow_starttime_endtime"
+                                Timeslots must be formated as: "dow_starttime_endtime". The end time of current_timeslot is not used
     Output:
         timeslot_clash: subset of timeslots from T which conflict with t
             For example, say current_timeslot = 'F_1010_1205'
@@ -342,22 +683,112 @@ def get_overlapping_time_slots(all_timeslot, current_timeslot):
     This method is intended as a helper method to get_sections_with_overlapping_time_slot()
     """
 
-    current_dow, current_start_time, current_end_time = current_timeslot.split("_")
-    current_start_time = pad_time_str(current_start_time)
-    current_dow = set(current_dow)
-    timeslot_clash = set()
-
-    for other_timeslot in all_timeslot:
-        other_dow, other_start_time, other_end_time = other_timeslot.split("_")
-        other_dow = set(other_dow)
-        other_start_time = pad_time_str(other_start_time)
-        other_end_time = pad_time_str(other_end_time)
-        if (len(current_dow.intersection(other_dow)) > 0) and (other_start_time <= current_start_time) and (current_start_time < other_end_time):
-            timeslot_clash.add(other_timeslot)
+    current_dow_mask, current_start_minute = get_simplified_timeslot_start(current_timeslot)
+    all_timeslot = list(all_timeslot)
+    dow_mask, start_minute, end_minute = get_timeslot_arrays(all_timeslot)
+    is_clash = (dow_mask & current_dow_mask != 0) & (start_minute <= current_start_minute) & (current_start_minute < end_minute)
+    timeslot_clash = {all_timeslot[timeslot_id] for timeslot_id in np.flatnonzero(is_clash).tolist()}
 
     return timeslot_clash
 
 
+def get_time_minutes(time_str):
+    """
+    Input:
+        time_str - str: any time value read from data, with 3 or 4 digits. Ex. 900, 1300
+    Output:
+        minutes - int: number of minutes since midnight
+            e.g. if time_str = "1315", then minutes = 795
+    """
+
+    time_str = pad_time_str(time_str)
+    return int(time_str[:2]) * 60 + int(time_str[2:])
+
+
+def get_time_str(minutes):
+    """
+    Input:
+        minutes - int: number of minutes since midnight
+    Output:
+        time_str - str: time as it is read from data, without leading zeros
+            e.g. if minutes = 545, then time_str = "905"
+    """
+
+    return str((minutes // 60) * 100 + minutes % 60)
+
+
+def get_timeslot(timeslot):
+    """
+    Input:
+        timeslot - str: full timeslot information, formatted as "DOW_starttime_endtime"
+    Output:
+        timeslot - Timeslot: the parsed timeslot. The same object is returned every time the same string is passed
+    """
+
+    if timeslot in timeslot_intern_dict:
+        return timeslot_intern_dict[timeslot]
+    if type(timeslot) is not str:
+        raise Exception("timeslot must be of type str: " + str(timeslot))
+
+    dow, start_time, end_time = timeslot.split("_")
+    dow_mask = 0
+    for single_dow in dow:
+        if single_dow not in dow_bit_dict:
+            raise Exception("timeslot has an unrecognized day of week: " + str(timeslot))
+        dow_mask |= dow_bit_dict[single_dow]
+    parsed_timeslot = Timeslot(dow_mask, get_time_minutes(start_time), get_time_minutes(end_time))
+    timeslot_intern_dict[timeslot] = parsed_timeslot
+    return parsed_timeslot
+
+
+def get_timeslot_arrays(timeslot_list):
+    """
+    Input:
+        timeslot_list - list[str]: timeslots, possibly repeated, e.g. the timeslot of every section
+    Output:
+        dow_mask, start_minute, end_minute - np.array[int]: fields of the Timeslot of each entry of timeslot_list
+
+    Each distinct timeslot is parsed only once
+    """
+
+    timeslot_code, unique_timeslot = pd.factorize(np.asarray(timeslot_list, dtype=object), use_na_sentinel=False)
+    unique_interval = np.array([get_timeslot(timeslot).get_interval() for timeslot in unique_timeslot], dtype=np.int64).reshape(-1, 3)
+    interval = unique_interval[timeslot_code]
+    return interval[:, 0], interval[:, 1], interval[:, 2]
+
+
+def get_simplified_timeslot_start(simplified_timeslot):
+    """
+    Input:
+        simplified_timeslot - str: simplified timeslot, formatted as "DOW_starttime_x", see get_all_simplieid_timeslot
+    Output:
+        dow_mask - int: bitmask of the days of the week of the simplified timeslot
+        start_minute - int: start of the simplified timeslot, in minutes since midnight
+    """
+
+    dow, start_time, _ = simplified_timeslot.split("_")
+    dow_mask = 0
+    for single_dow in dow:
+        if single_dow not in dow_bit_dict:
+            raise Exception("timeslot has an unrecognized day of week: " + str(simplified_timeslot))
+        dow_mask |= dow_bit_dict[single_dow]
+    return dow_mask, get_time_minutes(start_time)
+
+
+def get_timeslot_interval(timeslot):
+    """
+    Input:
+        timeslot - str: full timeslot information, formatted as "DOW_starttime_endtime"
+    Output:
+        dow_mask - int: bitmask of the days of the week the timeslot is taught, according to dow_bit_dict
+        start_minute - int: start of the timeslot, in minutes since midnight
+        end_minute - int: end of the timeslot, in minutes since midnight
+            e.g. if timeslot = "MWF_1010_1100", then the output is (21, 610, 660)
+    """
+
+    return get_timeslot(timeslot).get_interval()
+
+
 def get_sections_with_overlapping_time_slot(all_timeslot, all_simplified_timeslot, all_section, course_data):
     """ 
     Input:
@@ -372,30 +803,253 @@ def get_sections_with_overlapping_time_slot(all_timeslot, all_simplified_timeslo
                     For example, X_t_clash['F_1010_1205'] will include any sections that are taught at the
                     following times accourding to course_data
                     'F_1010_1205', 'F_1115_1205', or 'MWF_1010_1100'
+
+    Each timeslot is parsed once into a Timeslot.
+    Then, for every day, the simplified timeslots are answered in order of their start time
+        by sweeping over the timeslots taught that day, keeping those that are still in progress in a heap
     """
 
+    timeslot_section_dictionary = get_course_time(course_data)
     section_timeslot_dictionary = dict() #store sections that are taught at a given timeslot
 
     for section in all_section:
-        timeslot_current_section = course_data[course_data['subject_course_section_occurrence'] == section]["full_time"].iloc[0]
+        timeslot_current_section = timeslot_section_dictionary[section]
         if timeslot_current_section in section_timeslot_dictionary:
             section_timeslot_dictionary[timeslot_current_section].add(section)
         else:
             section_timeslot_dictionary[timeslot_current_section] = {section}
 
+    #(start, end, timeslot) for every timeslot taught on each day
+    all_timeslot = [timeslot for timeslot in all_timeslot if timeslot in section_timeslot_dictionary]
+    dow_mask, start_minute, end_minute = get_timeslot_arrays(all_timeslot)
+    interval_day_dict = dict()
+    for single_dow, dow_bit in dow_bit_dict.items():
+        day_timeslot_id = np.flatnonzero(dow_mask & dow_bit).tolist()
+        interval_day_dict[single_dow] = list(zip(start_minute[day_timeslot_id].tolist(),
+                                                 end_minute[day_timeslot_id].tolist(),
+                                                 [all_timeslot[timeslot_id] for timeslot_id in day_timeslot_id]))
+
+    #(start, simplified timeslot) for every simplified timeslot on each day
     section_timeslot_clash_dictionary = dict() #stores sections that are taught a timeslot that conflicts with the given timeslot
-
+    query_day_dict = {single_dow: list() for single_dow in dow_bit_dict}
     for current_timeslot in all_simplified_timeslot:
-        all_conflicting_timeslot = get_overlapping_time_slots(all_timeslot, current_timeslot) #here, current_timeslot should refer only to times from TS. But need to find timeslots from T, that conflict
-        sections_conflicting = set()
-        for conflicting_timeslot in all_conflicting_timeslot:
-            if conflicting_timeslot in section_timeslot_dictionary:
-                sections_conflicting = sections_conflicting.union(section_timeslot_dictionary[conflicting_timeslot])
-        section_timeslot_clash_dictionary[current_timeslot] = sections_conflicting
+        current_dow_mask, start_minute = get_simplified_timeslot_start(current_timeslot)
+        for single_dow, dow_bit in dow_bit_dict.items():
+            if current_dow_mask & dow_bit:
+                query_day_dict[single_dow].append((start_minute, current_timeslot))
+        section_timeslot_clash_dictionary[current_timeslot] = set()
+
+    for single_dow, query_list in query_day_dict.items():
+        interval_list = sorted(interval_day_dict[single_dow])
+        query_list.sort()
+        active_heap = [] #(end, timeslot) for timeslots that started at or before the current start time
+        interval_index = 0
+        for start_minute, current_timeslot in query_list:
+            while interval_index < len(interval_list) and interval_list[interval_index][0] <= start_minute:
+                heappush(active_heap, interval_list[interval_index][1:])
+                interval_index += 1
+            while len(active_heap) > 0 and active_heap[0][0] <= start_minute:
+                heappop(active_heap)
+            sections_conflicting = section_timeslot_clash_dictionary[current_timeslot]
+            for _, conflicting_timeslot in active_heap:
+                sections_conflicting.update(section_timeslot_dictionary[conflicting_timeslot])
 
     return section_timeslot_clash_dictionary
 
 
+def get_room_timeslot_section_dict(room_section_dictionary, section_timeslot_clash_dictionary):
+    """
+    Input:
+        room_section_dictionary - dict{str: set(str)}: maps sections to rooms in which they may be taught
+        section_timeslot_clash_dictionary - dict{str: set(str)}: maps simplified timeslots to the sections that conflict with them,
+                                                               see get_sections_with_overlapping_time_slot
+    Output:
+        room_timeslot_section_dict - dict{str: dict{str: list(str)}}: maps a room and a simplified timeslot to the sections that
+                                    may be taught in the room and conflict with the timeslot.
+                                    Only (room, simplified timeslot) combinations with at least one section are included
+
+    Built by visiting each compatible (section, room) pair once, rather than intersecting sets for every room and timeslot
+    Intended for generating room occupancy constraints in room_assignment_contact_opt
+    """
+
+    timeslot_clash_section_dict = {section: list() for section in room_section_dictionary}
+    for day_starttime, sections_conflicting in section_timeslot_clash_dictionary.items():
+        for section in sections_conflicting:
+            if section in timeslot_clash_section_dict:
+                timeslot_clash_section_dict[section].append(day_starttime)
+
+    room_timeslot_section_dict = dict()
+    for section, available_room in room_section_dictionary.items():
+        for room in available_room:
+            if room not in room_timeslot_section_dict:
+                room_timeslot_section_dict[room] = dict()
+            timeslot_section_dict = room_timeslot_section_dict[room]
+            for day_starttime in timeslot_clash_section_dict[section]:
+                if day_starttime in timeslot_section_dict:
+                    timeslot_section_dict[day_starttime].append(section)
+                else:
+                    timeslot_section_dict[day_starttime] = [section]
+
+    return room_timeslot_section_dict
+
+
+def get_room_maximal_clique_dict(section_room_dictionary, timeslot_section_dictionary):
+    """
+    Input:
+        section_room_dictionary - dict{str: set(str)}: maps rooms to sections that may be taught in that room
+        timeslot_section_dictionary - dict{str: str}: maps a section to its timeslot
+    Output:
+        room_clique_dict - dict{str: list(list(str))}: maps a room to the maximal sets of sections that may be taught in the room
+                           and all meet at the same time on some day. Only sets with at least two sections are included,
+                           and a set is left out if it is identical to, or a subset of, another set of the same room
+
+    On each day, the meetings of the sections available to a room form an interval graph.
+    The maximal cliques of an interval graph are found with one sweep over the sorted start times:
+        the sections in progress at a start time form a maximal clique if one of them ends before the next start time.
+    Every set of sections returned by get_room_timeslot_section_dict is a subset of one of these cliques,
+        so the clique constraints imply the room and timeslot constraints, with fewer rows
+    """
+
+    room_clique_dict = dict()
+    for room, available_section in section_room_dictionary.items():
+        interval_day_dict = {single_dow: list() for single_dow in dow_bit_dict}
+        for section in available_section:
+            dow_mask, start_minute, end_minute = get_timeslot_interval(timeslot_section_dictionary[section])
+            for single_dow, dow_bit in dow_bit_dict.items():
+                if dow_mask & dow_bit:
+                    interval_day_dict[single_dow].append((start_minute, end_minute, section))
+
+        all_clique = set()
+        for interval_list in interval_day_dict.values():
+            interval_list.sort()
+            active_heap = [] #(end, section) for sections in progress
+            interval_index = 0
+            while interval_index < len(interval_list):
+                start_minute = interval_list[interval_index][0]
+                while len(active_heap) > 0 and active_heap[0][0] <= start_minute:
+                    heappop(active_heap)
+                while interval_index < len(interval_list) and interval_list[interval_index][0] == start_minute:
+                    heappush(active_heap, interval_list[interval_index][1:])
+                    interval_index += 1
+                if interval_index < len(interval_list):
+                    next_start_minute = interval_list[interval_index][0]
+                else:
+                    next_start_minute = float("inf")
+                if len(active_heap) >= 2 and active_heap[0][0] <= next_start_minute:
+                    all_clique.add(frozenset(section for _, section in active_heap))
+
+        # remove cliques that are contained in a larger clique from another day
+        room_clique = list()
+        clique_id_section_dict = dict() #maps a section to the ids of kept cliques that include it
+        for clique in sorted(all_clique, key=len, reverse=True):
+            clique_list = sorted(clique)
+            containing_clique_id = set(clique_id_section_dict.get(clique_list[0], set()))
+            for section in clique_list[1:]:
+                if len(containing_clique_id) == 0:
+                    break
+                containing_clique_id.intersection_update(clique_id_section_dict.get(section, set()))
+            if len(containing_clique_id) > 0:
+                continue
+            for section in clique_list:
+                if section in clique_id_section_dict:
+                    clique_id_section_dict[section].add(len(room_clique))
+                else:
+                    clique_id_section_dict[section] = {len(room_clique)}
+            room_clique.append(clique_list)
+        room_clique_dict[room] = room_clique
+
+    return room_clique_dict
+
+
+def get_timeslot_mask_section_dict(section_timeslot_clash_dictionary, all_simplified_timeslot):
+    """
+    Input:
+        section_timeslot_clash_dictionary - dict{str: set(str)}: maps simplified timeslots to the sections that conflict with them,
+                                                               see get_sections_with_overlapping_time_slot
+        all_simplified_timeslot - list[str]: all simplified timeslots, in bit order
+    Output:
+        timeslot_mask_section_dict - dict{str: int}: maps each section to a bitset of the simplified timeslots it conflicts with.
+                                     Two sections overlap if and only if their bitsets intersect
+    """
+
+    timeslot_mask_section_dict = dict()
+    for timeslot_bit, day_starttime in enumerate(all_simplified_timeslot):
+        for section in section_timeslot_clash_dictionary[day_starttime]:
+            timeslot_mask_section_dict[section] = timeslot_mask_section_dict.get(section, 0) | (1 << timeslot_bit)
+    return timeslot_mask_section_dict
+
+
+def get_greedy_room_assignment(section_room_indptr,
+                               section_room_indices,
+                               pair_score,
+                               timeslot_mask_section_list,
+                               room_count_list,
+                               assigned_pair_id=None):
+    """
+    Input:
+        section_room_indptr, section_room_indices - np.array[int]: output of get_section_room_csr
+        pair_score - np.array[float]: shape (number of pairs, number of criteria). Gain of assigning each (section, room) pair,
+                                      for each criterion in decreasing order of priority. Pairs are compared lexicographically
+        timeslot_mask_section_list - list[int]: timeslot bitset of each section id, see get_timeslot_mask_section_dict
+        room_count_list - list[int]: number of sections each room id may hold at the same time
+        assigned_pair_id - array-like[int]: pairs that are already assigned. Their sections are not visited,
+                                            and their rooms start out occupied
+    Output:
+        assigned_pair_id - np.array[int]: sorted ids of the (section, room) pairs that are assigned, including the ones passed in
+
+    Sections are visited in decreasing order of their best pair score, and each is assigned to its best room that is still free.
+    A section is left unassigned if none of its free rooms has a nonnegative score.
+    The occupancy of each room is kept as one bitset per level: bit t of level j is set if more than j sections use the room at timeslot t,
+        so a section fits in the room if its timeslot bitset does not intersect the highest level
+    """
+
+    num_section = len(section_room_indptr) - 1
+    pair_section_id = get_pair_section_id(section_room_indptr)
+    decreasing_score_key = [-pair_score[:, criterion] for criterion in reversed(range(pair_score.shape[1]))]
+
+    #pairs grouped by section as in section_room_indices, but sorted from best to worst score within each section
+    pair_order = np.lexsort(decreasing_score_key + [pair_section_id])
+    section_with_room_id = np.flatnonzero(np.diff(section_room_indptr) > 0)
+    best_pair_id = pair_order[section_room_indptr[section_with_room_id]]
+    section_order = section_with_room_id[np.lexsort([score_key[best_pair_id] for score_key in decreasing_score_key])]
+
+    #sign of the first nonzero criterion of each pair
+    pair_sign = np.zeros(len(pair_section_id))
+    for criterion in reversed(range(pair_score.shape[1])):
+        pair_sign = np.where(pair_score[:, criterion] != 0, np.sign(pair_score[:, criterion]), pair_sign)
+
+    def occupy_room(occupancy_level, timeslot_mask):
+        for level in range(len(occupancy_level) - 1, 0, -1):
+            occupancy_level[level] |= occupancy_level[level - 1] & timeslot_mask
+        occupancy_level[0] |= timeslot_mask
+
+    occupancy_level_room_list = [[0] * room_count for room_count in room_count_list]
+    section_room_indptr = section_room_indptr.tolist()
+    section_room_indices = section_room_indices.tolist()
+    pair_section_id = pair_section_id.tolist()
+    pair_order = pair_order.tolist()
+    pair_sign = pair_sign.tolist()
+    assigned_pair_id = list() if assigned_pair_id is None else np.asarray(assigned_pair_id, dtype=np.int64).tolist()
+    assigned_section_id = {pair_section_id[pair_id] for pair_id in assigned_pair_id}
+    for pair_id in assigned_pair_id:
+        occupy_room(occupancy_level_room_list[section_room_indices[pair_id]], timeslot_mask_section_list[pair_section_id[pair_id]])
+
+    for section_id in section_order.tolist():
+        if section_id in assigned_section_id:
+            continue
+        timeslot_mask = timeslot_mask_section_list[section_id]
+        for pair_id in pair_order[section_room_indptr[section_id]:section_room_indptr[section_id + 1]]:
+            if pair_sign[pair_id] < 0:
+                break
+            occupancy_level = occupancy_level_room_list[section_room_indices[pair_id]]
+            if occupancy_level[-1] & timeslot_mask == 0:
+                occupy_room(occupancy_level, timeslot_mask)
+                assigned_pair_id.append(pair_id)
+                break
+
+    return np.array(sorted(assigned_pair_id), dtype=np.int64)
+
+
 def get_enrollement_per_section(course_data, enrollment_column='enrollment'):
     """ 
     Input:
@@ -443,7 +1097,8 @@ def get_num_weekly_meeting_days(timeslot_section_dictionary):
         meeting_days_section_dictionary - dict{str: str}: maps a section to the number of days a week it meets
     """
 
-    num_weekly_meeting_days_section_dictionary = {section: len(timeslot.split("_")[0]) for section, timeslot in timeslot_section_dictionary.items()}
+    dow_mask, _, _ = get_timeslot_arrays(list(timeslot_section_dictionary.values()))
+    num_weekly_meeting_days_section_dictionary = dict(zip(timeslot_section_dictionary.keys(), dow_count_array[dow_mask].tolist()))
     return num_weekly_meeting_days_section_dictionary
 
 
@@ -479,18 +1134,9 @@ def get_timeslot_duration(timeslot):
         duration_hours - float: the duration of the timeslot for a single meeting day
             e.g. if timeslot = "MWF_1000_1115", then duration_hours = 1.25
             if timeslot = "F_1300_1445", then duration_hours = 1.75
-    Intended as a helper function to get_meeting_hours
     """
 
-    dow, start_time, end_time = timeslot.split("_")
-    start_time = pad_time_str(start_time)
-    end_time = pad_time_str(end_time)
-    duration_hours = (int(end_time[:2]) - int(start_time[:2])) + (int(end_time[2:]) - int(start_time[2:]))/60
-    if duration_hours < 0:
-        raise Exception("duration hours neg: " + str(timeslot) + " " + start_time + " " + end_time)
-    elif duration_hours > 8:
-        raise Exception("duration hours large: " + str(timeslot) + " " + start_time + " " + end_time)
-    return duration_hours
+    return get_meeting_hours({timeslot: timeslot})[timeslot]
 
 
 def get_meeting_hours(timeslot_section_dictionary):
@@ -501,7 +1147,16 @@ def get_meeting_hours(timeslot_section_dictionary):
         meeting_hours_section_dictionary - dict{str: str}: maps a section to the number of hours it meets, on any day it meetings
     """
 
-    meeting_hours_section_dictionary = {section: get_timeslot_duration(timeslot) for section, timeslot in timeslot_section_dictionary.items()}
+    timeslot_list = list(timeslot_section_dictionary.values())
+    _, start_minute, end_minute = get_timeslot_arrays(timeslot_list)
+    # hours and minutes are subtracted separately, which rounds the same way as the hour and minute digits of the timeslot
+    duration_hours = (end_minute // 60 - start_minute // 60) + (end_minute % 60 - start_minute % 60) / 60
+    for bound_name, is_out_of_bounds in [("neg", duration_hours < 0), ("large", duration_hours > 8)]:
+        if is_out_of_bounds.any():
+            timeslot_id = int(np.argmax(is_out_of_bounds))
+            raise Exception("duration hours " + bound_name + ": " + str(timeslot_list[timeslot_id]) + " " + str(duration_hours[timeslot_id]))
+
+    meeting_hours_section_dictionary = dict(zip(timeslot_section_dictionary.keys(), duration_hours.tolist()))
     return meeting_hours_section_dictionary
 
 
@@ -513,7 +1168,8 @@ def get_contact_hours(all_section,
                       num_weekly_meeting_days_section_dictionary,
                       minimum_section_contact_days,
                       weeks_in_semester,
-                      preferred_delivery_mode_section_dict=None):
+                      preferred_delivery_mode_section_dict=None,
+                      no_mixing=False):
 
     """
     Input:
@@ -525,33 +1181,179 @@ def get_contact_hours(all_section,
         num_weekly_meeting_days_section_dictionary -  dict{str: int}: maps a section to the number of days a week it meets
         minimum_section_contact_days - int: minimum number of days any section must meet in person, in a semester
         weeks_in_semester - int: number of weeks in the semester; it's assumed these are full weeks
+        no_mixing - bool: If True, contact hours follow get_contact_hours_no_mixing_helper instead of get_contact_hours_helper
     Output:
         total_contact_hours_section_room_dict - dict{str: str}: maps a section and room to the contact hours the section would have, if it were assigned to the given room
         delivery_mode_section_room_dict - dict{str: str}: maps a section and room to the delivery mode that the section must take, it's to be taught in that room
+
+    Dictionary view of get_contact_hours_matrix, for methods that look up contact hours and delivery modes by (section, room)
     """
 
-    total_contact_hours_section_room_dict = dict()
-    delivery_mode_section_room_dict = dict()
-    for section in all_section:
-        for room in all_room:
-            if preferred_delivery_mode_section_dict is not None:
-                preferred_delivery_mode_set = preferred_delivery_mode_section_dict[section]
-            else:
-                preferred_delivery_mode_set = all_permissible_delivery_mode
-            total_contact_hours, delivery_mode = get_contact_hours_helper(capacity=capacity_room_dictionary[room],
-                                                                          enrollment=enrollment_section_dictionary[section],
-                                                                          meeting_hours=meeting_hours_section_dictionary[section],
-                                                                          weekly_meeting_days=num_weekly_meeting_days_section_dictionary[section],
-                                                                          minimum_section_contact_days=minimum_section_contact_days,
-                                                                          weeks_in_semester=weeks_in_semester,
-                                                                          preferred_delivery_mode_set=preferred_delivery_mode_set)
-
-            total_contact_hours_section_room_dict[section, room] = total_contact_hours
-            delivery_mode_section_room_dict[section, room] = delivery_mode
+    all_section = list(all_section)
+    all_room = list(all_room)
+    if preferred_delivery_mode_section_dict is not None:
+        residential_spread_preferred = ["residential_spread" in preferred_delivery_mode_section_dict[section] for section in all_section]
+    else:
+        residential_spread_preferred = None
+
+    contact_hours, delivery_mode = get_contact_hours_matrix(capacity=[capacity_room_dictionary[room] for room in all_room],
+                                                            enrollment=[enrollment_section_dictionary[section] for section in all_section],
+                                                            meeting_hours=[meeting_hours_section_dictionary[section] for section in all_section],
+                                                            weekly_meeting_days=[num_weekly_meeting_days_section_dictionary[section] for section in all_section],
+                                                            minimum_section_contact_days=minimum_section_contact_days,
+                                                            weeks_in_semester=weeks_in_semester,
+                                                            residential_spread_preferred=residential_spread_preferred,
+                                                            no_mixing=no_mixing)
+
+    section_room_pair = list(product(all_section, all_room))
+    total_contact_hours_section_room_dict = dict(zip(section_room_pair, contact_hours.ravel().tolist()))
+    delivery_mode_section_room_dict = dict(zip(section_room_pair, np.array(delivery_mode_list)[delivery_mode.ravel()].tolist()))
 
     return total_contact_hours_section_room_dict, delivery_mode_section_room_dict
 
 
+def get_contact_hours_matrix(capacity,
+                             enrollment,
+                             meeting_hours,
+                             weekly_meeting_days,
+                             minimum_section_contact_days,
+                             weeks_in_semester,
+                             residential_spread_preferred=None,
+                             no_mixing=False):
+    """
+    Input:
+        capacity - array-like[int]: capacity of each room
+        enrollment - array-like[int]: enrollment of each section
+        meeting_hours - array-like[float]: the number of hours each section meets, on any day it meets
+        weekly_meeting_days - array-like[int]: number of days a week each section meets
+        minimum_section_contact_days - int: minimum number of days any section must meet in person, in a semester
+        weeks_in_semester - int: number of weeks in the semester; it's assumed these are full weeks
+        residential_spread_preferred - array-like[bool]: whether "residential_spread" is a preferred delivery mode of each section
+                                                       If None, it's assumed to be preferred by every section
+        no_mixing - bool: If True, contact hours follow get_contact_hours_no_mixing_helper instead of get_contact_hours_helper
+    Output:
+        contact_hours - np.array[float]: (section, room) array with the contact hours of each section, if it were assigned to each room
+        delivery_mode - np.array[int]: (section, room) array with the delivery mode each section must take, if it were assigned to each room
+                                      Delivery modes are coded by their position in delivery_mode_list
+
+    Computes the same values as get_contact_hours_helper (or get_contact_hours_no_mixing_helper) for every section and room at once
+    """
+
+    if residential_spread_preferred is not None:
+        residential_spread_preferred = np.asarray(residential_spread_preferred, dtype=bool)[:, np.newaxis]
+    return get_contact_hours_array(capacity=np.asarray(capacity, dtype=float)[np.newaxis, :],
+                                   enrollment=np.asarray(enrollment, dtype=float)[:, np.newaxis],
+                                   meeting_hours=np.asarray(meeting_hours, dtype=float)[:, np.newaxis],
+                                   weekly_meeting_days=np.asarray(weekly_meeting_days, dtype=float)[:, np.newaxis],
+                                   minimum_section_contact_days=minimum_section_contact_days,
+                                   weeks_in_semester=weeks_in_semester,
+                                   residential_spread_preferred=residential_spread_preferred,
+                                   no_mixing=no_mixing)
+
+
+def get_contact_hours_array(capacity,
+                            enrollment,
+                            meeting_hours,
+                            weekly_meeting_days,
+                            minimum_section_contact_days,
+                            weeks_in_semester,
+                            residential_spread_preferred=None,
+                            no_mixing=False):
+    """
+    Input:
+        capacity, enrollment, meeting_hours, weekly_meeting_days, residential_spread_preferred - np.array: same as get_contact_hours_matrix,
+            but all arrays only need to broadcast against each other. For example, passing one entry per (section, room) pair
+            computes contact hours for only those pairs
+    Output:
+        contact_hours - np.array[float]: contact hours, with the broadcast shape of the inputs
+        delivery_mode - np.array[int]: delivery mode codes, with the broadcast shape of the inputs
+
+    Intended as the shared kernel of get_contact_hours_matrix and get_contact_hours_pair
+    """
+
+    capacity = np.asarray(capacity, dtype=float)
+    enrollment = np.asarray(enrollment, dtype=float)
+    meeting_hours = np.asarray(meeting_hours, dtype=float)
+    weekly_meeting_days = np.asarray(weekly_meeting_days, dtype=float)
+    if residential_spread_preferred is None:
+        residential_spread_preferred = np.ones(enrollment.shape, dtype=bool)
+    shape = np.broadcast_shapes(capacity.shape, enrollment.shape, meeting_hours.shape, weekly_meeting_days.shape, np.shape(residential_spread_preferred))
+
+    residential = np.broadcast_to(enrollment <= capacity, shape)
+    split = ~residential & (enrollment <= weekly_meeting_days * capacity)
+    touchpoint_capacity = weeks_in_semester * weekly_meeting_days * capacity
+    within_touchpoint_capacity = enrollment <= touchpoint_capacity / minimum_section_contact_days
+    touchpoint = ~residential & ~split & within_touchpoint_capacity
+    delivery_mode = np.select([residential, split, touchpoint], [0, 1, 2], 3).astype(np.int8)
+
+    avg_contact_days_per_week = np.floor(np.divide(touchpoint_capacity, enrollment,
+                                                   out=np.zeros(shape),
+                                                   where=within_touchpoint_capacity & (enrollment > 0))) / weeks_in_semester
+
+    if no_mixing:
+        contact_hours = np.select([np.broadcast_to(enrollment == 0, shape),
+                                   residential & residential_spread_preferred,
+                                   np.isin(weekly_meeting_days, [2, 3]) & (enrollment <= weekly_meeting_days * capacity),
+                                   (weekly_meeting_days == 4) & (2 * capacity < enrollment) & (enrollment <= 4 * capacity),
+                                   (weekly_meeting_days == 4) & (enrollment <= 2 * capacity),
+                                   within_touchpoint_capacity],
+                                  [0,
+                                   meeting_hours * weekly_meeting_days,
+                                   meeting_hours,
+                                   meeting_hours,
+                                   2 * meeting_hours,
+                                   meeting_hours * avg_contact_days_per_week],
+                                  0.0)
+    else:
+        #smallest number of meeting days, 2 or more, that fits the enrollment into the room
+        limited_weekly_meeting_days = np.zeros(shape)
+        max_weekly_meeting_days = int(weekly_meeting_days.max()) if weekly_meeting_days.size > 0 else 0
+        for current_weekly_meeting_days in range(max_weekly_meeting_days, 1, -1):
+            limited_weekly_meeting_days[split & (enrollment <= current_weekly_meeting_days * capacity)] = current_weekly_meeting_days
+        contact_hours = np.select([residential, split, touchpoint],
+                                  [np.where(residential_spread_preferred, meeting_hours * weekly_meeting_days, meeting_hours * (weekly_meeting_days - 1)),
+                                   meeting_hours * (weekly_meeting_days - limited_weekly_meeting_days + 1),
+                                   meeting_hours * avg_contact_days_per_week],
+                                  0.0)
+
+    return contact_hours, delivery_mode
+
+
+def get_contact_hours_pair(pair_section_id,
+                           pair_room_id,
+                           capacity,
+                           enrollment,
+                           meeting_hours,
+                           weekly_meeting_days,
+                           minimum_section_contact_days,
+                           weeks_in_semester,
+                           residential_spread_preferred=None,
+                           no_mixing=False):
+    """
+    Input:
+        pair_section_id - np.array[int]: section id of each (section, room) pair, e.g. from get_section_room_csr
+        pair_room_id - np.array[int]: room id of each (section, room) pair
+        capacity, enrollment, meeting_hours, weekly_meeting_days, residential_spread_preferred - array-like: same as get_contact_hours_matrix,
+            indexed by room id and section id
+    Output:
+        contact_hours - np.array[float]: contact hours of each pair
+        delivery_mode - np.array[int]: delivery mode code of each pair
+
+    Masked alternative to get_contact_hours_matrix, which only evaluates the given (section, room) pairs
+    """
+
+    if residential_spread_preferred is not None:
+        residential_spread_preferred = np.asarray(residential_spread_preferred, dtype=bool)[pair_section_id]
+    return get_contact_hours_array(capacity=np.asarray(capacity, dtype=float)[pair_room_id],
+                                   enrollment=np.asarray(enrollment, dtype=float)[pair_section_id],
+                                   meeting_hours=np.asarray(meeting_hours, dtype=float)[pair_section_id],
+                                   weekly_meeting_days=np.asarray(weekly_meeting_days, dtype=float)[pair_section_id],
+                                   minimum_section_contact_days=minimum_section_contact_days,
+                                   weeks_in_semester=weeks_in_semester,
+                                   residential_spread_preferred=residential_spread_preferred,
+                                   no_mixing=no_mixing)
+
+
 def get_contact_hours_helper(capacity,
                              enrollment,
                              meeting_hours,
@@ -712,7 +1514,7 @@ def get_room_building_sets(all_room, course_data=None):
 
     all_room = set(all_room)
     if course_data is not None:
-        rooms_from_course_data = set(str(row["building_number"]) + "_" + str(row["room"]) for index, row in course_data.iterrows())
+        rooms_from_course_data = set(course_data["building_number"].map(str) + "_" + course_data["room"].map(str))
         all_room.update(rooms_from_course_data)
     room_building_dict = dict()
     building_room_dict = dict()
@@ -772,6 +1574,22 @@ def get_preferred_delivery_mode(course_data,
         permissible_delivery_mode_section_dict = pd.Series(permissible_delivery_mode_all,index=course_data['subject_course_section_occurrence']).to_dict()
     return permissible_delivery_mode_section_dict
 
+def get_preferred_delivery_mode_array(all_section, permissible_delivery_mode_section_dict):
+    """
+    Input:
+        all_section - list[str]: all sections available in the optimization problem, in id order
+        permissible_delivery_mode_section_dict - dict{str: set(str)}: maps a section to a list of the delivery modes it may be taught in
+    Output:
+        preferred_delivery_mode_array - np.array[bool]: (section, delivery mode) array, True if the section may be taught in the delivery mode
+                                                       Delivery modes are coded by their position in delivery_mode_list
+    """
+
+    preferred_delivery_mode_array = np.zeros((len(all_section), len(delivery_mode_list)), dtype=bool)
+    for section_id, section in enumerate(all_section):
+        for delivery_mode_code, delivery_mode in enumerate(delivery_mode_list):
+            preferred_delivery_mode_array[section_id, delivery_mode_code] = delivery_mode in permissible_delivery_mode_section_dict[section]
+    return preferred_delivery_mode_array
+
 def get_existing_room_assignment_section_dict(course_data):
 
     """
@@ -812,32 +1630,59 @@ def get_dist_between_buildings(building_location_data,
                                 This may be ideal if one wishes to penalize large values more healvily
     Output:
         dist_between_building_dict - dict{(str, str): float}: maps each pairs of buildings, to the distance between these buildings in meters
+
+    Dictionary view of get_dist_between_buildings_matrix
+    """
+
+    building_id_dict, dist_between_building_matrix = get_dist_between_buildings_matrix(building_location_data,
+                                                                                       all_building,
+                                                                                       square_distance)
+    building_w_location = list(dict.fromkeys(building_location_data['building_number'].tolist()))
+    dist_between_building_dict = dict()
+    for building_pair_list in [building_w_location, list(all_building)]:
+        building_id_list = [building_id_dict[building] for building in building_pair_list]
+        building_pair_dist = dist_between_building_matrix[np.ix_(building_id_list, building_id_list)].tolist()
+        for building_1, dist_row in zip(building_pair_list, building_pair_dist):
+            for building_2, distance in zip(building_pair_list, dist_row):
+                dist_between_building_dict[building_1, building_2] = distance
+
+    return dist_between_building_dict
+
+
+def get_dist_between_buildings_matrix(building_location_data,
+                                     all_building,
+                                     square_distance=True):
+    """
+    Input:
+        building_location_data - pd.DataFrame: properly formatted building location dataframe
+        all_building - set{str}: set of all buildings
+        square_distance - bool: If True, the square of distances between buildings is used instead of the actual distance
+    Output:
+        building_id_dict - dict{str: int}: maps each building, from building_location_data or all_building, to its row and column in dist_between_building_matrix
+        dist_between_building_matrix - np.array[float]: (building, building) array of the distance between buildings in meters
+
+    Distances between buildings with a location are computed in a single vectorized haversine call.
+    Any pair involving a building without a location is given the average distance between buildings with a location
     """
 
     lat_building_dict = pd.Series(building_location_data["latitude"].values,index=building_location_data['building_number']).to_dict()
     lng_building_dict = pd.Series(building_location_data["longitude"].values,index=building_location_data['building_number']).to_dict()
 
-    building_w_location = building_location_data['building_number'].tolist()
-    building_w_location_pair = [(building_1, building_2) for building_1 in building_w_location for building_2 in building_w_location]
-    all_building_pair = [(building_1, building_2) for building_1 in all_building for building_2 in all_building]
-    building_wo_location_pair = [building_pair for building_pair in all_building_pair if building_pair not in building_w_location_pair]
-    
-    dist_between_building_dict = dict()
-    for building_1, building_2 in building_w_location_pair:
-        distance = haversine((lat_building_dict[building_1], lng_building_dict[building_1]),
-                                 (lat_building_dict[building_2], lng_building_dict[building_2]),
-                                 unit='m')
-        if square_distance:
-            dist_between_building_dict[building_1, building_2] = distance ** 2
-        else:
-            dist_between_building_dict[building_1, building_2] = distance
-    
-    avg_building_dist = sum(dist_between_building_dict.values())/len(dist_between_building_dict.values())
-    
-    for building_1, building_2 in building_wo_location_pair:
-        dist_between_building_dict[building_1, building_2] = avg_building_dist
+    building_w_location = list(lat_building_dict.keys())
+    building_wo_location = [building for building in dict.fromkeys(all_building) if building not in lat_building_dict]
+    building_id_dict = get_id_dict(building_w_location + building_wo_location)
+
+    location = np.array([[lat_building_dict[building], lng_building_dict[building]] for building in building_w_location], dtype=float).reshape(-1, 2)
+    dist_w_location = haversine_vector(location, location, unit='m', comb=True).T
+    if square_distance:
+        dist_w_location = dist_w_location ** 2
+
+    avg_building_dist = dist_w_location.mean()
+    dist_between_building_matrix = np.full((len(building_id_dict), len(building_id_dict)), avg_building_dist)
+    dist_between_building_matrix[:len(building_w_location), :len(building_w_location)] = dist_w_location
+
+    return building_id_dict, dist_between_building_matrix
 
-    return dist_between_building_dict
 
 def get_reassignment_cost(all_section,
                           all_room,
@@ -850,6 +1695,7 @@ def get_reassignment_cost(all_section,
         all_section - set(str): set of all sections available in the optimization problem
         all_room - set(str): set of all rooms available in the optimization problem
         dist_between_building_dict - dict{(str, str): float}: maps each pairs of buildings, to the distance between these buildings in meters
+                                    The output of get_dist_between_buildings_matrix, (building_id_dict, dist_between_building_matrix), may be passed instead
         existing_room_assignment_section_dict - dict{str: set(str)}: maps each section to its existing room assignment
         building_room_dict - dict{str: str}: maps each room to its corresponding building
         delta - float: if two rooms are in the same building, then the cost of reassignment bewteen these two rooms will be equal to: delta * min(dist_between_building_dict.values())
@@ -857,6 +1703,10 @@ def get_reassignment_cost(all_section,
         reassginment_cost_section_room_dict - dict{(str, str): float} - maps a (section, room) pair to the cost of reassigning the section to that room
     """
 
+    if isinstance(dist_between_building_dict, tuple):
+        building_id_dict, dist_between_building_matrix = dist_between_building_dict
+        dist_between_building_list = dist_between_building_matrix.tolist()
+
     reassginment_cost_section_room_dict = dict()
     for section in all_section:
         if section in existing_room_assignment_section_dict:
@@ -868,6 +1718,8 @@ def get_reassignment_cost(all_section,
                     penalty = 0
                 elif existing_building_assignment == building:
                     penalty = same_building_penalty
+                elif isinstance(dist_between_building_dict, tuple):
+                    penalty = dist_between_building_list[building_id_dict[existing_building_assignment]][building_id_dict[building]]
                 else:
                     penalty = dist_between_building_dict[existing_building_assignment, building]
                 reassginment_cost_section_room_dict[section, room] = penalty
@@ -875,3 +1727,50 @@ def get_reassignment_cost(all_section,
             for room in all_room:
                 reassginment_cost_section_room_dict[section, room] = 0
     return reassginment_cost_section_room_dict
+
+
+def get_reassignment_cost_pair(pair_section_id,
+                               pair_room_id,
+                               all_section,
+                               all_room,
+                               building_id_dict,
+                               dist_between_building_matrix,
+                               existing_room_assignment_section_dict,
+                               building_room_dict,
+                               same_building_penalty=50):
+    """
+    Input:
+        pair_section_id - np.array[int]: section id of each (section, room) pair, e.g. from get_section_room_csr
+        pair_room_id - np.array[int]: room id of each (section, room) pair
+        all_section - list[str]: all sections available in the optimization problem, in id order
+        all_room - list[str]: all rooms available in the optimization problem, in id order
+        building_id_dict, dist_between_building_matrix: output of get_dist_between_buildings_matrix
+        existing_room_assignment_section_dict - dict{str: set(str)}: maps each section to its existing room assignment
+        building_room_dict - dict{str: str}: maps each room to its corresponding building
+    Output:
+        reassignment_cost_pair_array - np.array[float]: cost of reassigning the section of each pair to the room of the pair
+
+    Computes the same costs as get_reassignment_cost, but only for the given (section, room) pairs,
+        e.g. the pairs that are variables of the model
+    """
+
+    room_id_dict = get_id_dict(all_room)
+    room_building_id = np.array([building_id_dict[building_room_dict[room]] for room in all_room], dtype=np.int64)
+
+    has_existing_room = np.zeros(len(all_section), dtype=bool)
+    existing_room_id = np.full(len(all_section), -1, dtype=np.int64) #-1 if the existing room is not in all_room
+    existing_building_id = np.zeros(len(all_section), dtype=np.int64)
+    for section_id, section in enumerate(all_section):
+        if section in existing_room_assignment_section_dict:
+            existing_room_assignment = existing_room_assignment_section_dict[section]
+            has_existing_room[section_id] = True
+            existing_room_id[section_id] = room_id_dict.get(existing_room_assignment, -1)
+            existing_building_id[section_id] = building_id_dict[building_room_dict[existing_room_assignment]]
+
+    pair_building_id = room_building_id[pair_room_id]
+    pair_existing_building_id = existing_building_id[pair_section_id]
+    reassignment_cost_pair_array = dist_between_building_matrix[pair_existing_building_id, pair_building_id].astype(float)
+    reassignment_cost_pair_array[pair_existing_building_id == pair_building_id] = same_building_penalty
+    reassignment_cost_pair_array[existing_room_id[pair_section_id] == pair_room_id] = 0
+    reassignment_cost_pair_array[~has_existing_room[pair_section_id]] = 0
+    return reassignment_cost_pair_array
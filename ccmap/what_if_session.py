@@ -0,0 +1,229 @@
+import warnings
+import numpy as np
+from gurobipy import *
+
+import set_process as sp
+from model_ir import ModelIR
+
+
+class WhatIfSession:
+    """
+    Keeps a built model of a RoomAssignmentOpt descendant in memory, together with its variable and side constraint handles,
+        so that what-if questions are answered by editing the model in place and re-solving from the last incumbent,
+        instead of preprocessing and building the model again.
+    Edits:
+        fix_assignment, forbid_assignment, release_assignment, close_room - bounds of the assignment variables
+        set_room_capacity, set_priority_boost - parameters, of which only the changed objective and constraint coefficients are updated
+        set_side_constraint_active - removes or restores one of the global_side_constraints of the model
+    """
+
+    def __init__(self, opt, params=None):
+        """
+        Input:
+            opt - RoomAssignmentOpt: schedule optimization object. Its sets and parameters are computed if they are not yet
+            params - dict{str: any}: gurobi parameters, e.g. {"OutputFlag": 0, "TimeLimit": 60}
+        """
+        self.opt = opt
+        if not hasattr(opt, "section_room_indptr"):
+            opt.prepare_sets_params()
+        self.model, model_vars = opt.build_model_with_vars()
+        for param_name, param_value in (params or {}).items():
+            self.model.setParam(param_name, param_value)
+        self.X_xr_pair = model_vars["X_xr_pair"]
+        self.num_room = len(opt.all_room)
+
+        self.side_constr_dict = dict(getattr(opt, "side_constr_dict", {}))
+        self.side_constraint_dict = {constraint_name: side_constraint for constraint_name, side_constraint in opt.get_side_constraints().items()
+                                     if constraint_name in self.side_constr_dict}
+        self.objective_list = self.get_objective_list()
+        # pairs forbidden by forbid_assignment or close_room, and pairs fixed by fix_assignment
+        self.forbidden_pair = np.zeros(len(self.X_xr_pair), dtype=bool)
+        self.fixed_pair = np.zeros(len(self.X_xr_pair), dtype=bool)
+        self.pair_value = None
+        self.model.update()
+
+    def get_objective_list(self):
+        """
+        Output:
+            objective_list - list[dict{str: any}]: objectives of the current parameters, in the format of ModelIR.objective_list
+        """
+        model_ir = ModelIR()
+        model_ir_vars = self.opt.set_model_ir_vars(model_ir)
+        self.opt.set_model_ir_objective(model_ir, model_ir_vars)
+        return model_ir.objective_list
+
+    def get_pair_id(self, section, room):
+        """
+        Input:
+            section - str: section, as in all_section
+            room - str: room, as in all_room. A class of rooms if rooms are aggregated
+        Output:
+            pair_id - int: position of the (section, room) pair in the model's assignment variables
+        """
+        if section not in self.opt.section_id_dict or room not in self.opt.room_id_dict:
+            raise Exception("Unknown section or room: " + str((section, room)))
+        return int(sp.get_pair_id(self.opt.section_room_indptr,
+                                  self.opt.section_room_indices,
+                                  self.num_room,
+                                  [self.opt.section_id_dict[section]],
+                                  [self.opt.room_id_dict[room]])[0])
+
+    def update_bounds(self, pair_id):
+        """
+        Input:
+            pair_id - np.array[int]: pairs whose variable bounds are set from the fixed and forbidden pairs, and from their delivery mode
+        """
+        pair_id = np.asarray(pair_id, dtype=np.int64)
+        upper_bound = ~self.forbidden_pair[pair_id]
+        if hasattr(self.opt, "delivery_mode_pair_array"):
+            # pairs that became remote after a change of capacity are not available, as if they had been filtered out when building the model
+            upper_bound &= self.opt.delivery_mode_pair_array[pair_id] != sp.delivery_mode_list.index("remote")
+        var_list = [self.X_xr_pair[var_id] for var_id in pair_id.tolist()]
+        self.model.setAttr("UB", var_list, upper_bound.astype(float).tolist())
+        self.model.setAttr("LB", var_list, (self.fixed_pair[pair_id] & upper_bound).astype(float).tolist())
+
+    def fix_assignment(self, section, room):
+        """
+        Assigns section to room in every following solve, e.g. to pin a section to its current room
+        """
+        pair_id = self.get_pair_id(section, room)
+        self.fixed_pair[pair_id] = True
+        self.forbidden_pair[pair_id] = False
+        self.update_bounds([pair_id])
+
+    def forbid_assignment(self, section, room):
+        """
+        Prevents section from being assigned to room in every following solve
+        """
+        pair_id = self.get_pair_id(section, room)
+        self.forbidden_pair[pair_id] = True
+        self.fixed_pair[pair_id] = False
+        self.update_bounds([pair_id])
+
+    def release_assignment(self, section, room):
+        """
+        Undoes fix_assignment and forbid_assignment for the (section, room) pair
+        """
+        pair_id = self.get_pair_id(section, room)
+        self.forbidden_pair[pair_id] = False
+        self.fixed_pair[pair_id] = False
+        self.update_bounds([pair_id])
+
+    def close_room(self, room):
+        """
+        Forbids every assignment to room. Undone by release_assignment of its pairs, or by open_room
+        """
+        pair_id = self.get_room_pair_id(room)
+        self.forbidden_pair[pair_id] = True
+        self.fixed_pair[pair_id] = False
+        self.update_bounds(pair_id)
+
+    def open_room(self, room):
+        pair_id = self.get_room_pair_id(room)
+        self.forbidden_pair[pair_id] = False
+        self.update_bounds(pair_id)
+
+    def get_room_pair_id(self, room):
+        if room not in self.opt.room_id_dict:
+            raise Exception("Unknown room: " + str(room))
+        return np.flatnonzero(self.opt.section_room_indices == self.opt.room_id_dict[room])
+
+    def set_room_capacity(self, room, capacity):
+        """
+        Input:
+            room - str: room, as in all_room
+            capacity - float: new capacity of the room
+
+        Recomputes the parameters of the pairs of room, and updates the coefficients that changed.
+        Pairs that become remote are made unavailable. Pairs that were not in the model when it was built,
+            e.g. because the room was too small for the section, are not added, so raising a capacity may require a rebuild
+        """
+        room_id = self.opt.room_id_dict[room]
+        if capacity > self.opt.capacity_room_array[room_id]:
+            warnings.warn("Sections that could not use room " + str(room) + " when the model was built are still not considered for it")
+        self.opt.capacity_room_dictionary[room] = capacity
+        self.opt.capacity_room_array[room_id] = capacity
+        pair_id = self.get_room_pair_id(room)
+        self.opt.update_pair_params(pair_id)
+        self.update_bounds(pair_id)
+        self.update_coefficients()
+
+    def set_priority_boost(self, section, priority_boost):
+        """
+        Input:
+            section - str: section, as in all_section
+            priority_boost - float: new factor of the contact hours of the section
+        """
+        self.opt.priority_boost_section_dict[section] = priority_boost
+        self.opt.priority_boost_section_array[self.opt.section_id_dict[section]] = priority_boost
+        self.update_coefficients()
+
+    def set_side_constraint_active(self, constraint_name, active):
+        """
+        Input:
+            constraint_name - str: one of the global_side_constraints of the model
+            active - bool: False to remove the constraint, True to add it back with the current parameters
+        """
+        if constraint_name not in self.opt.global_side_constraints:
+            raise Exception(type(self.opt).__name__ + " has no side constraint " + str(constraint_name) + ", only: " + ", ".join(self.opt.global_side_constraints))
+        if active and constraint_name not in self.side_constr_dict:
+            coeff, rhs = self.opt.get_side_constraints()[constraint_name]
+            self.side_constr_dict[constraint_name] = self.model.addLConstr(LinExpr(coeff.tolist(), self.X_xr_pair), GRB.GREATER_EQUAL, rhs, "C_" + constraint_name)
+            self.side_constraint_dict[constraint_name] = (coeff, rhs)
+        elif not active and constraint_name in self.side_constr_dict:
+            self.model.remove(self.side_constr_dict.pop(constraint_name))
+            del self.side_constraint_dict[constraint_name]
+        self.opt.side_constr_dict = self.side_constr_dict
+
+    def update_coefficients(self):
+        """
+        Recomputes the objective and side constraint coefficients from the current parameters of opt,
+            and changes only the coefficients that differ from those in the model.
+        Also picks up new right hand sides, e.g. after setattr(opt, "preference_min_bound", value)
+        """
+        num_changed = 0
+        new_objective_list = self.get_objective_list()
+        for objective, new_objective in zip(self.objective_list, new_objective_list):
+            changed_var_id = np.flatnonzero(objective["coeff"] != new_objective["coeff"])
+            if len(changed_var_id) > 0 or objective["constant"] != new_objective["constant"]:
+                self.model.setParam("ObjNumber", new_objective["index"])
+                self.model.setAttr("ObjN", [self.X_xr_pair[var_id] for var_id in changed_var_id.tolist()], new_objective["coeff"][changed_var_id].tolist())
+                self.model.ObjNCon = new_objective["constant"]
+                num_changed += len(changed_var_id)
+        self.objective_list = new_objective_list
+
+        new_side_constraint_dict = self.opt.get_side_constraints()
+        for constraint_name, (coeff, rhs) in self.side_constraint_dict.items():
+            new_coeff, new_rhs = new_side_constraint_dict[constraint_name]
+            changed_var_id = np.flatnonzero(coeff != new_coeff)
+            for var_id in changed_var_id.tolist():
+                self.model.chgCoeff(self.side_constr_dict[constraint_name], self.X_xr_pair[var_id], new_coeff[var_id])
+            self.side_constr_dict[constraint_name].RHS = new_rhs
+            self.side_constraint_dict[constraint_name] = (new_coeff, new_rhs)
+            num_changed += len(changed_var_id)
+        print("updated " + str(num_changed) + " coefficients")
+
+    def solve(self):
+        """
+        Output:
+            status - int: gurobi status of the solve
+
+        Starts from the incumbent of the previous solve, if there is one
+        """
+        if self.pair_value is not None:
+            self.model.setAttr("Start", self.X_xr_pair, self.pair_value.tolist())
+        self.model.optimize()
+        if self.model.SolCount > 0:
+            self.pair_value = np.round(self.model.getAttr("X", self.X_xr_pair))
+        return self.model.Status
+
+    def get_solution(self):
+        """
+        Output:
+            solution - dict{str: float}: value of every nonzero variable of the last solution found, by variable name.
+                       It can be passed to output_result in place of a solved model.
+                       If the last solve found no solution, e.g. because the edits made the model infeasible, the solution of an earlier solve is returned
+        """
+        if self.pair_value is None:
+            raise Exception("The session has not found a solution yet")
+        return {self.X_xr_pair[var_id].VarName: 1.0 for var_id in np.flatnonzero(self.pair_value > 0.5).tolist()}
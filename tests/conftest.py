@@ -0,0 +1,5 @@
+import os
+import sys
+
+# the modules of ccmap import each other by their module names, as when they are run from the ccmap directory
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "ccmap"))
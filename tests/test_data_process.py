@@ -0,0 +1,94 @@
+import os
+import warnings
+import pandas as pd
+import pytest
+
+import data_process as dp
+import set_process as sp
+import instance_generator as ig
+
+
+example_directory = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "examples")
+
+
+def mark_occurances_with_shifts(course_data):
+    """
+    mark_occurances as it numbered the rows of a section before the grouped cumulative count,
+        by chaining shifted flags, which allows at most five consecutive rows per section
+    """
+    course_data["repeated_section"] = course_data['subject_course_section'].eq(course_data['subject_course_section'].shift())
+    course_data['twice_repeated_section'] = (course_data['repeated_section'] & course_data['repeated_section'].eq(course_data['repeated_section'].shift()))
+    course_data['three_times_repeated_section'] = (course_data['twice_repeated_section'] & course_data['twice_repeated_section'].eq(course_data['twice_repeated_section'].shift()))
+    course_data['four_times_repeated_section'] = (course_data['three_times_repeated_section'] & course_data['three_times_repeated_section'].eq(course_data['three_times_repeated_section'].shift()))
+    course_data['five_times_repeated_section'] = (course_data['four_times_repeated_section'] & course_data['four_times_repeated_section'].eq(course_data['four_times_repeated_section'].shift()))
+
+    course_data["occurance"] = course_data.apply(
+        lambda row: 0 if not row["repeated_section"]
+        else (1 if not row["twice_repeated_section"]
+            else (2 if not row["three_times_repeated_section"]
+                else (3 if not row["four_times_repeated_section"]
+                    else 4
+            ))),
+        axis=1).astype(str)
+    assert not course_data['five_times_repeated_section'].any()
+
+    del course_data['repeated_section']
+    del course_data['twice_repeated_section']
+    del course_data['three_times_repeated_section']
+    del course_data['four_times_repeated_section']
+    del course_data['five_times_repeated_section']
+
+    course_data["subject_course_section_occurrence"] = course_data["subject_course_section"] + "_" + course_data["occurance"]
+    assert len(course_data["subject_course_section_occurrence"].unique()) == len(course_data)
+    return course_data
+
+def pad_building_number_with_apply(building_number):
+    """
+    Building numbers as clean_building_location_data padded them before pad_building_number
+    """
+    return building_number.apply(lambda building_number: dp.pad_str_prefix(str(building_number), 3, "0") if len(str(building_number)) < 3 else building_number)
+
+def get_rooms_from_course_data_with_iterrows(course_data):
+    """
+    Rooms of course_data as get_room_building_sets built them before they were built column-wise
+    """
+    return set(str(row["building_number"]) + "_" + str(row["room"]) for index, row in course_data.iterrows())
+
+def clean_data(course_data_filepath, building_location_data_filepath):
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        course_data = dp.clean_course_data(course_data_filepath)
+        return course_data, dp.clean_building_location_data(building_location_data_filepath, course_data)
+
+def assert_same_cleaned_data(monkeypatch, course_data_filepath, building_location_data_filepath):
+    course_data, building_location_data = clean_data(course_data_filepath, building_location_data_filepath)
+    with monkeypatch.context() as patch:
+        patch.setattr(dp, "mark_occurances", mark_occurances_with_shifts)
+        patch.setattr(dp, "pad_building_number", pad_building_number_with_apply)
+        reference_course_data, reference_building_location_data = clean_data(course_data_filepath, building_location_data_filepath)
+
+    pd.testing.assert_frame_equal(course_data, reference_course_data)
+    pd.testing.assert_frame_equal(building_location_data, reference_building_location_data)
+    assert set(sp.get_room_building_sets([], course_data)[1]) == get_rooms_from_course_data_with_iterrows(reference_course_data)
+
+
+def test_cleaned_data_matches_reference_on_examples(monkeypatch):
+    assert_same_cleaned_data(monkeypatch,
+                             os.path.join(example_directory, "example_course_sections.csv"),
+                             os.path.join(example_directory, "example_coordinates.csv"))
+
+@pytest.mark.parametrize("seed", [0, 1])
+def test_cleaned_data_matches_reference_on_generated_instance(monkeypatch, tmp_path, seed):
+    course_data_filepath, _, building_location_data_filepath = ig.write_instance(*ig.generate_instance(500, seed=seed), str(tmp_path), str(seed))
+    assert_same_cleaned_data(monkeypatch, course_data_filepath, building_location_data_filepath)
+
+def test_occurances_and_padding_edge_cases():
+    # a section meeting five times, sections next to each other with the same number of rows, and a section meeting once
+    course_data = pd.DataFrame({"subject_course_section": ["A"] * 5 + ["B", "B", "C", "C", "D"]})
+    pd.testing.assert_frame_equal(dp.mark_occurances(course_data.copy()), mark_occurances_with_shifts(course_data.copy()))
+
+    # numbers and strings, with and without padding
+    building_number = pd.Series([5, 12, 850, "7", "45", "172", "1001"])
+    pd.testing.assert_series_equal(dp.pad_building_number(building_number), pad_building_number_with_apply(building_number))
+    building_number = pd.Series([850, 172])
+    pd.testing.assert_series_equal(dp.pad_building_number(building_number), pad_building_number_with_apply(building_number))
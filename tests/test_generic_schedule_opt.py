@@ -0,0 +1,52 @@
+import io
+import contextlib
+import warnings
+import pytest
+
+import data_process as dp
+import instance_generator as ig
+from room_assignment_stability_mode_preferences_contact_opt import RoomAssignmentStabilityModePreferencesContactOpt
+
+
+@pytest.fixture(scope="module")
+def instance(tmp_path_factory):
+    course_data_filepath, room_data_filepath, building_location_filepath = ig.write_instance(*ig.generate_instance(150, num_building=3, seed=0),
+                                                                                             str(tmp_path_factory.mktemp("instance")), "150")
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        course_data = dp.clean_course_data(course_data_filepath)
+        return course_data, dp.clean_room_data(room_data_filepath), dp.clean_building_location_data(building_location_filepath, course_data)
+
+def get_objective_values(model):
+    objective_values = list()
+    for objective_index in range(model.NumObj):
+        model.setParam("ObjNumber", objective_index)
+        objective_values.append(model.ObjNVal)
+    return objective_values
+
+
+def test_relative_tolerances_are_not_decomposed(instance):
+    course_data, room_data, building_location_data = instance
+    opt = RoomAssignmentStabilityModePreferencesContactOpt(course_data, room_data, building_location_data, 3, 15, 0.01, 0.1)
+    with pytest.raises(Exception, match="relative tolerance"):
+        opt.solve_decomposed(max_workers=1)
+
+def test_decomposed_solve_matches_monolithic_solve(instance):
+    course_data, room_data, building_location_data = instance
+    opt = RoomAssignmentStabilityModePreferencesContactOpt(course_data, room_data, building_location_data, 3, 15, 0, 0)
+    with contextlib.redirect_stdout(io.StringIO()):
+        model = opt.construct_model()
+        model.Params.OutputFlag = 0
+        # levels are solved to optimality, so that both solves give up nothing within gurobi's default gap
+        model.Params.MIPGap = 0
+        model.optimize()
+        decomposed_opt = RoomAssignmentStabilityModePreferencesContactOpt(course_data, room_data, building_location_data, 3, 15, 0, 0)
+        solution = decomposed_opt.solve_decomposed(max_workers=2, params={"OutputFlag": 0, "MIPGap": 0})
+    assert len(decomposed_opt.component_status_list) > 1
+
+    # the decomposed solution is loaded into the monolithic model, which is then evaluated with all variables fixed
+    for var in model.getVars():
+        var.LB = var.UB = solution.get(var.VarName, 0)
+    monolithic_objective_values = get_objective_values(model)
+    model.optimize()
+    assert get_objective_values(model) == pytest.approx(monolithic_objective_values)
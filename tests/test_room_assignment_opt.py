@@ -0,0 +1,97 @@
+import warnings
+import pandas as pd
+
+import data_process as dp
+import set_process as sp
+from room_assignment_contact_opt import RoomAssignmentContactyOpt
+from room_assignment_stability_mode_preferences_contact_opt import RoomAssignmentStabilityModePreferencesContactOpt
+
+
+course_columns = ["Subject Code", "Course Number", "Course Section", "Enrollment", "Days", "Begin Time", "End Time", "Building Number", "Room",
+                  "Exclusively Online", "Room Use", "keep assigned room", "Raw Preference", "Preference"]
+
+
+def clean_instance(directory, section_list, room_list):
+    """
+    Input:
+        section_list - list[tuple]: (course section, days, begin time, end time, existing room) of each section
+        room_list - list[tuple]: (bldg_room, capacity) of each room
+    Output:
+        course_data, room_data, building_location_data - pd.DataFrame: cleaned input data
+    """
+    course_data = pd.DataFrame([["MATH", 1000, course_section, 20, days, begin_time, end_time, 850, existing_room, 0, "Class", 0, "Residential", "residential_spread"]
+                                for course_section, days, begin_time, end_time, existing_room in section_list], columns=course_columns)
+    room_data = pd.DataFrame([[bldg_room, capacity, "Class"] for bldg_room, capacity in room_list], columns=["bldg_room", "capacity", "use"])
+    building_location_data = pd.DataFrame({"building_number": [850], "latitude": [-84.39], "longitude": [33.77]})
+    course_data.to_csv(directory / "courses.csv", index=False)
+    room_data.to_csv(directory / "rooms.csv", index=False)
+    building_location_data.to_csv(directory / "buildings.csv", index=False)
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        course_data = dp.clean_course_data(str(directory / "courses.csv"))
+        return course_data, dp.clean_room_data(str(directory / "rooms.csv")), dp.clean_building_location_data(str(directory / "buildings.csv"), course_data)
+
+def solve_aggregated(opt, course_data, room_data, output_path):
+    opt.aggregate_equivalent_rooms = True
+    model = opt.construct_model()
+    model.Params.OutputFlag = 0
+    model.optimize()
+    with warnings.catch_warnings(record=True) as warning_list:
+        warnings.simplefilter("always")
+        opt.output_result(course_data, room_data, model, str(output_path))
+    return pd.read_csv(output_path).set_index("course_section"), [str(warning.message) for warning in warning_list]
+
+def assert_no_room_conflict(output):
+    for bldg_room, room_output in output[output["bldg_room"].notnull()].groupby("bldg_room"):
+        timeslot_list = [sp.get_timeslot(days + "_" + str(begin_time) + "_" + str(end_time))
+                         for days, begin_time, end_time in zip(room_output["days"], room_output["begin_time"], room_output["end_time"])]
+        assert not any(timeslot.overlaps(other_timeslot) for i, timeslot in enumerate(timeslot_list) for other_timeslot in timeslot_list[i + 1:])
+
+
+def test_section_that_fits_no_room_of_its_class_is_remote(tmp_path):
+    # every day has two of the three sections, which the class constraints allow, but no two rooms can hold all three
+    course_data, room_data, building_location_data = clean_instance(tmp_path,
+                                                                    [("A", "MW", 1000, 1050, 101), ("B", "WF", 1000, 1050, 101), ("C", "MF", 1000, 1050, 102)],
+                                                                    [("850_101", 20), ("850_102", 20)])
+    opt = RoomAssignmentContactyOpt(course_data, room_data, 3, 15)
+    output, warning_list = solve_aggregated(opt, course_data, room_data, tmp_path / "output.csv")
+
+    assert not opt.plan_optimal
+    assert len(opt.unassigned_section) == 1
+    unassigned_output = output.loc[opt.unassigned_section[0].split("_")[2]]
+    assert pd.isnull(unassigned_output["bldg_room"])
+    assert unassigned_output["delivery_mode"] == "remote"
+    assert unassigned_output["in_person_hours"] == 0
+    assert output["bldg_room"].notnull().sum() == 2
+    assert_no_room_conflict(output)
+    assert any("not optimal" in message for message in warning_list)
+
+def test_sections_are_rearranged_within_their_class(tmp_path):
+    # placing A and B in their existing rooms leaves no room for C, but A and B can share a room
+    course_data, room_data, building_location_data = clean_instance(tmp_path,
+                                                                    [("A", "M", 900, 950, 101), ("B", "W", 900, 950, 102), ("C", "MW", 900, 950, 101)],
+                                                                    [("850_101", 20), ("850_102", 20)])
+    opt = RoomAssignmentContactyOpt(course_data, room_data, 3, 15)
+    output, warning_list = solve_aggregated(opt, course_data, room_data, tmp_path / "output.csv")
+
+    assert opt.plan_optimal
+    assert opt.unassigned_section == [] and opt.moved_section == []
+    assert output["bldg_room"].notnull().all()
+    assert (output["delivery_mode"] == "residential_spread").all()
+    assert_no_room_conflict(output)
+    assert warning_list == []
+
+def test_section_is_moved_to_a_free_room_of_another_class(tmp_path):
+    # plan stability keeps the three sections in the class of their existing rooms, which cannot hold them, while 850_103 is free
+    course_data, room_data, building_location_data = clean_instance(tmp_path,
+                                                                    [("A", "MW", 1000, 1050, 101), ("B", "WF", 1000, 1050, 101), ("C", "MF", 1000, 1050, 102)],
+                                                                    [("850_101", 20), ("850_102", 20), ("850_103", 25)])
+    opt = RoomAssignmentStabilityModePreferencesContactOpt(course_data, room_data, building_location_data, 3, 15, 0.01, 0.1)
+    output, warning_list = solve_aggregated(opt, course_data, room_data, tmp_path / "output.csv")
+
+    assert not opt.plan_optimal
+    assert opt.unassigned_section == []
+    assert len(opt.moved_section) == 1
+    assert output.loc[opt.moved_section[0].split("_")[2], "bldg_room"] == "850_103"
+    assert (output["delivery_mode"] == "residential_spread").all()
+    assert_no_room_conflict(output)
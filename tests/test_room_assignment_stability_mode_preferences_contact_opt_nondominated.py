@@ -0,0 +1,23 @@
+import os
+import warnings
+
+import data_process as dp
+from room_assignment_stability_mode_preferences_contact_opt_nondominated import RoomAssignmentStabilityModePreferencesContactOptNondominated
+
+
+example_directory = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "examples")
+
+
+def test_frontier_leaves_bounds_unchanged():
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        course_data = dp.clean_course_data(os.path.join(example_directory, "example_course_sections.csv"))
+        room_data = dp.clean_room_data(os.path.join(example_directory, "example_classrooms.csv"))
+        building_location_data = dp.clean_building_location_data(os.path.join(example_directory, "example_coordinates.csv"), course_data)
+    opt = RoomAssignmentStabilityModePreferencesContactOptNondominated(course_data, room_data, building_location_data, 3, 15,
+                                                                       1, 1, 1, 0, 0, 0, None)
+    frontier = opt.get_frontier({"preference_min_bound": [5, 10, 15], "same_room_min_count": [0, 1]}, params={"OutputFlag": 0})
+
+    assert len(frontier) == 6
+    assert sorted(frontier["preference_min_bound"].unique()) == [5, 10, 15]
+    assert (opt.preference_min_bound, opt.contact_hours_min_bound, opt.same_room_min_count) == (0, 0, 0)
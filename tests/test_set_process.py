@@ -0,0 +1,73 @@
+import os
+import warnings
+import pandas as pd
+import pytest
+
+import data_process as dp
+import set_process as sp
+import instance_generator as ig
+
+
+example_directory = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "examples")
+
+
+def get_pairwise_clash_dictionary(all_timeslot, all_simplified_timeslot, all_section, course_data):
+    """
+    Clash sets as get_sections_with_overlapping_time_slot computed them before the sweep,
+        by comparing every simplified timeslot with every timeslot
+    """
+    section_timeslot_dictionary = dict()
+    for section in all_section:
+        timeslot = course_data[course_data["subject_course_section_occurrence"] == section]["full_time"].iloc[0]
+        section_timeslot_dictionary.setdefault(timeslot, set()).add(section)
+
+    section_timeslot_clash_dictionary = dict()
+    for current_timeslot in all_simplified_timeslot:
+        current_dow, current_start_time, _ = current_timeslot.split("_")
+        current_start_time = sp.pad_time_str(current_start_time)
+        sections_conflicting = set()
+        for other_timeslot in all_timeslot:
+            other_dow, other_start_time, other_end_time = other_timeslot.split("_")
+            if (len(set(current_dow) & set(other_dow)) > 0 and sp.pad_time_str(other_start_time) <= current_start_time
+                    and current_start_time < sp.pad_time_str(other_end_time)):
+                sections_conflicting |= section_timeslot_dictionary.get(other_timeslot, set())
+        section_timeslot_clash_dictionary[current_timeslot] = sections_conflicting
+    return section_timeslot_clash_dictionary
+
+def assert_same_clash_sets(course_data):
+    all_section = course_data["subject_course_section_occurrence"].tolist()
+    all_timeslot = course_data["full_time"].unique()
+    all_simplified_timeslot = sp.get_all_simplieid_timeslot(all_timeslot)
+    clash_dictionary = sp.get_sections_with_overlapping_time_slot(all_timeslot, all_simplified_timeslot, all_section, course_data)
+    assert clash_dictionary == get_pairwise_clash_dictionary(all_timeslot, all_simplified_timeslot, all_section, course_data)
+
+def clean_example_course_data():
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        return dp.clean_course_data(os.path.join(example_directory, "example_course_sections.csv"))
+
+def clean_generated_course_data(directory, num_section, seed):
+    course_data_filepath, _, _ = ig.write_instance(*ig.generate_instance(num_section, seed=seed), str(directory), str(num_section))
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        return dp.clean_course_data(course_data_filepath)
+
+
+def test_clash_sets_match_pairwise_on_examples():
+    assert_same_clash_sets(clean_example_course_data())
+
+@pytest.mark.parametrize("seed", [0, 1])
+def test_clash_sets_match_pairwise_on_generated_instance(tmp_path, seed):
+    assert_same_clash_sets(clean_generated_course_data(tmp_path, 500, seed))
+
+def test_clash_sets_edge_cases():
+    # back to back sections do not clash, 3 digit times are compared as times, and a section clashes on any shared day
+    course_data = pd.DataFrame({"subject_course_section_occurrence": ["A_0", "B_0", "C_0", "D_0", "E_0"],
+                                "full_time": ["MW_900_950", "MW_950_1040", "W_1000_1100", "TR_900_1015", "MTWRF_800_1200"]})
+    assert_same_clash_sets(course_data)
+    all_timeslot = course_data["full_time"].unique()
+    clash_dictionary = sp.get_sections_with_overlapping_time_slot(all_timeslot, sp.get_all_simplieid_timeslot(all_timeslot),
+                                                                  course_data["subject_course_section_occurrence"].tolist(), course_data)
+    assert clash_dictionary["M_950_x"] == {"B_0", "E_0"}
+    assert clash_dictionary["W_1000_x"] == {"B_0", "C_0", "E_0"}
+    assert clash_dictionary["T_900_x"] == {"D_0", "E_0"}